@@ -2,6 +2,7 @@ from typing import Dict, List, Any
 import math
 from financial_logic import get_age_based_allocation
 from services.market_data import MarketDataService
+from services.projections import ProjectionEngine
 
 class AllocationAgent:
     """
@@ -14,43 +15,56 @@ class AllocationAgent:
     5. Generate 'Trails' (Projections/Returns).
     """
 
+    # Real Funds Database with Tickers (shared with services/analytics.py)
+    # Expanded Real Funds Database
+    FUND_DATABASE = {
+        "Liquid": [
+            {"name": "Nippon India Liquid Fund", "ticker": "LIQUIDBEES.NS", "risk": "low"},
+            {"name": "SBI Liquid Fund", "ticker": "SBIN.NS", "risk": "low"}, # Proxy
+            {"name": "HDFC Liquid Fund", "ticker": "HDFCBANK.NS", "risk": "low"} # Proxy
+        ],
+        "Debt": [
+            {"name": "HDFC Short Term Debt", "ticker": "HDFCLIFE.NS", "risk": "low-moderate"},
+            {"name": "ICICI Pru All Seasons Bond", "ticker": "ICICIBANK.NS", "risk": "low-moderate"}, # Proxy
+            {"name": "SBI Magnum Gilt Fund", "ticker": "SBIN.NS", "risk": "moderate"} # Proxy
+        ],
+        "Hybrid": [
+            {"name": "ICICI Pru Balanced Advantage", "ticker": "ICICIPRULI.NS", "risk": "moderate"},
+            {"name": "HDFC Balanced Advantage", "ticker": "HDFCBANK.NS", "risk": "moderate"}, # Proxy
+            {"name": "SBI Equity Hybrid Fund", "ticker": "SBIN.NS", "risk": "high"} # Proxy
+        ],
+        "Equity": [
+            {"name": "Nifty 50 ETF", "ticker": "NIFTYBEES.NS", "risk": "high"},
+            {"name": "HDFC Top 100 Fund", "ticker": "HDFCBANK.NS", "risk": "high"}, # Proxy
+            {"name": "ICICI Pru Bluechip", "ticker": "ICICIBANK.NS", "risk": "high"} # Proxy
+        ],
+        "MidCap": [
+            {"name": "Nippon India ETF Nifty Midcap 150", "ticker": "MID150BEES.NS", "risk": "very-high"},
+            {"name": "HDFC Mid-Cap Opportunities", "ticker": "HDFCBANK.NS", "risk": "very-high"}, # Proxy
+            {"name": "Kotak Emerging Equity", "ticker": "KOTAKBANK.NS", "risk": "very-high"} # Proxy
+        ],
+        "Gold": [
+            {"name": "Nippon India ETF Gold BeES", "ticker": "GOLDBEES.NS", "risk": "moderate"},
+            {"name": "HDFC Gold ETF", "ticker": "HDFCBANK.NS", "risk": "moderate"}, # Proxy
+            {"name": "SBI Gold ETF", "ticker": "SBIN.NS", "risk": "moderate"} # Proxy
+        ]
+    }
+
+    PROJECTION_HORIZONS = [3, 5, 10]  # years shown on every plan
+
     def __init__(self):
         self.market_data = MarketDataService()
-        # Real Funds Database with Tickers
-        # Expanded Real Funds Database
-        self.FUND_DATABASE = {
-            "Liquid": [
-                {"name": "Nippon India Liquid Fund", "ticker": "LIQUIDBEES.NS", "risk": "low"},
-                {"name": "SBI Liquid Fund", "ticker": "SBIN.NS", "risk": "low"}, # Proxy
-                {"name": "HDFC Liquid Fund", "ticker": "HDFCBANK.NS", "risk": "low"} # Proxy
-            ],
-            "Debt": [
-                {"name": "HDFC Short Term Debt", "ticker": "HDFCLIFE.NS", "risk": "low-moderate"},
-                {"name": "ICICI Pru All Seasons Bond", "ticker": "ICICIBANK.NS", "risk": "low-moderate"}, # Proxy
-                {"name": "SBI Magnum Gilt Fund", "ticker": "SBIN.NS", "risk": "moderate"} # Proxy
-            ],
-            "Hybrid": [
-                {"name": "ICICI Pru Balanced Advantage", "ticker": "ICICIPRULI.NS", "risk": "moderate"},
-                {"name": "HDFC Balanced Advantage", "ticker": "HDFCBANK.NS", "risk": "moderate"}, # Proxy
-                {"name": "SBI Equity Hybrid Fund", "ticker": "SBIN.NS", "risk": "high"} # Proxy
-            ],
-            "Equity": [
-                {"name": "Nifty 50 ETF", "ticker": "NIFTYBEES.NS", "risk": "high"},
-                {"name": "HDFC Top 100 Fund", "ticker": "HDFCBANK.NS", "risk": "high"}, # Proxy
-                {"name": "ICICI Pru Bluechip", "ticker": "ICICIBANK.NS", "risk": "high"} # Proxy
-            ],
-            "MidCap": [
-                {"name": "Nippon India ETF Nifty Midcap 150", "ticker": "MID150BEES.NS", "risk": "very-high"},
-                {"name": "HDFC Mid-Cap Opportunities", "ticker": "HDFCBANK.NS", "risk": "very-high"}, # Proxy
-                {"name": "Kotak Emerging Equity", "ticker": "KOTAKBANK.NS", "risk": "very-high"} # Proxy
-            ],
-            "Gold": [
-                {"name": "Nippon India ETF Gold BeES", "ticker": "GOLDBEES.NS", "risk": "moderate"},
-                {"name": "HDFC Gold ETF", "ticker": "HDFCBANK.NS", "risk": "moderate"}, # Proxy
-                {"name": "SBI Gold ETF", "ticker": "SBIN.NS", "risk": "moderate"} # Proxy
-            ]
-        }
-        
+        self.projections = ProjectionEngine()
+
+    def prefetch_prices(self, assets: List[str] = None) -> Dict[str, float]:
+        """
+        Warm the quote cache for every fund a plan could pick (one batched fetch).
+        Called speculatively by the orchestrator while the message is still being parsed.
+        """
+        assets = assets or list(self.FUND_DATABASE.keys())
+        tickers = list(dict.fromkeys(fund["ticker"] for asset in assets for fund in self.FUND_DATABASE.get(asset, [])))
+        return self.market_data.get_prices(tickers)
+
     def _get_best_fund(self, category: str) -> Dict:
         """Select a fund dynamically. For MVP, random selection to show variety."""
         import random
@@ -59,31 +73,7 @@ class AllocationAgent:
             return {"name": "Generic Fund", "ticker": "NIFTYBEES.NS", "risk": "moderate"}
         return random.choice(candidates)
 
-    def _calculate_projection(self, monthly_amount: float, allocation: Dict[str, float], years: int) -> float:
-        """Calculate future value of SIP using weighted average return"""
-        weighted_return = 0
-        for asset, pct in allocation.items():
-            fund_key = asset
-            # Use a static expected return for projection since live return is volatile
-            # In real app, fetch historical CAGR
-            expected_returns = {
-                "Liquid": 0.05, "Debt": 0.07, "Hybrid": 0.10, "Equity": 0.12,
-                "MidCap": 0.14, "Gold": 0.08, "FD": 0.065, "Income_Funds": 0.075
-            }
-            weighted_return += expected_returns.get(fund_key, 0.06) * pct
-
-        # Future Value of SIP formula: P * [ (1+r)^n - 1 ] * (1+r) / r
-        # r = monthly rate, n = months
-        monthly_rate = weighted_return / 12
-        months = years * 12
-        
-        if monthly_rate == 0:
-            return monthly_amount * months
-            
-        fv = monthly_amount * ((((1 + monthly_rate) ** months) - 1) / monthly_rate) * (1 + monthly_rate)
-        return round(fv)
-
-    def generate_plan(self, user_profile: Dict, user_state: Dict, investment_type: str = "SIP", amount_override: float = None, goal: str = None, duration: int = None, risk_override: str = None) -> Dict:
+    def generate_plan(self, user_profile: Dict, user_state: Dict, investment_type: str = "SIP", amount_override: float = None, goal: str = None, duration: int = None, risk_override: str = None, goal_amount: float = None) -> Dict:
         # 1. Analyze Profile
         age_group = user_profile.get("age_group", "26-35")
         age_map = {"18-25": 22, "26-35": 30, "36-50": 40, "50+": 55}
@@ -136,12 +126,14 @@ class AllocationAgent:
                  allocation_description = "Conservative (User Preference)"
         # ------------------------------
         
+        funds = {asset: self._get_best_fund(asset) for asset in raw_allocation}
+        # Fetch Live Prices (one batched quote request)
+        prices = self.market_data.get_prices([fund["ticker"] for fund in funds.values()])
+        
         allocation_details = {}
         for asset, pct in raw_allocation.items():
-            fund_info = self._get_best_fund(asset)
-            
-            # Fetch Live Price
-            current_price = self.market_data.get_current_price(fund_info["ticker"])
+            fund_info = funds[asset]
+            current_price = prices[fund_info["ticker"]]
             
             allocation_details[asset] = {
                 "pct": int(pct * 100),
@@ -152,14 +144,15 @@ class AllocationAgent:
             }
 
         # 4. Generate 'Trails' (Projections)
-        projections = {
-            "3_years": self._calculate_projection(recommended_amount, raw_allocation, 3),
-            "5_years": self._calculate_projection(recommended_amount, raw_allocation, 5),
-            "10_years": self._calculate_projection(recommended_amount, raw_allocation, 10)
-        }
+        # Every horizon (plus the goal's own) in one deterministic pass and one Monte Carlo run
+        simulation = self.projections.simulate(
+            recommended_amount, raw_allocation, self.PROJECTION_HORIZONS,
+            goal_amount=goal_amount, goal_years=duration or 10
+        )
+        projections = {years: band["expected"] for years, band in simulation["horizons"].items()}
         
         total_invested_10y = recommended_amount * 12 * 10
-        gain_10y = projections["10_years"] - total_invested_10y
+        gain_10y = projections[10] - total_invested_10y
 
         steps = ["Complete KYC with a broker (Zerodha/Groww)"]
         if investment_type == "SIP":
@@ -177,9 +170,14 @@ class AllocationAgent:
             "how_much": recommended_amount,
             "projections": {
                 "monthly_investment": recommended_amount,
-                "corpus_10y": projections["10_years"],
+                "corpus_10y": projections[10],
                 "total_invested": total_invested_10y,
-                "wealth_gained": gain_10y
+                "wealth_gained": gain_10y,
+                # Monte Carlo P10/P50/P90 per horizon and chance of reaching the goal (or of a gain)
+                "bands": {f"{years}_years": band for years, band in simulation["horizons"].items()},
+                "probability": simulation["probability"],
+                "probability_of": simulation["probability_of"],
+                "probability_years": simulation["goal_years"]
             },
             "risk_profile": f"{user_profile.get('risk_tolerance', 'Moderate').capitalize()}"
         }
@@ -1,13 +1,14 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
+from .llm import get_llm
+from .response_cache import create_response_cache
 
 class CoachAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.7  # More creative for friendly responses
-        )
+        self.llm = get_llm(temperature=0.7)  # More creative for friendly responses
+        
+        # Identical (literacy, state, decision, goal) inputs reuse a recent answer
+        self.cache = create_response_cache()
         
         self.prompts = {
             1: self._get_low_literacy_prompt(),
@@ -92,20 +93,71 @@ Generate a concise, insightful response:""")
     async def generate_response(
         self,
         literacy_level: int,
-        situation: str,
+        situation: Any,
         decision: dict,
-        message_goal: str
+        message_goal: str,
+        user_id: Optional[str] = None
     ) -> str:
+        # situation may be the raw state dict; it is fingerprinted for the cache
+        # and stringified for the prompt
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(user_id, literacy_level, situation, decision, message_goal)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                return cached
+        
         prompt = self.prompts.get(literacy_level, self.prompts[2])
         chain = prompt | self.llm
         
         result = await chain.ainvoke({
-            "situation": situation,
+            "situation": str(situation),
             "decision": str(decision),
             "message_goal": message_goal
         })
         
+        if cache_key is not None:
+            await self.cache.aset(cache_key, result.content, user_id)
         return result.content
+    
+    async def stream_response(
+        self,
+        literacy_level: int,
+        situation: Any,
+        decision: dict,
+        message_goal: str,
+        user_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Same as generate_response, but yields the text as the LLM produces it"""
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(user_id, literacy_level, situation, decision, message_goal)
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        prompt = self.prompts.get(literacy_level, self.prompts[2])
+        chain = prompt | self.llm
+
+        parts = []
+        async for chunk in chain.astream({
+            "situation": str(situation),
+            "decision": str(decision),
+            "message_goal": message_goal
+        }):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+
+        # Only complete answers are cached; a dropped stream never gets here
+        if cache_key is not None:
+            await self.cache.aset(cache_key, "".join(parts), user_id)
+
+    async def invalidate_user(self, user_id: str):
+        """Forget cached responses for a user whose data just changed"""
+        if self.cache is not None:
+            await self.cache.ainvalidate_user(user_id)
 
     async def generate_insights(self, transactions: list) -> str:
         """
@@ -122,7 +174,7 @@ Generate a concise, insightful response:""")
         for t in transactions[:10]: # Analyze last 10 txns
             if t['type'] == 'expense':
                 amount = t['amount']
-                cat = t.get('category', 'Uncategorized')
+                cat = t.get('category') or 'Other'
                 total_expense += amount
                 categories[cat] = categories.get(cat, 0) + amount
                 summary += f"- {t['transaction_date']}: {cat} - {amount}\n"
@@ -0,0 +1,189 @@
+"""
+Per-user conversation context (investment slot filling) with TTL and LRU cap.
+
+The in-memory backend is process-local. The SQLite backend keeps context in
+the shared database so every uvicorn worker sees the same slots and state
+survives restarts; update() does its read-modify-write under BEGIN IMMEDIATE
+so two workers merging slots for the same user cannot lose each other's writes.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from database.connection import DB_PATH, connect
+
+Context = Dict[str, Any]
+
+
+class InMemoryContextBackend:
+    def __init__(self, max_entries: int = 10000, ttl: float = 1800):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (context, expires_at)
+        self._lock = threading.Lock()
+
+    def _get_locked(self, user_id: str) -> Optional[Context]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] < time.time():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return dict(entry[0])
+
+    def _set_locked(self, user_id: str, context: Context):
+        self._entries[user_id] = (dict(context), time.time() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, user_id: str) -> Optional[Context]:
+        with self._lock:
+            return self._get_locked(user_id)
+
+    def set(self, user_id: str, context: Context):
+        with self._lock:
+            self._set_locked(user_id, context)
+
+    def update(self, user_id: str, fn: Callable[[Context], Context]) -> Context:
+        with self._lock:
+            context = fn(self._get_locked(user_id) or {})
+            self._set_locked(user_id, context)
+            return dict(context)
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteContextBackend:
+    def __init__(self, path: str = DB_PATH, max_entries: int = 10000, ttl: float = 1800):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS conversation_context (
+                user_id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_conversation_context_lru ON conversation_context(updated_at);
+        """)
+        self._conn.commit()
+
+    def _get_locked(self, user_id: str) -> Optional[Context]:
+        row = self._conn.execute(
+            "SELECT data, expires_at FROM conversation_context WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def _set_locked(self, user_id: str, context: Context):
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO conversation_context (user_id, data, expires_at, updated_at) VALUES (?, ?, ?, ?)",
+            (user_id, json.dumps(context, default=str), now + self.ttl, now)
+        )
+        # Drop expired rows, then the least recently updated overflow
+        self._conn.execute("DELETE FROM conversation_context WHERE expires_at < ?", (now,))
+        self._conn.execute("""
+            DELETE FROM conversation_context WHERE user_id IN (
+                SELECT user_id FROM conversation_context ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+
+    def get(self, user_id: str) -> Optional[Context]:
+        with self._lock:
+            return self._get_locked(user_id)
+
+    def set(self, user_id: str, context: Context):
+        with self._lock:
+            self._set_locked(user_id, context)
+            self._conn.commit()
+
+    def update(self, user_id: str, fn: Callable[[Context], Context]) -> Context:
+        with self._lock:
+            # Take the write lock before reading so concurrent workers serialize here
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                context = fn(self._get_locked(user_id) or {})
+                self._set_locked(user_id, context)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            return dict(context)
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM conversation_context WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM conversation_context")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM conversation_context WHERE expires_at >= ?", (time.time(),)
+            ).fetchone()[0]
+
+
+class ContextStore:
+    """Dict-like facade used by AgentOrchestrator (`user_id in store`, get/set/delete/update)"""
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else InMemoryContextBackend()
+
+    def get(self, user_id: str, default: Optional[Context] = None) -> Optional[Context]:
+        context = self.backend.get(user_id)
+        return default if context is None else context
+
+    def set(self, user_id: str, context: Context):
+        self.backend.set(user_id, context)
+
+    def update(self, user_id: str, fn: Callable[[Context], Context]) -> Context:
+        """Atomically transform a user's context (missing/expired context starts as {})"""
+        return self.backend.update(user_id, fn)
+
+    def delete(self, user_id: str):
+        self.backend.delete(user_id)
+
+    def clear(self):
+        self.backend.clear()
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.backend.get(user_id) is not None
+
+    def __len__(self):
+        return len(self.backend)
+
+
+def create_context_store() -> ContextStore:
+    """
+    Build the slot-filling context store from the environment:
+    FUNDPAL_CONTEXT_STORE = memory (default, single worker) | sqlite (shared across workers)
+    """
+    kind = os.getenv("FUNDPAL_CONTEXT_STORE", "memory").lower()
+    ttl = float(os.getenv("FUNDPAL_CONTEXT_TTL", "1800"))
+    size = int(os.getenv("FUNDPAL_CONTEXT_SIZE", "10000"))
+    if kind == "sqlite":
+        path = os.getenv("FUNDPAL_CONTEXT_PATH", DB_PATH)
+        return ContextStore(SQLiteContextBackend(path, max_entries=size, ttl=ttl))
+    return ContextStore(InMemoryContextBackend(max_entries=size, ttl=ttl))
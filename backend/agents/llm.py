@@ -0,0 +1,224 @@
+"""
+Chat model factory for the agents.
+
+get_llm() returns a LangChain chat model chosen by FUNDPAL_LLM_PROVIDER:
+
+- gemini (default): ChatGoogleGenerativeAI
+- fake: FakeChatModel, canned deterministic replies after FUNDPAL_LLM_FAKE_LATENCY
+  seconds, so the chat path can be load-tested and benchmarked offline
+- record: Gemini, and every completion is also written to FUNDPAL_LLM_REPLAY_DIR
+- replay: completions are served from FUNDPAL_LLM_REPLAY_DIR. A prompt that was
+  never recorded raises ReplayMissError, or is answered by the fake model when
+  FUNDPAL_LLM_REPLAY_MISS=fake
+
+Recordings are one JSON file per completion, named by a hash of the model
+name, temperature and prompt messages, so a replayed run sees exactly the
+text the recorded run did.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .rules import parse_message
+
+LLM_PROVIDER = os.getenv("FUNDPAL_LLM_PROVIDER", "gemini").lower()
+LLM_FAKE_LATENCY = float(os.getenv("FUNDPAL_LLM_FAKE_LATENCY", "0"))
+# Delay between streamed chunks of a fake reply
+LLM_FAKE_TOKEN_LATENCY = float(os.getenv("FUNDPAL_LLM_FAKE_TOKEN_LATENCY", "0"))
+LLM_REPLAY_DIR = os.getenv("FUNDPAL_LLM_REPLAY_DIR", "llm_recordings")
+LLM_REPLAY_MISS = os.getenv("FUNDPAL_LLM_REPLAY_MISS", "error").lower()
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+# ObserverAgent's system prompt; such prompts get a JSON parse back from the fake
+PARSER_MARKER = "financial message parser"
+
+
+class ReplayMissError(KeyError):
+    """A replayed run sent a prompt that the recorded run never did"""
+
+
+def _last_human(messages: List[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if message.type == "human":
+            return str(message.content)
+    return ""
+
+
+def _chunks(text: str) -> List[str]:
+    """Word-sized pieces that join back to `text`"""
+    words = text.split(" ")
+    return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for Gemini. Parser prompts get the rule-based parse
+    as JSON (or a plain "query"); every other prompt gets a short fixed reply
+    derived from the prompt hash. `latency` is paid before the first token.
+    """
+
+    latency: float = LLM_FAKE_LATENCY
+    token_latency: float = LLM_FAKE_TOKEN_LATENCY
+
+    @property
+    def _llm_type(self) -> str:
+        return "fundpal-fake"
+
+    def reply(self, messages: List[BaseMessage]) -> str:
+        text = _last_human(messages)
+        if any(PARSER_MARKER in str(m.content) for m in messages if m.type == "system"):
+            parsed = parse_message(text) or {"intent": "query", "raw_query": text}
+            parsed.pop("confidence", None)
+            return json.dumps(parsed)
+        tips = [
+            "You're on track this month. Keep a small buffer for the next few days.",
+            "Your spending is a little ahead of plan. Try to hold off on extras until payday.",
+            "Nice work logging that. Setting aside a bit each week will grow your emergency fund.",
+        ]
+        digest = hashlib.sha256("\n".join(str(m.content) for m in messages).encode()).digest()
+        return tips[digest[0] % len(tips)]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(messages)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.reply(messages)))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        for i, piece in enumerate(_chunks(self.reply(messages))):
+            if i and self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Record/replay wrapper. With `record=True` every completion from `inner` is
+    stored under `directory`; otherwise completions come only from disk and
+    unknown prompts go to `on_miss` (or raise ReplayMissError).
+    """
+
+    inner: Optional[BaseChatModel] = None
+    on_miss: Optional[BaseChatModel] = None
+    directory: str = LLM_REPLAY_DIR
+    record: bool = False
+    model_name: str = DEFAULT_MODEL
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fundpal-record" if self.record else "fundpal-replay"
+
+    def key(self, messages: List[BaseMessage]) -> str:
+        payload = json.dumps({
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "messages": [[m.type, m.content] for m in messages],
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def lookup(self, messages: List[BaseMessage]) -> Optional[str]:
+        try:
+            with open(self._path(self.key(messages)), encoding="utf-8") as f:
+                return json.load(f)["completion"]
+        except FileNotFoundError:
+            return None
+
+    def store(self, messages: List[BaseMessage], completion: str):
+        key = self.key(messages)
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so a concurrent reader never sees half a file
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "key": key,
+                "model": self.model_name,
+                "prompt": [[m.type, m.content] for m in messages],
+                "completion": completion,
+            }, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+    def _source(self, messages: List[BaseMessage]) -> BaseChatModel:
+        if self.record:
+            return self.inner
+        if self.on_miss is None:
+            raise ReplayMissError(f"No recording for prompt {self.key(messages)[:12]} in {self.directory}")
+        return self.on_miss
+
+    def _result(self, text: str) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        text = None if self.record else self.lookup(messages)
+        if text is None:
+            text = str(self._source(messages).invoke(messages).content)
+            if self.record:
+                self.store(messages, text)
+        return self._result(text)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Optional[AsyncCallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        text = None if self.record else self.lookup(messages)
+        if text is None:
+            text = str((await self._source(messages).ainvoke(messages)).content)
+            if self.record:
+                self.store(messages, text)
+        return self._result(text)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        text = None if self.record else self.lookup(messages)
+        if text is not None:
+            for piece in _chunks(text):
+                yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            return
+        parts = []
+        async for chunk in self._source(messages).astream(messages):
+            parts.append(str(chunk.content))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content))
+        if self.record:
+            self.store(messages, "".join(parts))
+
+
+def get_llm(model: str = DEFAULT_MODEL, temperature: float = 0.1,
+            provider: Optional[str] = None) -> BaseChatModel:
+    """The chat model for an agent, per FUNDPAL_LLM_PROVIDER (see module docstring)"""
+    provider = (provider or LLM_PROVIDER).lower()
+    if provider == "fake":
+        return FakeChatModel()
+    if provider == "replay":
+        return ReplayChatModel(model_name=model, temperature=temperature,
+                               on_miss=FakeChatModel() if LLM_REPLAY_MISS == "fake" else None)
+
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    gemini = ChatGoogleGenerativeAI(model=model, temperature=temperature)
+    if provider == "record":
+        return ReplayChatModel(inner=gemini, record=True, model_name=model, temperature=temperature)
+    if provider != "gemini":
+        raise ValueError(f"Unknown FUNDPAL_LLM_PROVIDER: {provider!r}")
+    return gemini
@@ -1,10 +1,11 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 from typing import Optional
 import json
 import os
 from dotenv import load_dotenv
+from .llm import get_llm
+from .rules import parse_message
 
 load_dotenv()
 
@@ -20,14 +21,15 @@ class ParsedTransaction(BaseModel):
     goal_name: Optional[str] = None
     duration_years: Optional[int] = None
     risk_profile: Optional[str] = None
+    confidence: Optional[float] = None  # Set by the rule-based fast path
 
 class ObserverAgent:
+    # Rule-based parses below this confidence still go to the LLM
+    FAST_PATH_THRESHOLD = 0.8
+
     def __init__(self):
-        # Ensure GEMINI_API_KEY is set in environment
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash", # Using 1.5 Pro as 3 Pro might not be available in this env yet, or fallback
-            temperature=0.1
-        )
+        # Gemini needs GOOGLE_API_KEY; FUNDPAL_LLM_PROVIDER=fake|replay runs offline (see agents/llm.py)
+        self.llm = get_llm(temperature=0.1)
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """You are a financial message parser. Extract structured data from user messages.
@@ -81,7 +83,18 @@ Examples:
             ("human", "{message}")
         ])
     
+    def parse_fast(self, message: str) -> Optional[ParsedTransaction]:
+        """Local, deterministic parse for common messages. None means 'ask the LLM'."""
+        data = parse_message(message)
+        if data and data["confidence"] >= self.FAST_PATH_THRESHOLD:
+            return ParsedTransaction(**data)
+        return None
+
     async def parse(self, message: str) -> ParsedTransaction:
+        fast = self.parse_fast(message)
+        if fast:
+            return fast
+
         chain = self.prompt | self.llm
         result = await chain.ainvoke({"message": message})
         try:
@@ -1,9 +1,11 @@
+import asyncio
 from .observer import ObserverAgent
 from .planner import PlannerAgent
 from .coach import CoachAgent
 from .safety import SafetyAgent
 from .allocation import AllocationAgent
 from .tools import financial_tools
+from .context_store import create_context_store
 from database.queries import get_user_state, save_transaction, get_user_profile
 
 class AgentOrchestrator:
@@ -20,23 +22,51 @@ class AgentOrchestrator:
             "gold": financial_tools[2],
             "research": financial_tools[3]
         }
-        # Simple in-memory context for MVP (user_id -> context_dict)
-        self.context = {}
+        # Investment slot-filling context (user_id -> slots), TTL + LRU bounded;
+        # FUNDPAL_CONTEXT_STORE=sqlite shares it across workers
+        self.context = create_context_store()
 
-    def _handle_investment_flow(self, user_id: str, message: str, parsed: dict, user_profile: dict, user_state: dict) -> tuple[str, dict]:
+    def _looks_like_investment(self, message: str, slots: dict) -> bool:
+        """Cheap pre-parse guess, used to start prefetching before the observer returns"""
+        msg_lower = message.lower()
+        return "invest" in msg_lower or "allocation" in msg_lower or "sip" in msg_lower or slots is not None
+
+    def _wants_investment_flow(self, message: str, parsed, slots: dict) -> bool:
+        msg_lower = message.lower()
+        return "invest" in msg_lower or "allocation" in msg_lower or bool(parsed.investment_type) or slots is not None
+
+    async def _settle_prefetch(self, prefetch):
+        """Wait for the speculative price prefetch; generate_plan fetches anything it missed"""
+        if prefetch is None:
+            return
+        try:
+            await prefetch
+        except Exception as e:
+            print(f"DEBUG: Price prefetch failed: {e}")
+
+    def _drop_prefetch(self, prefetch):
+        """Cancel a prefetch this turn won't use (or read its result so a failure isn't left unretrieved)"""
+        if prefetch is None:
+            return
+        if not prefetch.done():
+            prefetch.cancel()
+        elif not prefetch.cancelled():
+            prefetch.exception()
+
+    async def _handle_investment_flow(self, user_id: str, message: str, parsed: dict, user_profile: dict, user_state: dict, prefetch=None) -> tuple[str, dict]:
         """Centralized logic for handling investment conversations and slot filling"""
         # === SLOT FILLING LOGIC ===
         
-        # 1. Merge parsed data into context
-        if user_id not in self.context:
-            self.context[user_id] = {}
+        # 1. Merge parsed data into context (atomically, another worker may hold this user's context)
+        def merge(ctx):
+            if parsed.amount: ctx["amount"] = parsed.amount
+            if parsed.goal_name: ctx["goal"] = parsed.goal_name
+            if parsed.duration_years: ctx["duration"] = parsed.duration_years
+            if parsed.risk_profile: ctx["risk"] = parsed.risk_profile
+            if parsed.investment_type: ctx["type"] = parsed.investment_type
+            return ctx
         
-        ctx = self.context[user_id]
-        if parsed.amount: ctx["amount"] = parsed.amount
-        if parsed.goal_name: ctx["goal"] = parsed.goal_name
-        if parsed.duration_years: ctx["duration"] = parsed.duration_years
-        if parsed.risk_profile: ctx["risk"] = parsed.risk_profile
-        if parsed.investment_type: ctx["type"] = parsed.investment_type
+        ctx = await asyncio.to_thread(self.context.update, user_id, merge)
         
         # 2. Check for missing fields
         missing_fields = []
@@ -68,7 +98,12 @@ class AgentOrchestrator:
             duration = ctx.get("duration")
             risk = ctx.get("risk")
             
-            plan = self.allocation.generate_plan(
+            # Prices were requested speculatively at the start of process_message
+            await self._settle_prefetch(prefetch)
+
+            # generate_plan is synchronous and may hit the market data API
+            plan = await asyncio.to_thread(
+                self.allocation.generate_plan,
                 user_profile, 
                 user_state, 
                 investment_type=inv_type, 
@@ -79,8 +114,7 @@ class AgentOrchestrator:
             )
             
             # Clear context after success
-            if user_id in self.context:
-                del self.context[user_id]
+            await asyncio.to_thread(self.context.delete, user_id)
             
             card_data = {
                 "type": "investment_allocation",
@@ -97,34 +131,48 @@ class AgentOrchestrator:
 
         return response, card_data
     
-    async def process_message(self, user_id: str, message: str) -> dict:
-        """Main entry point for processing user messages"""
-        print(f"DEBUG: Processing message for {user_id}: {message}")
-        card_data = None
+    async def _understand(self, user_id: str, message: str) -> dict:
+        """Stages 1-2: load profile/state and parse the message, all concurrently"""
+        # Slot-filling context from an earlier turn, if any (may live in SQLite)
+        slots = await asyncio.to_thread(self.context.get, user_id)
+        
+        # Speculatively warm fund prices for the allocation stage while we wait on the LLM
+        prefetch = None
+        if self._looks_like_investment(message, slots):
+            prefetch = asyncio.ensure_future(asyncio.to_thread(self.allocation.prefetch_prices))
         
-        # 1. Get user profile and state
+        # 1-2. Get user profile and state and parse the message concurrently
         try:
-            user_profile = await get_user_profile(user_id)
+            user_profile, user_state, parsed = await asyncio.gather(
+                get_user_profile(user_id),
+                get_user_state(user_id),
+                self.observer.parse(message)
+            )
             print(f"DEBUG: Got profile: {user_profile}")
-            user_state = await get_user_state(user_id)
             print(f"DEBUG: Got state: {user_state}")
-        except Exception as e:
-            print(f"DEBUG: Error getting profile/state: {e}")
-            import traceback
-            traceback.print_exc()
-            raise e
-        
-        # 2. Parse the message
-        try:
-            parsed = await self.observer.parse(message)
             print(f"DEBUG: Parsed message: {parsed}")
         except Exception as e:
-            print(f"DEBUG: Error parsing message: {e}")
+            print(f"DEBUG: Error getting profile/state or parsing message: {e}")
             import traceback
             traceback.print_exc()
+            self._drop_prefetch(prefetch)
             raise e
         
-        # 3. Tool Execution (Simple Keyword Match for MVP)
+        # The guess was wrong: not an investment turn, so stop warming prices
+        if prefetch is not None and not self._wants_investment_flow(message, parsed, slots):
+            self._drop_prefetch(prefetch)
+            prefetch = None
+        
+        return {
+            "user_profile": user_profile,
+            "user_state": user_state,
+            "parsed": parsed,
+            "prefetch": prefetch,
+            "slots": slots
+        }
+    
+    def _run_tools(self, message: str) -> str:
+        """Stage 3: Tool Execution (Simple Keyword Match for MVP)"""
         tool_context = ""
         msg_lower = message.lower()
         for keyword, tool in self.tools.items():
@@ -142,13 +190,40 @@ class AgentOrchestrator:
                         tool_context += f"\n[Tool Result - Gold Rate]: {result}"
                 except Exception as e:
                     print(f"Tool error: {e}")
-
-        # 4. Handle based on intent
+        return tool_context
+    
+    async def _plan_turn(self, user_id: str, message: str, turn: dict) -> dict:
+        """
+        Stage 4: act on the intent.
+        Fills in turn["decision"], turn["card"] and either turn["response"] (already
+        final, e.g. an investment plan) or turn["coach_request"] (args for the coach).
+        """
+        try:
+            return await self._act(user_id, message, turn)
+        finally:
+            # Only a completed investment plan waits on the prefetch; no other path leaves it running
+            self._drop_prefetch(turn["prefetch"])
+    
+    async def _act(self, user_id: str, message: str, turn: dict) -> dict:
+        """_plan_turn() without the prefetch cleanup"""
+        user_profile = turn["user_profile"]
+        user_state = turn["user_state"]
+        parsed = turn["parsed"]
+        prefetch = turn["prefetch"]
+        literacy_level = user_profile.get("literacy_level", 2)
+        tool_context = self._run_tools(message)
+        
+        decision = {}
+        card_data = None
+        response = None
+        coach_request = None
+        
         if parsed.intent in ["log_income", "log_expense"]:
             # Save transaction
             print("DEBUG: Saving transaction...")
             try:
                 await save_transaction(user_id, parsed)
+                await self.coach.invalidate_user(user_id)
                 print("DEBUG: Transaction saved.")
             except Exception as e:
                 print(f"DEBUG: Error saving transaction: {e}")
@@ -186,19 +261,7 @@ class AgentOrchestrator:
                 }
             }
             
-            try:
-                response = await self.coach.generate_response(
-                    user_profile.get("literacy_level", 2),
-                    str(user_state),
-                    decision.dict(),
-                    message_goal
-                )
-                print(f"DEBUG: Coach response: {response}")
-            except Exception as e:
-                print(f"DEBUG: Error in coach: {e}")
-                import traceback
-                traceback.print_exc()
-                raise e
+            coach_request = (literacy_level, user_state, decision.dict(), message_goal)
         
         elif parsed.intent == "advice":
             # Full analysis needed
@@ -210,35 +273,30 @@ class AgentOrchestrator:
                 # We'll just append it to suggestions or handle in coach
                 pass
 
-            response = await self.coach.generate_response(
-                user_profile.get("literacy_level", 2),
-                str(user_state),
-                decision.dict(),
-                f"Answer: {parsed.raw_query}. Tool info: {tool_context}"
-            )
-
             # Check for investment keywords in advice
-            if "invest" in message.lower() or "allocation" in message.lower() or parsed.investment_type or user_id in self.context:
-                 response, card_data = self._handle_investment_flow(user_id, message, parsed, user_profile, user_state)
+            # (the plan response replaces the coach answer, so skip that LLM call)
+            if self._wants_investment_flow(message, parsed, turn["slots"]):
+                 response, card_data = await self._handle_investment_flow(user_id, message, parsed, user_profile, user_state, prefetch)
+            else:
+                coach_request = (
+                    literacy_level,
+                    user_state,
+                    decision.dict(),
+                    f"Answer: {parsed.raw_query}. Tool info: {tool_context}"
+                )
         
         elif parsed.intent == "query":
             # Status check
             decision = await self.planner.analyze(user_state)
             
             # Check if it's an investment query
-            card_data = None
-            if "invest" in message.lower() or "allocation" in message.lower() or parsed.investment_type or user_id in self.context:
-                response, card_data = self._handle_investment_flow(user_id, message, parsed, user_profile, user_state)
-                
-                # If response is just the question, we use it. 
-                # If it's the plan, we might want to wrap it with coach, but _handle_investment_flow returns a good response.
-                # However, the original code called coach.generate_response for the plan explanation.
-                # My new method returns a pre-formatted response. Let's stick with that for consistency and simplicity.
+            if self._wants_investment_flow(message, parsed, turn["slots"]):
+                # _handle_investment_flow returns a pre-formatted response (question or plan)
+                response, card_data = await self._handle_investment_flow(user_id, message, parsed, user_profile, user_state, prefetch)
             else:
-
-                response = await self.coach.generate_response(
-                    user_profile.get("literacy_level", 2),
-                    str(user_state),
+                coach_request = (
+                    literacy_level,
+                    user_state,
                     decision.dict(),
                     "Give status update on their finances"
                 )
@@ -249,9 +307,9 @@ class AgentOrchestrator:
             research_result = self.tools["research"].run(topic)
             
             # Coach synthesizes the research
-            response = await self.coach.generate_response(
-                user_profile.get("literacy_level", 2),
-                str(user_state),
+            coach_request = (
+                literacy_level,
+                user_state,
                 {},
                 f"Present this research findings: {research_result}"
             )
@@ -268,25 +326,57 @@ class AgentOrchestrator:
         
         else:
             # General chat - just use coach
-            decision = {}
-            card_data = None
-            
             # Check for investment keywords even in general chat
-            if "invest" in message.lower() or "allocation" in message.lower() or parsed.investment_type or user_id in self.context:
-                 response, card_data = self._handle_investment_flow(user_id, message, parsed, user_profile, user_state)
+            if self._wants_investment_flow(message, parsed, turn["slots"]):
+                 response, card_data = await self._handle_investment_flow(user_id, message, parsed, user_profile, user_state, prefetch)
             else:
-                response = await self.coach.generate_response(
-                    user_profile.get("literacy_level", 2),
-                    str(user_state),
+                coach_request = (
+                    literacy_level,
+                    user_state,
                     {},
                     f"Respond to: {message}. Tool info: {tool_context}"
                 )
         
+        turn.update({
+            "user_state": user_state,
+            "decision": decision,
+            "card": card_data,
+            "response": response,
+            "coach_request": coach_request
+        })
+        return turn
+    
+    def _mode(self, decision) -> str:
+        # Determine mode safely
+        if isinstance(decision, dict):
+            return decision.get("mode", "normal")
+        # It's a Pydantic model
+        return getattr(decision, "mode", "normal")
+    
+    async def process_message(self, user_id: str, message: str) -> dict:
+        """Main entry point for processing user messages"""
+        print(f"DEBUG: Processing message for {user_id}: {message}")
+        
+        turn = await self._understand(user_id, message)
+        turn = await self._plan_turn(user_id, message, turn)
+        parsed = turn["parsed"]
+        
+        response = turn["response"]
+        if turn["coach_request"] is not None:
+            try:
+                response = await self.coach.generate_response(*turn["coach_request"], user_id=user_id)
+                print(f"DEBUG: Coach response: {response}")
+            except Exception as e:
+                print(f"DEBUG: Error in coach: {e}")
+                import traceback
+                traceback.print_exc()
+                raise e
+        
         # 5. Safety check
         # safety.check is synchronous and takes (response, user_profile, recommendation_type)
         safety_result = self.safety.check(
             response=response,
-            user_profile=user_profile,
+            user_profile=turn["user_profile"],
             recommendation_type=parsed.intent
         )
         
@@ -295,19 +385,60 @@ class AgentOrchestrator:
         
         # Log safety decision
         self.safety.log_decision(user_id, safety_result, {"message": message})
-        
-        # Determine mode safely
-        mode = "normal"
-        if isinstance(decision, dict):
-            mode = decision.get("mode", "normal")
-        else:
-            # It's a Pydantic model
-            mode = getattr(decision, "mode", "normal")
 
         return {
             "response": safe_response,
             "parsed": parsed.dict(),
             "alerts": alerts,
-            "mode": mode,
-            "card": card_data
+            "mode": self._mode(turn["decision"]),
+            "card": turn["card"]
         }
+    
+    async def stream_message(self, user_id: str, message: str):
+        """
+        Streaming variant of process_message.
+        Yields events as soon as they are known:
+          {"type": "parsed"} -> {"type": "card"} -> {"type": "token"}* / {"type": "alert"}* -> {"type": "done"}
+        """
+        print(f"DEBUG: Streaming message for {user_id}: {message}")
+        
+        turn = await self._understand(user_id, message)
+        parsed = turn["parsed"]
+        yield {"type": "parsed", "parsed": parsed.dict()}
+        
+        turn = await self._plan_turn(user_id, message, turn)
+        if turn["card"] is not None:
+            yield {"type": "card", "card": turn["card"]}
+        
+        # 5. Safety check, applied as the text arrives
+        guard = self.safety.stream(turn["user_profile"], recommendation_type=parsed.intent)
+        
+        if turn["coach_request"] is not None:
+            chunks = self.coach.stream_response(*turn["coach_request"], user_id=user_id)
+        else:
+            chunks = _single(turn["response"])
+        
+        async for chunk in chunks:
+            for warning in guard.feed(chunk):
+                yield {"type": "alert", "text": warning}
+            if not guard.blocked:
+                yield {"type": "token", "text": chunk}
+        
+        safety_result = guard.finish()
+        if safety_result.modified_response and guard.suffix:
+            yield {"type": "token", "text": guard.suffix}
+        
+        self.safety.log_decision(user_id, safety_result, {"message": message})
+        
+        yield {
+            "type": "done",
+            "response": safety_result.modified_response or guard.text,
+            "parsed": parsed.dict(),
+            "alerts": safety_result.warnings_added,
+            "mode": self._mode(turn["decision"]),
+            "card": turn["card"]
+        }
+
+
+async def _single(text: str):
+    yield text
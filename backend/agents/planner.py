@@ -1,7 +1,7 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel
 from typing import List, Optional
 from enum import Enum
+from .llm import get_llm
 from financial_logic import calculate_health_score, calculate_safe_to_spend, check_cashflow_stress
 
 class FinancialMode(str, Enum):
@@ -24,10 +24,7 @@ class PlannerDecision(BaseModel):
     
 class PlannerAgent:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash",
-            temperature=0.2
-        )
+        self.llm = get_llm(temperature=0.2)
     
     def calculate_runway(self, balance: float, daily_essential: float) -> int:
         """Calculate how many days user can survive"""
@@ -0,0 +1,238 @@
+"""
+Bounded LRU + TTL cache for CoachAgent responses.
+
+Keys are built from the user, the literacy level, a canonical fingerprint of
+the user state and planner decision, and the message goal, so an answer is
+only ever served back to the user it was written for, and a new transaction
+can drop that user's entries. Async callers use aget/aset/ainvalidate_user,
+which keep the SQLite backend's blocking calls off the event loop.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from database.connection import connect
+
+
+def canonicalize(value: Any) -> Any:
+    """Normalize a state/decision object so equivalent inputs fingerprint the same"""
+    if hasattr(value, "model_dump"):
+        value = value.model_dump()
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return {str(k): canonicalize(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(v) for v in value]
+    if isinstance(value, set):
+        return sorted(canonicalize(v) for v in value)
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+def fingerprint(*parts: Any) -> str:
+    payload = json.dumps([canonicalize(p) for p in parts], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class InMemoryCacheBackend:
+    """Process-local OrderedDict LRU"""
+
+    # Calls only take an in-process lock; fine to make on the event loop
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (value, expires_at, user_id)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: str, expires_at: float, user_id: Optional[str]) -> int:
+        """Store an entry; returns how many entries were evicted to make room"""
+        with self._lock:
+            self._entries[key] = (value, expires_at, user_id)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id: str) -> int:
+        with self._lock:
+            keys = [k for k, (_, _, uid) in self._entries.items() if uid == user_id]
+            for k in keys:
+                del self._entries[k]
+            return len(keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """On-disk LRU shared by every worker process on the host"""
+
+    # Disk I/O and SQLite locks; async callers run these in a thread
+    blocking = True
+
+    def __init__(self, path: str = "coach_cache.db", max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS coach_cache (
+                key TEXT PRIMARY KEY,
+                user_id TEXT,
+                value TEXT,
+                expires_at REAL,
+                last_used REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_coach_cache_user ON coach_cache(user_id);
+            CREATE INDEX IF NOT EXISTS idx_coach_cache_lru ON coach_cache(last_used);
+        """)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, user_id FROM coach_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE coach_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return (row[0], row[1], row[2])
+
+    def set(self, key: str, value: str, expires_at: float, user_id: Optional[str]) -> int:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO coach_cache (key, user_id, value, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, user_id, value, expires_at, time.time())
+            )
+            # Trim expired entries first, then the least recently used overflow
+            self._conn.execute("DELETE FROM coach_cache WHERE expires_at < ?", (time.time(),))
+            count = self._conn.execute("SELECT COUNT(*) FROM coach_cache").fetchone()[0]
+            evicted = max(0, count - self.max_entries)
+            if evicted:
+                self._conn.execute("""
+                    DELETE FROM coach_cache WHERE key IN (
+                        SELECT key FROM coach_cache ORDER BY last_used LIMIT ?
+                    )
+                """, (evicted,))
+            self._conn.commit()
+            return evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM coach_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def delete_user(self, user_id: str) -> int:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM coach_cache WHERE user_id = ?", (user_id,)).rowcount
+            self._conn.commit()
+            return deleted
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM coach_cache").fetchone()[0]
+
+
+class ResponseCache:
+    def __init__(self, backend=None, ttl: float = 900):
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def make_key(self, user_id: Optional[str], literacy_level: int, situation: Any, decision: Any,
+                 message_goal: str) -> str:
+        return fingerprint(user_id, literacy_level, situation, decision, message_goal)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.backend.get(key)
+        if entry is None:
+            self._count("misses")
+            return None
+        value, expires_at, _ = entry
+        if expires_at < time.time():
+            self.backend.delete(key)
+            self._count("expired")
+            self._count("misses")
+            return None
+        self._count("hits")
+        return value
+
+    def set(self, key: str, value: str, user_id: Optional[str] = None):
+        evicted = self.backend.set(key, value, time.time() + self.ttl, user_id)
+        if evicted:
+            self._count("evictions", evicted)
+
+    def invalidate_user(self, user_id: str) -> int:
+        """Drop every cached response generated for this user (e.g. after a new transaction)"""
+        removed = self.backend.delete_user(user_id)
+        self._count("invalidations", removed)
+        return removed
+
+    async def _call(self, fn, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for async code"""
+        return await self._call(self.get, key)
+
+    async def aset(self, key: str, value: str, user_id: Optional[str] = None):
+        """set() for async code"""
+        await self._call(self.set, key, value, user_id)
+
+    async def ainvalidate_user(self, user_id: str) -> int:
+        """invalidate_user() for async code"""
+        return await self._call(self.invalidate_user, user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["size"] = len(self.backend)
+        stats["backend"] = type(self.backend).__name__
+        return stats
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """
+    Build the coach cache from the environment:
+    FUNDPAL_COACH_CACHE = memory (default) | sqlite | off
+    """
+    kind = os.getenv("FUNDPAL_COACH_CACHE", "memory").lower()
+    if kind in ("off", "none", "0", "false"):
+        return None
+    ttl = float(os.getenv("FUNDPAL_COACH_CACHE_TTL", "900"))
+    size = int(os.getenv("FUNDPAL_COACH_CACHE_SIZE", "1024"))
+    if kind == "sqlite":
+        path = os.getenv("FUNDPAL_COACH_CACHE_PATH", "coach_cache.db")
+        return ResponseCache(SQLiteCacheBackend(path, max_entries=size), ttl=ttl)
+    return ResponseCache(InMemoryCacheBackend(max_entries=size), ttl=ttl)
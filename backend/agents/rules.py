@@ -0,0 +1,268 @@
+"""
+Deterministic parser for the common, unambiguous chat messages.
+
+ObserverAgent tries this first and only calls the LLM when it returns None
+or a confidence below its threshold. Keep the rules conservative: a wrong
+fast-path answer is worse than an extra LLM call.
+"""
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+# Mirrors the category mapping in the ObserverAgent prompt
+CATEGORY_KEYWORDS = {
+    "Food": ["zomato", "swiggy", "restaurant", "biryani", "pizza", "chai", "tea", "coffee", "lunch",
+             "dinner", "breakfast", "snacks", "groceries", "grocery", "kirana", "food", "vegetables"],
+    "Transport": ["uber", "ola", "rapido", "petrol", "diesel", "fuel", "metro", "bus", "auto", "cab", "taxi", "train"],
+    "Rent": ["rent", "housing", "pg", "flat"],
+    "Utilities": ["electricity", "water bill", "gas", "internet", "wifi", "broadband", "mobile", "recharge", "phone bill"],
+    "Entertainment": ["netflix", "movie", "movies", "spotify", "games", "hotstar", "concert"],
+    "Shopping": ["amazon", "flipkart", "myntra", "clothes", "shoes", "shirt", "shopping"],
+    "Health": ["medicine", "medicines", "doctor", "hospital", "pharmacy", "chemist", "clinic"],
+}
+
+INCOME_SOURCES = {
+    "salary": "Salary",
+    "freelance": "Freelance",
+    "client": "Freelance",
+    "swiggy": "Gig Income",
+    "zomato": "Gig Income",
+    "uber": "Gig Income",
+    "ola": "Gig Income",
+    "rapido": "Gig Income",
+    "rent received": "Rental Income",
+    "rental income": "Rental Income",
+    "bonus": "Salary",
+    "interest": "Interest",
+}
+
+EXPENSE_VERBS = ["spent", "spend", "paid", "pay for", "bought", "buy", "gave", "ordered", "recharged", "kharcha"]
+STRONG_INCOME_VERBS = ["earned", "earn", "received", "credited", "salary", "income", "got paid"]
+WEAK_INCOME_VERBS = ["got", "made"]
+
+# Words that make a message a question or a request for advice rather than a log entry
+QUESTION_MARKERS = ["can i", "should i", "how much", "how many", "what", "why", "when", "afford",
+                    "suggest", "recommend", "advice", "tell me", "show me", "status"]
+
+INVEST_WORDS = ["invest", "sip", "lumpsum", "lump sum", "mutual fund"]
+
+GOALS = {
+    "car": "Car", "bike": "Bike", "house": "House", "home": "House", "retirement": "Retirement",
+    "education": "Education", "wedding": "Wedding", "marriage": "Wedding", "emergency": "Emergency Fund",
+    "vacation": "Vacation", "trip": "Vacation", "travel": "Vacation",
+}
+
+RISK_LEVELS = {"high": "High", "aggressive": "High", "moderate": "Moderate", "medium": "Moderate",
+               "low": "Low", "conservative": "Low", "safe": "Low"}
+
+MULTIPLIERS = {
+    "k": 1_000, "thousand": 1_000, "hundred": 100,
+    "l": 100_000, "lac": 100_000, "lakh": 100_000, "lakhs": 100_000,
+    "cr": 10_000_000, "crore": 10_000_000,
+}
+
+DURATION_RE = re.compile(r"\b(\d{1,2})\s*(?:years?|yrs?)\b")
+AMOUNT_RE = re.compile(
+    r"(?:(?:₹|\brs\.?|\binr)\s*|(?<![a-z\d.,]))(\d+(?:,\d+)*(?:\.\d+)?)\s*"
+    r"(k|thousand|hundred|lakhs|lakh|lac|l|crore|cr)?\b"
+)
+
+# Any number at all, for telling one amount from several
+NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+# A number followed by these is a count, share or multiple, not rupees: "3 months rent", "50%", "2x"
+NON_AMOUNT_RE = re.compile(r"\s*(?:%|percent\b|x\b|times\b|months?\b|mos?\b|weeks?\b|days?\b)")
+WEEKDAYS = r"(?:mon|tues|wednes|thurs|fri|satur|sun)day"
+# Dates parse_date can't resolve; logging these as today would be wrong
+RELATIVE_DATE_RE = re.compile(
+    rf"\bago\b|\bday before yesterday\b|\blast (?:month|year|{WEEKDAYS})\b|\bon {WEEKDAYS}\b"
+)
+
+# Below this a bare number ("3") is more likely a slot answer we can't place
+MIN_BARE_AMOUNT = 100
+
+
+def _has_word(text: str, word: str) -> bool:
+    return re.search(rf"(?<![a-z]){re.escape(word)}(?![a-z])", text) is not None
+
+
+def _find(text: str, words) -> list:
+    return [w for w in words if _has_word(text, w)]
+
+
+def _numbers(text: str) -> list:
+    """Numbers left once durations ("3 years") are removed"""
+    return NUMBER_RE.findall(DURATION_RE.sub(" ", text))
+
+
+def parse_amount(text: str) -> Optional[float]:
+    """
+    The money amount in the text: '2k' -> 2000, '1.5 lakh' -> 150000, '₹1,200' -> 1200.
+    None when there isn't exactly one number besides a duration ("paid 3 months rent 45000")
+    or the number isn't money ("50%", "2x", "3 months"): the LLM sorts those out.
+    """
+    text = DURATION_RE.sub(" ", text)
+    if len(NUMBER_RE.findall(text)) != 1:
+        return None
+    match = AMOUNT_RE.search(text)
+    if not match or NON_AMOUNT_RE.match(text, match.end(1)):
+        return None
+    value = float(match.group(1).replace(",", ""))
+    suffix = match.group(2)
+    if suffix:
+        value *= MULTIPLIERS[suffix]
+    return value
+
+
+def parse_date(text: str, today: date) -> Optional[str]:
+    if _has_word(text, "yesterday"):
+        return (today - timedelta(days=1)).isoformat()
+    if _has_word(text, "last week"):
+        return (today - timedelta(days=7)).isoformat()
+    if _has_word(text, "today"):
+        return today.isoformat()
+    return None
+
+
+def _word_pattern(words) -> "re.Pattern":
+    return re.compile(rf"(?<![a-z])(?:{'|'.join(re.escape(w) for w in words)})(?![a-z])")
+
+
+# One alternation per category/source so bulk categorization is one regex scan per entry
+CATEGORY_PATTERNS = [(category, _word_pattern(words)) for category, words in CATEGORY_KEYWORDS.items()]
+INCOME_SOURCE_PATTERNS = [(_word_pattern([word]), category) for word, category in INCOME_SOURCES.items()]
+
+
+def _category(text: str) -> Optional[str]:
+    for category, pattern in CATEGORY_PATTERNS:
+        if pattern.search(text):
+            return category
+    return None
+
+
+def _income_source(text: str) -> Optional[str]:
+    for pattern, category in INCOME_SOURCE_PATTERNS:
+        if pattern.search(text):
+            return category
+    return None
+
+
+def categorize(description: str, txn_type: str) -> str:
+    """Category for a free-text description (e.g. a bank statement narration)"""
+    text = " ".join(description.lower().split())
+    if txn_type == "income":
+        return _income_source(text) or "Income"
+    return _category(text) or "Other"
+
+
+def _investment(text: str, message: str) -> Optional[Dict[str, Any]]:
+    data = {"intent": "advice", "raw_query": message}
+    amount = parse_amount(text)
+    if amount:
+        data["amount"] = amount
+    elif _numbers(text):
+        return None  # Numbers we can't place ("invest 5k at 12%")
+    if _find(text, ["sip", "monthly", "every month", "per month"]):
+        data["investment_type"] = "SIP"
+    elif _find(text, ["lumpsum", "lump sum", "one time", "one-time", "onetime"]):
+        data["investment_type"] = "Lumpsum"
+    duration = DURATION_RE.search(text)
+    if duration:
+        data["duration_years"] = int(duration.group(1))
+    for word, goal in GOALS.items():
+        if _has_word(text, word):
+            data["goal_name"] = goal
+            break
+    for word, risk in RISK_LEVELS.items():
+        if _has_word(text, f"{word} risk"):
+            data["risk_profile"] = risk
+            break
+    data["confidence"] = 0.9
+    return data
+
+
+def _slot_answer(text: str, message: str) -> Optional[Dict[str, Any]]:
+    """Short replies during investment slot filling: '10k', '5 years', 'high risk'"""
+    stripped = text.strip(" .!")
+    duration = DURATION_RE.fullmatch(stripped)
+    if duration:
+        return {"intent": "advice", "duration_years": int(duration.group(1)), "raw_query": message, "confidence": 0.9}
+
+    for word, risk in RISK_LEVELS.items():
+        if stripped in (word, f"{word} risk"):
+            return {"intent": "advice", "risk_profile": risk, "raw_query": message, "confidence": 0.9}
+
+    amount_only = AMOUNT_RE.fullmatch(stripped)
+    if amount_only:
+        amount = parse_amount(stripped)
+        if amount and (amount >= MIN_BARE_AMOUNT or amount_only.group(2)):
+            return {"intent": "advice", "amount": amount, "raw_query": message, "confidence": 0.85}
+    return None
+
+
+def parse_message(message: str, today: Optional[date] = None) -> Optional[Dict[str, Any]]:
+    """
+    Try to parse a chat message without the LLM.
+    Returns ParsedTransaction fields plus a 'confidence' in [0, 1], or None if unsure.
+    """
+    text = " ".join(message.lower().split())
+    if not text:
+        return None
+    today = today or date.today()
+
+    is_question = "?" in text or bool(_find(text, QUESTION_MARKERS))
+
+    if _find(text, INVEST_WORDS):
+        # "What is a SIP?" needs the LLM; "Invest 5k for a car" doesn't
+        return None if is_question else _investment(text, message)
+
+    slot = _slot_answer(text, message)
+    if slot:
+        return slot
+
+    if is_question:
+        return None
+
+    amount = parse_amount(text)
+    if not amount or RELATIVE_DATE_RE.search(text):
+        return None
+
+    expense_verbs = _find(text, EXPENSE_VERBS)
+    strong_income = _find(text, STRONG_INCOME_VERBS)
+    weak_income = _find(text, WEAK_INCOME_VERBS)
+    if expense_verbs and (strong_income or weak_income):
+        return None  # Mixed signals
+
+    base = {"amount": amount, "date": parse_date(text, today), "raw_query": message}
+
+    if expense_verbs:
+        category = _category(text)
+        return {
+            **base,
+            "intent": "log_expense",
+            "transaction_type": "expense",
+            "category": category or "Other",
+            "confidence": 0.95 if category else 0.7,
+        }
+
+    source = _income_source(text)
+    if strong_income or (weak_income and source):
+        return {
+            **base,
+            "intent": "log_income",
+            "transaction_type": "income",
+            "category": source or "Income",
+            "source": source,
+            "confidence": 0.95 if source else 0.85,
+        }
+
+    # No verb: "chai 20" is an expense, but "uber 300" could be a ride or a payout
+    category = _category(text)
+    if category and not source:
+        return {
+            **base,
+            "intent": "log_expense",
+            "transaction_type": "expense",
+            "category": category,
+            "confidence": 0.85,
+        }
+    return None
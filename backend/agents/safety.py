@@ -25,6 +25,9 @@ class SafetyAgent:
         "chit_fund"
     ]
     
+    # Words that can trigger rules 2-4
+    WARNING_KEYWORDS = ["invest", "mutual fund", "save", "sip", "recurring"]
+    
     def __init__(self):
         self.disclaimer = "💡 This is educational info, not financial advice."
     
@@ -35,9 +38,6 @@ class SafetyAgent:
         recommendation_type: Optional[str] = None
     ) -> SafetyCheck:
         
-        warnings = []
-        modified = response
-        
         # Rule 1: Block dangerous recommendations
         if recommendation_type in self.BLOCKED_RECOMMENDATIONS:
             return SafetyCheck(
@@ -47,8 +47,28 @@ class SafetyAgent:
                 blocked_reason=f"Cannot recommend {recommendation_type}"
             )
         
+        warnings = self._warnings(response, user_profile)
+        modified = response
+        
+        # Rule 5: Always add disclaimer for advice
+        if any(word in response.lower() for word in ["suggest", "recommend", "should", "advice"]):
+            if self.disclaimer not in response:
+                modified = response + f"\n\n{self.disclaimer}"
+        
+        return SafetyCheck(
+            is_safe=True,
+            modified_response=modified,
+            warnings_added=warnings,
+            blocked_reason=None
+        )
+    
+    def _warnings(self, response: str, user_profile: dict) -> List[str]:
+        """Rules 2-4: warnings triggered by what the response talks about"""
+        warnings = []
+        text = response.lower()
+        
         # Rule 2: Check risk alignment
-        if "invest" in response.lower() or "mutual fund" in response.lower():
+        if "invest" in text or "mutual fund" in text:
             if user_profile.get("risk_tolerance") == "conservative":
                 # Soften investment language
                 warnings.append("Note: Only consider low-risk options like FD or RD")
@@ -58,27 +78,21 @@ class SafetyAgent:
                 warnings.append("Priority: Build emergency fund before investing")
         
         # Rule 3: Check affordability
-        if "save" in response.lower() or "invest" in response.lower():
+        if "save" in text or "invest" in text:
             surplus = user_profile.get("monthly_surplus", 0)
             if surplus < 1000:
                 warnings.append("Focus on essentials first given your current surplus")
         
         # Rule 4: Income stability check for gig workers
         if user_profile.get("income_type") == "gig":
-            if "sip" in response.lower() or "recurring" in response.lower():
+            if "sip" in text or "recurring" in text:
                 warnings.append("Consider flexible savings given variable income")
         
-        # Rule 5: Always add disclaimer for advice
-        if any(word in response.lower() for word in ["suggest", "recommend", "should", "advice"]):
-            if self.disclaimer not in response:
-                modified = response + f"\n\n{self.disclaimer}"
-        
-        return SafetyCheck(
-            is_safe=True,
-            modified_response=modified,
-            warnings_added=warnings,
-            blocked_reason=None
-        )
+        return warnings
+    
+    def stream(self, user_profile: dict, recommendation_type: Optional[str] = None) -> "SafetyStream":
+        """Incremental checker for a response that arrives in chunks"""
+        return SafetyStream(self, user_profile, recommendation_type)
     
     def log_decision(self, user_id: str, check_result: SafetyCheck, context: dict):
         """Log all safety decisions for audit trail"""
@@ -93,3 +107,41 @@ class SafetyAgent:
         }
         # db.safety_logs.insert(log_entry)
         return log_entry
+
+
+class SafetyStream:
+    """
+    Applies SafetyAgent rules while a response is streamed.
+    feed() returns warnings as soon as the text so far triggers them;
+    finish() runs the full check and exposes the trailing disclaimer as `suffix`.
+    """
+    
+    def __init__(self, agent: SafetyAgent, user_profile: dict, recommendation_type: Optional[str] = None):
+        self.agent = agent
+        self.user_profile = user_profile
+        self.recommendation_type = recommendation_type
+        self.blocked = recommendation_type in agent.BLOCKED_RECOMMENDATIONS
+        self.text = ""
+        self.suffix = ""
+        self._emitted = []
+        # Keywords can straddle chunk boundaries, so only rescan the tail
+        self._tail = max(len(w) for w in agent.WARNING_KEYWORDS) - 1
+    
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk; returns any warnings that became applicable"""
+        scan_from = max(0, len(self.text) - self._tail)
+        self.text += chunk
+        if self.blocked or not chunk:
+            return []
+        window = self.text[scan_from:].lower()
+        if not any(w in window for w in self.agent.WARNING_KEYWORDS):
+            return []
+        new = [w for w in self.agent._warnings(self.text, self.user_profile) if w not in self._emitted]
+        self._emitted.extend(new)
+        return new
+    
+    def finish(self) -> SafetyCheck:
+        result = self.agent.check(self.text, self.user_profile, self.recommendation_type)
+        if result.modified_response and result.modified_response.startswith(self.text):
+            self.suffix = result.modified_response[len(self.text):]
+        return result
@@ -0,0 +1,131 @@
+"""
+Load benchmark: request latency with blocking vs executor-backed DB calls.
+
+Simulates many concurrent chat-style requests against a seeded SQLite DB.
+Most requests read user state and then await a short simulated network call;
+some are heavy writes. In "blocking" mode DB work runs directly on the event
+loop (the old behaviour); in "async" mode it goes through database.aio.
+
+Usage (from backend/):
+    python benchmarks/bench_async_db.py --clients 50 --requests 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FUNDPAL_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_async.db"))
+
+from database.schema import init_db
+from database.connection import get_db_connection
+from database.aio import run_in_db
+from database.queries import read_user_state
+from database.ledger import reconcile_balances
+
+USER_ID = "bench_user"
+
+
+def seed(rows: int):
+    conn = get_db_connection()
+    conn.execute("INSERT OR IGNORE INTO users (id) VALUES (?)", (USER_ID,))
+    conn.executemany(
+        "INSERT INTO transactions (id, user_id, type, amount, category, transaction_date) VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (f"seed_{i}", USER_ID, "income" if i % 10 == 0 else "expense", random.uniform(10, 5000), "Food", "2024-01-01")
+            for i in range(rows)
+        ]
+    )
+    conn.commit()
+    reconcile_balances(conn)
+    conn.close()
+
+
+def heavy_write(conn, batch: int, tag: str):
+    conn.executemany(
+        "INSERT INTO transactions (id, user_id, type, amount, category, transaction_date) VALUES (?, ?, 'expense', ?, 'Food', '2024-01-02')",
+        [(f"{tag}_{i}", USER_ID, 1.0) for i in range(batch)]
+    )
+
+
+async def call_db(mode: str, fn, *args):
+    if mode == "async":
+        return await run_in_db(fn, *args)
+    # Old behaviour: sqlite work straight on the event loop
+    conn = get_db_connection()
+    try:
+        result = fn(conn, *args)
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+async def client(mode: str, client_id: int, requests: int, write_ratio: float, batch: int, latencies: dict):
+    for n in range(requests):
+        is_write = random.random() < write_ratio
+        start = time.perf_counter()
+        if is_write:
+            await call_db(mode, heavy_write, batch, f"{mode}_{client_id}_{n}")
+        else:
+            await call_db(mode, read_user_state, USER_ID)
+            await asyncio.sleep(0.002)  # Simulated downstream call (LLM, quotes, ...)
+        latencies["write" if is_write else "read"].append((time.perf_counter() - start) * 1000)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(mode: str, args) -> dict:
+    latencies = {"read": [], "write": []}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(mode, i, args.requests, args.write_ratio, args.write_rows, latencies)
+        for i in range(args.clients)
+    ])
+    elapsed = time.perf_counter() - start
+    total = len(latencies["read"]) + len(latencies["write"])
+    return {
+        "mode": mode,
+        "requests": total,
+        "rps": round(total / elapsed, 1),
+        "read_p50_ms": round(percentile(latencies["read"], 50), 2),
+        "read_p99_ms": round(percentile(latencies["read"], 99), 2),
+        "write_p99_ms": round(percentile(latencies["write"], 99), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="Requests per client")
+    parser.add_argument("--write-ratio", type=float, default=0.1)
+    parser.add_argument("--write-rows", type=int, default=2000, help="Rows per heavy write")
+    parser.add_argument("--seed-rows", type=int, default=20000)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    init_db()
+    seed(args.seed_rows)
+
+    results = [asyncio.run(run(mode, args)) for mode in ("blocking", "async")]
+    for r in results:
+        print(f"{r['mode']:>8}: {r['requests']} req, {r['rps']} req/s, "
+              f"read p50 {r['read_p50_ms']} ms, read p99 {r['read_p99_ms']} ms, write p99 {r['write_p99_ms']} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
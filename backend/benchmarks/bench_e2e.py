@@ -0,0 +1,398 @@
+"""
+End-to-end API throughput: concurrent synthetic users against the whole app.
+
+Seeds a database with users (profile, ~3 months of transactions, a few
+holdings, a stored insight), then drives the FastAPI app in-process through
+httpx's ASGI transport. Each user sends `--requests` requests, picking the
+endpoint from `--mix`:
+
+- chat         POST /api/api/chat (observer, planner, coach, safety)
+- chat_stream  POST /api/api/chat/stream (stages include time to the first event)
+- dashboard    GET /api/dashboard, replaying the last ETag like a browser
+- insights     GET /api/insights
+- portfolio    GET /api/portfolio
+- bills        POST /api/bills/pay
+
+The LLM is the fake provider (agents/llm.py) and quotes come from the fixture
+provider, both with configurable latency, so the numbers are the app's own
+overhead plus whatever model/network delay you ask for. Reports requests/sec,
+p50/p95/p99 per endpoint, a per-stage breakdown of chat turns and the worst
+event-loop stall. `--json` stores the run; `--compare` diffs against an older
+one and `--max-regression` turns that into a pass/fail check.
+
+Usage (from backend/):
+    python benchmarks/bench_e2e.py --users 50 --requests 20 --json e2e.json
+    python benchmarks/bench_e2e.py --compare e2e.json --max-regression 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FUNDPAL_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_e2e.db"))
+# Offline providers; background jobs off so they don't compete with the measured requests
+os.environ.setdefault("FUNDPAL_LLM_PROVIDER", "fake")
+os.environ.setdefault("FUNDPAL_QUOTE_PROVIDER", "fixture")
+os.environ.setdefault("FUNDPAL_PRICE_REFRESH_INTERVAL", "0")
+os.environ.setdefault("FUNDPAL_INSIGHTS_INTERVAL", "0")
+
+DEFAULT_MIX = "chat=4,dashboard=3,insights=2,portfolio=2,bills=1"
+ENDPOINTS = ("chat", "chat_stream", "dashboard", "insights", "portfolio", "bills")
+CATEGORIES = ["Food", "Transport", "Rent", "Utilities", "Entertainment", "Shopping", "Health"]
+SYMBOLS = ["NIFTYBEES.NS", "GOLDBEES.NS", "LIQUIDBEES.NS"]
+CHAT_MESSAGES = [
+    "spent 250 on lunch",
+    "paid 1200 for electricity bill",
+    "got 5000 from freelance work",
+    "how am I doing this month?",
+    "can I afford a new phone?",
+    "should I start saving for an emergency fund?",
+    "I want to invest 5000 in SIP for a car in 3 years",
+]
+HEARTBEAT = 0.005
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def summarize(latencies) -> dict:
+    return {
+        "count": len(latencies),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(max(latencies, default=0), 2),
+    }
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown endpoint {name!r} (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix has no positive weights")
+    return mix
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def seed(users: int, txns_per_user: int, rng: random.Random):
+    from database.connection import get_db_connection
+    from database.ids import new_id
+    from database.ledger import insert_transactions
+    from database.queries import write_user_profile
+    from database.trades import apply_fill, record_fill
+    from services.insights import read_watermark, write_insight
+
+    conn = get_db_connection()
+    start = date.today() - timedelta(days=90)
+    for i in range(users):
+        user_id = f"bench_{i}"
+        write_user_profile(conn, user_id, {
+            "income_type": "salaried", "income_pattern": "monthly",
+            "monthly_income_min": 40000, "monthly_income_max": 60000,
+            "monthly_rent": 12000, "age_group": "26-35", "primary_goal": "emergency_fund",
+        })
+        rows = [{"id": new_id("txn"), "type": "income", "amount": 50000, "category": "Salary",
+                 "transaction_date": (start + timedelta(days=30 * m)).isoformat()} for m in range(4)]
+        rows += [{
+            "id": new_id("txn"),
+            "type": "expense",
+            "amount": round(rng.uniform(50, 3000), 2),
+            "category": rng.choice(CATEGORIES),
+            "transaction_date": (start + timedelta(days=rng.randint(0, 90))).isoformat(),
+        } for _ in range(txns_per_user)]
+        cursor = conn.cursor()
+        insert_transactions(cursor, user_id, rows, logged_via="seed")
+        for symbol in SYMBOLS:
+            quantity, price = rng.randint(1, 50), round(rng.uniform(50, 500), 2)
+            record_fill(cursor, user_id, symbol, "BUY", quantity, price)
+            apply_fill(cursor, user_id, symbol, "BUY", quantity, price)
+        write_insight(conn, user_id, "You spend most on Food; a weekly cap would help.", read_watermark(conn, user_id))
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+class StageTimer:
+    """Wraps orchestrator stages so each call's duration is recorded under a name"""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    def wrap(self, owner, attr: str, name: str):
+        original = getattr(owner, attr)
+        if asyncio.iscoroutinefunction(original):
+            @functools.wraps(original)
+            async def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    self.samples[name].append((time.perf_counter() - start) * 1000)
+        else:
+            @functools.wraps(original)
+            def timed(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return original(*args, **kwargs)
+                finally:
+                    self.samples[name].append((time.perf_counter() - start) * 1000)
+        setattr(owner, attr, timed)
+
+    def wrap_stream(self, owner, attr: str, name: str):
+        """Async generator: records time to the first item and to the end"""
+        original = getattr(owner, attr)
+
+        @functools.wraps(original)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            first = True
+            async for item in original(*args, **kwargs):
+                if first:
+                    self.samples[f"{name}.first_event"].append((time.perf_counter() - start) * 1000)
+                    first = False
+                yield item
+            self.samples[name].append((time.perf_counter() - start) * 1000)
+        setattr(owner, attr, timed)
+
+    def instrument(self, orchestrator):
+        # Nested: understand = max(parse, state, profile); process = understand + plan_turn + coach + safety
+        # (chat.state also times the state refresh after a logged transaction)
+        self.wrap(orchestrator, "process_message", "chat.process_message")
+        self.wrap_stream(orchestrator, "stream_message", "chat.stream_message")
+        self.wrap(orchestrator, "_understand", "chat.understand")
+        self.wrap(orchestrator.observer, "parse", "chat.understand.parse")
+        self.wrap(sys.modules[type(orchestrator).__module__], "get_user_state", "chat.state")
+        self.wrap(orchestrator, "_plan_turn", "chat.plan_turn")
+        self.wrap(orchestrator.coach, "generate_response", "chat.coach")
+        self.wrap(orchestrator.safety, "check", "chat.safety")
+
+    def report(self) -> dict:
+        return {name: summarize(values) for name, values in sorted(self.samples.items())}
+
+
+async def request(client, endpoint: str, user_id: str, rng: random.Random, etags: dict):
+    """Send one request; returns the HTTP status"""
+    if endpoint == "chat":
+        r = await client.post("/api/api/chat", params={"user_id": user_id},
+                              json={"message": rng.choice(CHAT_MESSAGES)})
+        return r.status_code
+    if endpoint == "chat_stream":
+        # ASGITransport buffers the body, so time to first event comes from the stage timer
+        r = await client.post("/api/api/chat/stream", params={"user_id": user_id},
+                              json={"message": rng.choice(CHAT_MESSAGES)})
+        return r.status_code
+    if endpoint == "dashboard":
+        headers = {"If-None-Match": etags[user_id]} if user_id in etags else {}
+        r = await client.get("/api/dashboard", params={"user_id": user_id}, headers=headers)
+        if "etag" in r.headers:
+            etags[user_id] = r.headers["etag"]
+        return r.status_code
+    if endpoint == "insights":
+        r = await client.get("/api/insights", params={"user_id": user_id})
+        return r.status_code
+    if endpoint == "portfolio":
+        r = await client.get("/api/portfolio", params={"user_id": user_id})
+        return r.status_code
+    r = await client.post("/api/bills/pay", params={"user_id": user_id},
+                          json={"biller_name": "City Power", "amount": round(rng.uniform(100, 2000), 2),
+                                "bill_type": "electricity"})
+    return r.status_code
+
+
+async def user_session(client, user_id: str, args, rng: random.Random, results: dict, etags: dict):
+    names, weights = zip(*args.mix.items())
+    for _ in range(args.requests):
+        endpoint = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            status = await request(client, endpoint, user_id, rng, etags)
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - start) * 1000
+        results[endpoint]["latencies"].append(elapsed)
+        results[endpoint]["statuses"][str(status)] += 1
+        if args.think:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think))
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append((time.perf_counter() - start - HEARTBEAT) * 1000)
+
+
+async def run(args) -> dict:
+    import httpx
+    from main import app
+    from routes.chat import orchestrator
+
+    stages = StageTimer()
+    stages.instrument(orchestrator)
+    results = defaultdict(lambda: {"latencies": [], "statuses": Counter()})
+    etags, lags, stop = {}, [], asyncio.Event()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        if args.warmup:
+            warm = argparse.Namespace(**{**vars(args), "requests": args.warmup, "think": 0})
+            await asyncio.gather(*[user_session(client, f"bench_{i}", warm, random.Random(-i - 1),
+                                                defaultdict(lambda: {"latencies": [], "statuses": Counter()}),
+                                                etags)
+                                   for i in range(args.users)])
+            stages.samples.clear()
+
+        beat = asyncio.create_task(heartbeat(stop, lags))
+        start = time.perf_counter()
+        await asyncio.gather(*[user_session(client, f"bench_{i}", args, random.Random(args.seed + i), results, etags)
+                               for i in range(args.users)])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await beat
+
+    endpoints = {}
+    for name, data in sorted(results.items()):
+        endpoints[name] = {
+            **summarize(data["latencies"]),
+            "rps": round(len(data["latencies"]) / elapsed, 1),
+            "statuses": dict(data["statuses"]),
+        }
+    everything = [ms for data in results.values() for ms in data["latencies"]]
+    errors = sum(n for data in results.values() for status, n in data["statuses"].items()
+                 if not status.isdigit() or int(status) >= 400)
+    cache = orchestrator.coach.cache
+    return {
+        "total": {**summarize(everything), "rps": round(len(everything) / elapsed, 1),
+                  "elapsed_s": round(elapsed, 2), "errors": errors},
+        "endpoints": endpoints,
+        "stages": stages.report(),
+        "max_loop_stall_ms": round(max(lags, default=0), 1),
+        "coach_cache": cache.stats() if cache is not None else {"enabled": False},
+    }
+
+
+def print_report(report: dict):
+    total = report["total"]
+    print(f"\n{total['count']} requests in {total['elapsed_s']:.2f} s: {total['rps']:.1f} req/s, "
+          f"p50 {total['p50_ms']:.1f} ms  p95 {total['p95_ms']:.1f} ms  p99 {total['p99_ms']:.1f} ms  "
+          f"errors {total['errors']}  max loop stall {report['max_loop_stall_ms']:.1f} ms")
+    print(f"\n{'endpoint':<34}{'count':>7}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}  statuses")
+    for name, e in report["endpoints"].items():
+        print(f"{name:<34}{e['count']:>7}{e['rps']:>9.1f}{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}  "
+              f"{e['statuses']}")
+    if report["stages"]:
+        print(f"\n{'chat stage':<34}{'count':>7}{'':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+        for name, s in report["stages"].items():
+            print(f"{name:<34}{s['count']:>7}{'':>9}{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}")
+
+
+def compare(old: dict, new: dict, max_regression: float) -> list:
+    """Print old vs new per endpoint; return the regressions past max_regression"""
+    def change(before, after):
+        return (after - before) / before if before else 0.0
+
+    regressions = []
+    print(f"\nvs {old.get('commit') or 'previous run'} ({old.get('timestamp', '?')})")
+    changed = sorted(k for k in set(old.get("args", {})) | set(new["args"])
+                     if old.get("args", {}).get(k) != new["args"].get(k))
+    if changed:
+        print(f"  note: runs differ in {', '.join(changed)}; numbers are not like for like")
+    print(f"{'endpoint':<16}{'req/s':>22}{'p50 ms':>22}{'p95 ms':>22}{'p99 ms':>22}")
+    rows = [("total", old["report"]["total"], new["report"]["total"])]
+    rows += [(name, old["report"]["endpoints"][name], e) for name, e in new["report"]["endpoints"].items()
+             if name in old["report"]["endpoints"]]
+    for name, before, after in rows:
+        cells = []
+        for key in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            delta = change(before[key], after[key])
+            cells.append(f"{before[key]:.1f} -> {after[key]:.1f} ({delta:+.0%})")
+            # Throughput regresses downwards, latency upwards; p50/p99 are informational
+            worse = -delta if key == "rps" else delta
+            if max_regression is not None and key in ("rps", "p95_ms") and worse > max_regression:
+                regressions.append(f"{name} {key} {before[key]:.1f} -> {after[key]:.1f} ({delta:+.0%})")
+        print(f"{name:<16}" + "".join(f"{c:>22}" for c in cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent synthetic users")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per user")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Endpoint weights (default {DEFAULT_MIX}; also chat_stream)")
+    parser.add_argument("--txns", type=int, default=200, help="Seeded expense transactions per user")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds the fake LLM takes per call")
+    parser.add_argument("--quote-latency", type=float, default=0.0, help="Seconds the fixture quote provider takes per batch")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean seconds a user waits between requests")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured requests per user first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Previous --json output to compare against")
+    parser.add_argument("--max-regression", type=float,
+                        help="With --compare: exit 1 if req/s or p95 is this much worse (0.2 = 20%%)")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's DEBUG output")
+    args = parser.parse_args()
+
+    # Read once at import, so set before the app is loaded
+    os.environ["FUNDPAL_LLM_FAKE_LATENCY"] = str(args.llm_latency)
+    os.environ["FUNDPAL_QUOTE_FIXTURE_LATENCY"] = str(args.quote_latency)
+
+    from database.schema import init_db
+    init_db()
+    seed(args.users, args.txns, random.Random(args.seed))
+
+    print(f"{args.users} users x {args.requests} requests, mix {args.mix}, "
+          f"LLM {os.environ['FUNDPAL_LLM_PROVIDER']} ({args.llm_latency} s), quotes {args.quote_latency} s")
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        report = asyncio.run(run(args))
+    print_report(report)
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("json", "compare", "max_regression", "verbose")},
+        "report": report,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        regressions = compare(previous, result, args.max_regression)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Throughput of the bulk statement importer (rows/sec).
+
+Writes a synthetic CSV statement to a temp file, then measures:
+- row-by-row: insert_transaction + commit per row (what N chat/bill requests cost), on a sample
+- import: TransactionImporter over the whole file (chunked executemany)
+- re-import: the same file again, every row detected as a duplicate
+
+Usage (from backend/):
+    python benchmarks/bench_import.py --rows 100000 --chunk-size 1000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FUNDPAL_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_import.db"))
+
+from database.schema import init_db
+from database.connection import get_db_connection
+from database.ledger import insert_transaction
+from services.importer import TransactionImporter
+
+NARRATIONS = [
+    ("UPI/ZOMATO/{n}", "debit"), ("UPI/SWIGGY/{n}", "debit"), ("UBER TRIP {n}", "debit"),
+    ("NETFLIX.COM", "debit"), ("AMAZON PAY {n}", "debit"), ("ELECTRICITY BILL {n}", "debit"),
+    ("RENT TRANSFER", "debit"), ("APOLLO PHARMACY {n}", "debit"), ("POS {n} KIRANA STORE", "debit"),
+    ("SALARY CREDIT", "credit"), ("FREELANCE CLIENT {n}", "credit"), ("INTEREST CREDIT", "credit"),
+]
+
+
+def write_statement(path: str, rows: int):
+    start = date(2023, 1, 1)
+    with open(path, "w") as f:
+        f.write("Txn Date,Narration,Withdrawal Amt,Deposit Amt\n")
+        for i in range(rows):
+            narration, side = random.choice(NARRATIONS)
+            day = (start + timedelta(days=i * 365 // max(rows, 1))).strftime("%d/%m/%Y")
+            amount = f"{random.uniform(20, 5000):.2f}"
+            debit, credit = (amount, "") if side == "debit" else ("", amount)
+            f.write(f"{day},{narration.format(n=i)},{debit},{credit}\n")
+
+
+def row_by_row(sample: int) -> float:
+    conn = get_db_connection()
+    start = time.perf_counter()
+    for i in range(sample):
+        insert_transaction(conn.cursor(), "bench_rowwise", "expense", 100.0, category="Food",
+                           description=f"row {i}", transaction_date="2024-01-01", txn_id=f"rw_{i}")
+        conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return sample / elapsed
+
+
+def run_import(path: str, user_id: str, chunk_size: int) -> dict:
+    importer = TransactionImporter(chunk_size=chunk_size)
+    with open(path, "rb") as f:
+        return importer.import_file(user_id, f, filename=path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--rowwise-sample", type=int, default=2000)
+    args = parser.parse_args()
+
+    init_db()
+    path = os.path.join(tempfile.mkdtemp(), "statement.csv")
+    write_statement(path, args.rows)
+    print(f"Statement: {args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB")
+
+    print(f"  row-by-row: {row_by_row(args.rowwise_sample):10.0f} rows/s  (sample of {args.rowwise_sample})")
+    first = run_import(path, "bench_user", args.chunk_size)
+    print(f"      import: {first['rows_per_sec']:10.0f} rows/s  "
+          f"({first['inserted']} inserted, {first['chunks']} chunks, {first['elapsed']:.2f} s)")
+    again = run_import(path, "bench_user", args.chunk_size)
+    print(f"   re-import: {again['rows_per_sec']:10.0f} rows/s  "
+          f"({again['duplicates']} duplicates, {again['inserted']} inserted)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Insights queries on a synthetic heavy user (default 100k transactions over 3 years).
+
+Category breakdown:
+- python: pull every row in the range as dicts and sum categories in a loop
+  (what /insights did, minus its LAST-50 cap that made totals wrong)
+- sql: read_category_breakdown, GROUP BY in SQLite
+Both are checked to agree, for a month, a year and all time.
+
+Recent-transactions list:
+- offset: ORDER BY ... LIMIT/OFFSET at increasing page depths
+- keyset: read_transactions_page following next_cursor
+
+Usage (from backend/):
+    python benchmarks/bench_insights_queries.py --rows 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FUNDPAL_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_insights.db"))
+
+from database.schema import init_db
+from database.connection import get_db_connection
+from database.ids import new_id
+from database.ledger import insert_transactions
+from database.queries import read_category_breakdown, read_transactions_page
+
+USER_ID = "bench_heavy"
+CATEGORIES = ["Food", "Transport", "Rent", "Utilities", "Entertainment", "Shopping", "Health", "Other"]
+PAGE_SIZE = 20
+
+
+def seed(rows: int, other_users: int):
+    conn = get_db_connection()
+    start = date.today() - timedelta(days=3 * 365)
+    for user_id, count in [(USER_ID, rows)] + [(f"bench_other_{i}", rows // 10) for i in range(other_users)]:
+        batch = [{
+            "id": new_id("txn"),
+            "type": "income" if random.random() < 0.1 else "expense",
+            "amount": round(random.uniform(20, 5000), 2),
+            "category": random.choice(CATEGORIES),
+            "transaction_date": (start + timedelta(days=random.randint(0, 3 * 365))).isoformat(),
+        } for _ in range(count)]
+        insert_transactions(conn.cursor(), user_id, batch)
+        conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+
+
+def python_breakdown(conn, start, end):
+    rows = [dict(r) for r in conn.execute("""
+        SELECT * FROM transactions
+        WHERE user_id = ? AND transaction_date >= ? AND transaction_date < ?
+    """, (USER_ID, start or "", end or "~")).fetchall()]
+    totals = {}
+    for t in rows:
+        if t["type"] == "expense":
+            cat = t.get("category") or "Other"
+            totals[cat] = totals.get(cat, 0) + t["amount"]
+    return {k: round(v, 2) for k, v in totals.items()}
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def offset_page(conn, page):
+    return [dict(r) for r in conn.execute("""
+        SELECT * FROM transactions WHERE user_id = ?
+        ORDER BY transaction_date DESC, id DESC LIMIT ? OFFSET ?
+    """, (USER_ID, PAGE_SIZE, page * PAGE_SIZE)).fetchall()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--other-users", type=int, default=20, help="Background users with rows/10 transactions each")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    init_db()
+    t0 = time.perf_counter()
+    seed(args.rows, args.other_users)
+    print(f"Seeded {args.rows} transactions for {USER_ID} (+{args.other_users} users) in {time.perf_counter() - t0:.1f} s")
+    conn = get_db_connection()
+
+    today = date.today()
+    tomorrow = (today + timedelta(days=1)).isoformat()
+    ranges = {
+        "month": (today.replace(day=1).isoformat(), tomorrow),
+        "year": ((today - timedelta(days=365)).isoformat(), tomorrow),
+        "all time": (None, None),
+    }
+    print("\nCategory breakdown (median ms)")
+    for label, (start, end) in ranges.items():
+        py_ms, py = timed(lambda: python_breakdown(conn, start, end), args.repeat)
+        sql_ms, sql = timed(lambda: read_category_breakdown(conn, USER_ID, start, end), args.repeat)
+        sql = {c["category"]: c["total"] for c in sql}
+        assert all(abs(py[k] - sql[k]) < 0.05 for k in py) and py.keys() == sql.keys(), (py, sql)
+        print(f"  {label:>8}: python {py_ms:8.2f}   sql {sql_ms:7.2f}   ({py_ms / sql_ms:5.1f}x)")
+
+    print(f"\nRecent transactions, {PAGE_SIZE} per page (median ms)")
+    cursors, cursor = {0: None}, None
+    depths = [0, 10, 100, 1000, args.rows // PAGE_SIZE - 1]
+    for page in range(max(depths) + 1):
+        if page in depths:
+            cursors[page] = cursor
+        _, cursor = read_transactions_page(conn, USER_ID, PAGE_SIZE, cursor)
+    for page in depths:
+        off_ms, off = timed(lambda: offset_page(conn, page), args.repeat)
+        key_ms, (key, _) = timed(lambda: read_transactions_page(conn, USER_ID, PAGE_SIZE, cursors[page]), args.repeat)
+        assert [r["id"] for r in off] == [r["id"] for r in key], page
+        print(f"  page {page:>5}: offset {off_ms:7.2f}   keyset {key_ms:6.2f}")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
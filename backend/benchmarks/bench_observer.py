@@ -0,0 +1,95 @@
+"""
+Accuracy and speed of the rule-based ObserverAgent fast path.
+
+Runs agents.rules over the labelled corpus in observer_corpus.jsonl and reports:
+- coverage: share of messages answered locally (no LLM call)
+- accuracy: share of local answers whose labelled fields all match
+- false claims: messages labelled for the LLM that the rules answered anyway
+- parse time per message, and the estimated median chat latency saved
+
+Usage (from backend/):
+    python benchmarks/bench_observer.py [--llm-ms 900] [--verbose]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.rules import parse_message
+from agents.observer import ObserverAgent
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "observer_corpus.jsonl")
+TODAY = date(2024, 6, 15)  # Relative dates in the corpus are labelled against this day
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def matches(parsed: dict, expected: dict) -> bool:
+    for key, value in expected.items():
+        got = parsed.get(key)
+        if isinstance(value, (int, float)) and got is not None:
+            if abs(float(got) - float(value)) > 1e-6:
+                return False
+        elif got != value:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS)
+    parser.add_argument("--llm-ms", type=float, default=900, help="Assumed LLM parse latency for the estimate")
+    parser.add_argument("--repeat", type=int, default=200, help="Timing repetitions per message")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    threshold = ObserverAgent.FAST_PATH_THRESHOLD
+
+    local, correct, false_claims, missed = 0, 0, 0, 0
+    timings = []
+    for item in corpus:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = parse_message(item["message"], today=TODAY)
+        timings.append((time.perf_counter() - start) / args.repeat * 1e6)
+
+        claimed = result is not None and result["confidence"] >= threshold
+        if claimed:
+            local += 1
+            ok = matches(result, item["expected"])
+            correct += ok
+            if not item["fast_path"]:
+                false_claims += 1
+            if args.verbose and (not ok or not item["fast_path"]):
+                print(f"  MISMATCH {item['message']!r}: got {result}, expected {item['expected']}")
+        elif item["fast_path"]:
+            missed += 1
+            if args.verbose:
+                print(f"  MISSED   {item['message']!r}: got {result}")
+
+    total = len(corpus)
+    eligible = sum(1 for item in corpus if item["fast_path"])
+    coverage = local / total
+    print(f"Corpus: {total} messages ({eligible} labelled as fast-path eligible)")
+    print(f"Coverage: {local}/{total} answered locally ({coverage:.0%}), {missed} eligible messages missed")
+    print(f"Accuracy: {correct}/{local} local answers match labels ({(correct / local if local else 0):.0%})")
+    print(f"False claims: {false_claims} messages that should have gone to the LLM")
+    print(f"Parse time: median {statistics.median(timings):.1f} us, max {max(timings):.1f} us per message")
+
+    # Median chat latency is dominated by the parse call when most traffic is simple logging
+    llm_calls_saved = coverage
+    print(f"LLM parse calls avoided: {llm_calls_saved:.0%} "
+          f"(~{args.llm_ms * llm_calls_saved:.0f} ms saved per message on average at {args.llm_ms:.0f} ms/LLM call)")
+
+
+if __name__ == "__main__":
+    main()
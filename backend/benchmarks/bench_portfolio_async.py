@@ -0,0 +1,108 @@
+"""
+Concurrent trades: sync PortfolioService calls on the event loop vs the async API.
+
+Many clients place buys at once while quotes come from the fixture provider
+with simulated network latency (every symbol is new, so every trade misses
+the quote cache). In "sync" mode handlers call execute_buy directly, as the
+routes used to; in "async" mode they await aexecute_buy. A heartbeat task
+measures how long the event loop is stalled, i.e. how long any other request
+on the worker would wait.
+
+Usage (from backend/):
+    python benchmarks/bench_portfolio_async.py --clients 20 --trades 5 --latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FUNDPAL_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_portfolio.db"))
+
+from database.schema import init_db
+from database.connection import get_db_connection
+from database.ledger import insert_transaction
+from services.market_data import MarketDataService
+from services.portfolio import PortfolioService
+from services.quotes import FixtureProvider, QuoteCache
+
+HEARTBEAT = 0.005
+
+
+def seed(clients: int):
+    conn = get_db_connection()
+    for i in range(clients):
+        insert_transaction(conn.cursor(), f"bench_{i}", "income", 1_000_000, category="Salary")
+    conn.commit()
+    conn.close()
+
+
+async def heartbeat(stop: asyncio.Event, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT)
+        lags.append((time.perf_counter() - start - HEARTBEAT) * 1000)
+
+
+async def client(service: PortfolioService, mode: str, client_id: int, trades: int, latencies: list):
+    for n in range(trades):
+        symbol = f"{mode.upper()}{client_id}X{n}.NS"
+        start = time.perf_counter()
+        if mode == "async":
+            result = await service.aexecute_buy(f"bench_{client_id}", symbol, 1)
+        else:
+            result = service.execute_buy(f"bench_{client_id}", symbol, 1)
+        assert result["status"] == "success", result
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] if ordered else 0.0
+
+
+async def run(mode: str, args) -> dict:
+    service = PortfolioService()
+    service.market_data = MarketDataService(QuoteCache(FixtureProvider(latency=args.latency)))
+    latencies, lags, stop = [], [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*[client(service, mode, i, args.trades, latencies) for i in range(args.clients)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return {
+        "mode": mode,
+        "trades": len(latencies),
+        "elapsed_s": round(elapsed, 2),
+        "trades_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_loop_stall_ms": round(max(lags, default=0), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--trades", type=int, default=5, help="Trades per client")
+    parser.add_argument("--latency", type=float, default=0.1, help="Simulated seconds per quote fetch")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    init_db()
+    seed(args.clients)
+    results = [asyncio.run(run(mode, args)) for mode in ("sync", "async")]
+    for r in results:
+        print(f"{r['mode']:>5}: {r['trades']} trades in {r['elapsed_s']:6.2f} s ({r['trades_per_sec']:6.1f}/s)  "
+              f"p50 {r['p50_ms']:7.1f} ms  p99 {r['p99_ms']:7.1f} ms  max loop stall {r['max_loop_stall_ms']:7.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
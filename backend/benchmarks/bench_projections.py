@@ -0,0 +1,90 @@
+"""
+Latency of plan projections: the old per-horizon loop vs ProjectionEngine.
+
+Reports, per configuration, the median and p95 time of:
+- the old deterministic projection (one Python call per horizon)
+- ProjectionEngine.deterministic (all horizons in one pass)
+- ProjectionEngine.simulate (Monte Carlo, paths x months)
+- AllocationAgent.generate_plan end to end (fixture quotes, so no network)
+
+Usage (from backend/):
+    python benchmarks/bench_projections.py [--paths 10000] [--years 10] [--budget-ms 100]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FUNDPAL_QUOTE_PROVIDER", "fixture")
+
+from services.projections import ProjectionEngine
+from agents.allocation import AllocationAgent
+
+ALLOCATION = {"Equity": 0.4, "MidCap": 0.3, "Gold": 0.2, "Debt": 0.1}
+OLD_RETURNS = {
+    "Liquid": 0.05, "Debt": 0.07, "Hybrid": 0.10, "Equity": 0.12,
+    "MidCap": 0.14, "Gold": 0.08, "FD": 0.065, "Income_Funds": 0.075
+}
+
+
+def old_projection(monthly_amount, allocation, years):
+    """The previous AllocationAgent._calculate_projection"""
+    weighted_return = 0
+    for asset, pct in allocation.items():
+        expected_returns = dict(OLD_RETURNS)  # rebuilt per asset, as before
+        weighted_return += expected_returns.get(asset, 0.06) * pct
+    monthly_rate = weighted_return / 12
+    months = years * 12
+    return round(monthly_amount * ((((1 + monthly_rate) ** months) - 1) / monthly_rate) * (1 + monthly_rate))
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=ProjectionEngine.DEFAULT_PATHS)
+    parser.add_argument("--years", type=int, default=10, help="Longest horizon simulated")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--budget-ms", type=float, default=100, help="Inline chat budget for a full plan")
+    args = parser.parse_args()
+
+    engine = ProjectionEngine(seed=42)
+    agent = AllocationAgent()
+    horizons = sorted({3, 5, args.years})
+    profile = {"age_group": "26-35", "monthly_income_min": 50000, "risk_tolerance": "moderate"}
+    agent.prefetch_prices()  # Fixture quotes, warmed once
+
+    results = [
+        ("old deterministic", timed(lambda: [old_projection(5000, ALLOCATION, y) for y in horizons], args.repeat * 10)),
+        ("engine deterministic", timed(lambda: engine.deterministic(5000, ALLOCATION, horizons), args.repeat * 10)),
+        (f"monte carlo {args.paths}x{args.years * 12}",
+         timed(lambda: engine.simulate(5000, ALLOCATION, horizons, paths=args.paths), args.repeat)),
+        ("generate_plan (end to end)",
+         timed(lambda: agent.generate_plan(profile, {}, amount_override=5000, goal="Car", duration=7), args.repeat)),
+    ]
+    for name, (p50, p95) in results:
+        print(f"{name:>32}: p50 {p50:8.3f} ms   p95 {p95:8.3f} ms")
+
+    plan_p95 = results[-1][1][1]
+    verdict = "within" if plan_p95 <= args.budget_ms else "OVER"
+    print(f"generate_plan p95 {plan_p95:.1f} ms is {verdict} the {args.budget_ms:.0f} ms inline budget")
+
+    sim = engine.simulate(5000, ALLOCATION, horizons, paths=args.paths)
+    for years, band in sim["horizons"].items():
+        print(f"  {years:>2}y: expected ₹{band['expected']:,.0f}  P10 ₹{band['p10']:,.0f}  "
+              f"P50 ₹{band['p50']:,.0f}  P90 ₹{band['p90']:,.0f}")
+    print(f"  P(gain after {sim['goal_years']}y) = {sim['probability']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
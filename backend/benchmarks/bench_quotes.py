@@ -0,0 +1,81 @@
+"""
+Portfolio valuation cost: per-symbol quote calls vs one batched, cached fetch.
+
+Seeds a portfolio with N holdings and marks it to market through
+PortfolioService.refresh_valuations (the background price refresher) using
+a FixtureProvider that sleeps `--latency` per provider call (a stand-in for one
+network round trip). "sequential" mimics the old behaviour, one call per
+holding; "batched" is the QuoteCache path, cold and then warm.
+
+Usage (from backend/):
+    python benchmarks/bench_quotes.py --holdings 20 --latency 0.08
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("FUNDPAL_DB_PATH", os.path.join(tempfile.mkdtemp(), "bench_quotes.db"))
+
+from database.schema import init_db
+from database.connection import get_db_connection
+from services.quotes import FixtureProvider, QuoteCache
+from services.market_data import MarketDataService
+from services.portfolio import PortfolioService
+
+USER_ID = "bench_user"
+
+
+def seed(holdings: int):
+    conn = get_db_connection()
+    conn.execute("INSERT OR IGNORE INTO users (id) VALUES (?)", (USER_ID,))
+    conn.executemany(
+        "INSERT INTO portfolio (id, user_id, symbol, quantity, average_buy_price, current_value) VALUES (?, ?, ?, ?, ?, ?)",
+        [(f"pf_{i}", USER_ID, f"SYM{i}.NS", 10, 100.0, 1000.0) for i in range(holdings)]
+    )
+    conn.commit()
+    conn.close()
+
+
+class SequentialCache(QuoteCache):
+    """Old behaviour: no cache, one provider round trip per symbol"""
+
+    def get_many(self, symbols):
+        prices = {}
+        for symbol in symbols:
+            prices.update(self.provider.fetch([symbol]))
+        return prices
+
+
+def value(cache) -> tuple:
+    service = PortfolioService()
+    service.market_data = MarketDataService(quotes=cache)
+    start = time.perf_counter()
+    service.refresh_valuations()
+    return (time.perf_counter() - start) * 1000, cache.provider.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--holdings", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.08, help="Seconds per provider call")
+    args = parser.parse_args()
+
+    init_db()
+    seed(args.holdings)
+
+    sequential = SequentialCache(FixtureProvider(latency=args.latency))
+    batched = QuoteCache(FixtureProvider(latency=args.latency), ttl=60)
+
+    ms, calls = value(sequential)
+    print(f"sequential:    {ms:8.1f} ms, {calls} provider calls")
+    ms, calls = value(batched)
+    print(f"batched cold:  {ms:8.1f} ms, {calls} provider calls")
+    ms, calls = value(batched)
+    print(f"batched warm:  {ms:8.1f} ms, {calls} provider calls total")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+Test environment, set before any test module imports the app: the database
+path and provider settings are read once at import time.
+"""
+import os
+import tempfile
+
+os.environ["FUNDPAL_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "fundpal_test.db")
+os.environ["FUNDPAL_LLM_PROVIDER"] = "fake"  # agents are built at import; no API key or network
+os.environ["FUNDPAL_QUOTE_PROVIDER"] = "fixture"
+os.environ["FUNDPAL_PRICE_REFRESH_INTERVAL"] = "0"
+os.environ["FUNDPAL_INSIGHTS_INTERVAL"] = "0"
@@ -0,0 +1,60 @@
+"""
+Async access to the SQLite pool.
+
+sqlite3 calls block, so async code must not run them on the event loop.
+run_in_db() ships a function to a dedicated thread pool (one thread per
+pooled connection), hands it a connection, and commits or rolls back.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from database.connection import POOL_SIZE, get_pool
+
+_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="fundpal-db")
+
+
+def _run(fn: Callable, args: tuple, kwargs: dict):
+    conn = get_pool().acquire()
+    try:
+        result = fn(conn, *args, **kwargs)
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+async def run_in_db(fn: Callable, *args, **kwargs) -> Any:
+    """Run fn(conn, *args, **kwargs) on the DB thread pool and await its result"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(_run, fn, args, kwargs))
+
+
+def _fetch_one(conn, sql: str, params: Sequence) -> Optional[Dict[str, Any]]:
+    row = conn.execute(sql, params).fetchone()
+    return dict(row) if row else None
+
+
+def _fetch_all(conn, sql: str, params: Sequence) -> List[Dict[str, Any]]:
+    return [dict(row) for row in conn.execute(sql, params).fetchall()]
+
+
+def _execute(conn, sql: str, params: Sequence) -> int:
+    return conn.execute(sql, params).rowcount
+
+
+async def fetch_one(sql: str, params: Sequence = ()) -> Optional[Dict[str, Any]]:
+    return await run_in_db(_fetch_one, sql, params)
+
+
+async def fetch_all(sql: str, params: Sequence = ()) -> List[Dict[str, Any]]:
+    return await run_in_db(_fetch_all, sql, params)
+
+
+async def execute(sql: str, params: Sequence = ()) -> int:
+    """Run a single write statement and commit. Returns the affected row count."""
+    return await run_in_db(_execute, sql, params)
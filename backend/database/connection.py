@@ -0,0 +1,207 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+DB_PATH = os.getenv("FUNDPAL_DB_PATH", "fundpal.db")
+POOL_SIZE = int(os.getenv("FUNDPAL_DB_POOL_SIZE", "8"))
+BUSY_TIMEOUT = float(os.getenv("FUNDPAL_DB_BUSY_TIMEOUT", "10"))
+
+# Applied to every new connection. WAL lets readers proceed while a writer
+# holds the lock, and synchronous=NORMAL is durable enough under WAL.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,  # ~16 MB page cache per connection
+    "mmap_size": 268435456,  # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": int(BUSY_TIMEOUT * 1000),
+}
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Open a raw connection with the standard FundPal pragmas applied"""
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS.items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+def begin_immediate(conn):
+    """
+    Start the transaction by taking the write lock now (BEGIN IMMEDIATE) rather
+    than at the first write, so a check-then-write sequence can't interleave
+    with another writer and won't fail to upgrade its read lock under WAL.
+    No-op if a transaction is already open.
+    """
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pooled sqlite3 connection.
+    Behaves like a normal connection, except close() hands it back to the pool.
+    As a context manager the outermost block commits or rolls back; a nested
+    block (a nested acquire on the same thread) is a SAVEPOINT, so it only
+    undoes its own writes on error.
+    """
+
+    def __init__(self, pool: "ConnectionPool", conn: sqlite3.Connection, owner: int):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_depth", 1)
+        # Thread that acquired it; nested acquires on that thread share it
+        object.__setattr__(self, "_owner", owner)
+        # One entry per open `with` block: its savepoint name, or None for the outermost
+        object.__setattr__(self, "_savepoints", [])
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __setattr__(self, name, value):
+        # e.g. conn.row_factory = dict_factory
+        setattr(self._conn, name, value)
+
+    def __enter__(self):
+        savepoint = None
+        if self._depth > 1:
+            # Keep the outer block's transaction open: a bare SAVEPOINT would start
+            # one that its RELEASE commits
+            if not self._conn.in_transaction:
+                self._conn.execute("BEGIN")
+            savepoint = f"sp_{len(self._savepoints)}"
+            self._conn.execute(f"SAVEPOINT {savepoint}")
+        self._savepoints.append(savepoint)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            savepoint = self._savepoints.pop()
+            if savepoint is None:
+                if exc_type is None:
+                    self._conn.commit()
+                else:
+                    self._conn.rollback()
+            else:
+                if exc_type is not None:
+                    self._conn.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                self._conn.execute(f"RELEASE SAVEPOINT {savepoint}")
+        finally:
+            self.close()
+        return False
+
+    def close(self):
+        self._pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections.
+
+    - At most `size` connections are open at once; callers block when all are busy.
+    - A thread that already holds a connection gets the same one back on nested
+      acquire(), so helpers called inside a request share its transaction
+      (a nested `with` block is a savepoint within it).
+    - release() may run on any thread (e.g. a generator advanced by a worker
+      pool); it always clears the acquiring thread's entry.
+    """
+
+    def __init__(self, db_path: str = DB_PATH, size: int = POOL_SIZE, timeout: float = BUSY_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._all = []
+        # Thread ident -> the connection that thread currently holds
+        self._held = {}
+
+    def acquire(self) -> PooledConnection:
+        owner = threading.get_ident()
+        held = self._held.get(owner)
+        if held is not None and held._depth > 0:
+            object.__setattr__(held, "_depth", held._depth + 1)
+            return held
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise sqlite3.OperationalError(f"Connection pool exhausted ({self.size} connections busy)")
+        try:
+            raw = self._idle.get_nowait()
+        except queue.Empty:
+            try:
+                raw = connect(self.db_path)
+            except Exception:
+                self._slots.release()
+                raise
+            with self._lock:
+                self._all.append(raw)
+
+        pooled = PooledConnection(self, raw, owner)
+        with self._lock:
+            self._held[owner] = pooled
+        return pooled
+
+    def release(self, pooled: PooledConnection):
+        if pooled._depth > 1:
+            object.__setattr__(pooled, "_depth", pooled._depth - 1)
+            return
+        if pooled._depth == 0:
+            return  # Already released
+
+        object.__setattr__(pooled, "_depth", 0)
+        raw = pooled._conn
+        with self._lock:
+            if self._held.get(pooled._owner) is pooled:
+                del self._held[pooled._owner]
+        try:
+            # Never hand out a connection with a half-finished transaction
+            if raw.in_transaction:
+                raw.rollback()
+            raw.row_factory = sqlite3.Row
+            self._idle.put(raw)
+        except sqlite3.Error:
+            with self._lock:
+                if raw in self._all:
+                    self._all.remove(raw)
+            raw.close()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Acquire a connection; commit on success, roll back on error (a savepoint when nested)"""
+        with self.acquire() as conn:
+            yield conn
+
+    def close_all(self):
+        with self._lock:
+            for raw in self._all:
+                try:
+                    raw.close()
+                except sqlite3.Error:
+                    pass
+            self._all = []
+            self._held = {}
+        self._idle = queue.LifoQueue()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_db_connection() -> PooledConnection:
+    """Borrow a connection from the shared pool. Call close() to return it."""
+    return get_pool().acquire()
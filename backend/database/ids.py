@@ -0,0 +1,67 @@
+"""
+Collision-free, time-ordered row IDs (ULID layout).
+
+new_id("txn") -> "txn_01HQ3V6Z8K4N7W2C9D5F1G0BXE"
+
+The 26-character body is a 48-bit millisecond timestamp followed by 80 random
+bits, Crockford base32 encoded, so IDs sort by creation time as plain strings
+and new rows land at the right edge of the primary-key B-tree. Within one
+millisecond a process increments the random part instead of redrawing it, so
+its IDs stay strictly increasing; separate workers are kept apart by the
+80 random bits.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+ENCODING = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32
+RANDOM_BITS = 80
+TIME_BITS = 48
+
+_lock = threading.Lock()
+_last_ms = -1
+_last_random = 0
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ENCODING[index])
+    return "".join(reversed(chars))
+
+
+def new_ulid() -> str:
+    """26-char, lexicographically time-sortable, monotonic within this process"""
+    global _last_ms, _last_random
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms <= _last_ms:
+            # Same (or a backwards-stepped) clock tick: keep ordering by bumping the random part
+            ms = _last_ms
+            random_part = _last_random + 1
+            if random_part >> RANDOM_BITS:
+                # 2^80 IDs in one millisecond: borrow the next millisecond
+                ms += 1
+                random_part = int.from_bytes(os.urandom(10), "big")
+        else:
+            random_part = int.from_bytes(os.urandom(10), "big")
+        _last_ms, _last_random = ms, random_part
+    return _encode((ms << RANDOM_BITS) | random_part, 26)
+
+
+def new_id(prefix: Optional[str] = None) -> str:
+    """Prefixed ID for a new row, e.g. new_id("txn_buy") -> "txn_buy_01HQ..." """
+    ulid = new_ulid()
+    return f"{prefix}_{ulid}" if prefix else ulid
+
+
+def id_time(row_id: str) -> datetime:
+    """Creation time encoded in an ID from new_id()"""
+    body = row_id[-26:]
+    value = 0
+    for char in body[:10]:
+        value = value * 32 + ENCODING.index(char)
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
@@ -0,0 +1,182 @@
+"""
+Running per-user balance ledger.
+
+Every transaction insert goes through insert_transaction(), which updates
+the user's row in `user_balances` (and the spend rollups in database/rollups.py)
+in the same DB transaction. Balance reads are then a single primary-key lookup
+instead of SUM() scans over history.
+"""
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+from database.connection import get_db_connection
+from database.ids import new_id
+from database.rollups import apply_transaction, apply_transactions, rebuild_rollups
+
+
+def apply_to_balance(cursor, user_id: str, txn_type: Optional[str], amount: Optional[float], count: int = 1):
+    """Add a transaction's effect to the user's running totals"""
+    amount = amount or 0
+    income = amount if txn_type == "income" else 0
+    expense = amount if txn_type == "expense" else 0
+    apply_totals(cursor, user_id, income, expense, count)
+
+
+def apply_totals(cursor, user_id: str, income: float, expense: float, count: int):
+    """Add already-aggregated income/expense totals (e.g. a whole import batch) in one upsert"""
+    cursor.execute("""
+        INSERT INTO user_balances (user_id, income, expense, balance, txn_count, last_txn_at)
+        VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(user_id) DO UPDATE SET
+            income = income + excluded.income,
+            expense = expense + excluded.expense,
+            balance = balance + excluded.balance,
+            txn_count = txn_count + excluded.txn_count,
+            last_txn_at = excluded.last_txn_at
+    """, (user_id, income, expense, income - expense, count))
+
+
+def insert_transaction(
+    cursor,
+    user_id: str,
+    txn_type: Optional[str],
+    amount: Optional[float],
+    category: Optional[str] = None,
+    description: Optional[str] = None,
+    transaction_date: Optional[str] = None,
+    source: Optional[str] = None,
+    logged_via: str = "chat",
+    txn_id: Optional[str] = None,
+) -> str:
+    """
+    Insert a transaction row and update the balance ledger and spend rollups.
+    Does not commit; the caller owns the DB transaction.
+    """
+    txn_id = txn_id or new_id("txn")
+    transaction_date = transaction_date or datetime.now().isoformat()
+    cursor.execute("""
+        INSERT INTO transactions (id, user_id, type, amount, category, description, source, transaction_date, logged_via)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (
+        txn_id,
+        user_id,
+        txn_type,
+        amount,
+        category,
+        description,
+        source,
+        transaction_date,
+        logged_via
+    ))
+    apply_to_balance(cursor, user_id, txn_type, amount)
+    apply_transaction(cursor, user_id, txn_type, amount, category, transaction_date)
+    return txn_id
+
+
+def insert_transactions(cursor, user_id: str, rows: Iterable[Dict[str, Any]], logged_via: str = "import") -> int:
+    """
+    Batch variant of insert_transaction: one executemany for the rows and a
+    single ledger upsert for their combined effect. Each row needs id, type and
+    amount; category, description, source and transaction_date are optional.
+    Does not commit. Returns the number of rows inserted.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    now = datetime.now().isoformat()
+    cursor.executemany("""
+        INSERT INTO transactions (id, user_id, type, amount, category, description, source, transaction_date, logged_via)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (
+            row["id"],
+            user_id,
+            row["type"],
+            row["amount"],
+            row.get("category"),
+            row.get("description"),
+            row.get("source"),
+            row.get("transaction_date") or now,
+            row.get("logged_via", logged_via)
+        )
+        for row in rows
+    ])
+    income = sum(row["amount"] or 0 for row in rows if row["type"] == "income")
+    expense = sum(row["amount"] or 0 for row in rows if row["type"] == "expense")
+    apply_totals(cursor, user_id, income, expense, len(rows))
+    apply_transactions(cursor, user_id, [
+        (row["type"], row["amount"], row.get("category"), row.get("transaction_date") or now) for row in rows
+    ])
+    return len(rows)
+
+
+def get_balance(cursor, user_id: str) -> Dict[str, Any]:
+    """O(1) read of a user's running totals"""
+    cursor.execute(
+        "SELECT income, expense, balance, txn_count, last_txn_at FROM user_balances WHERE user_id = ?",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return {"income": 0, "expense": 0, "balance": 0, "txn_count": 0, "last_txn_at": None}
+    return {
+        "income": row[0] or 0,
+        "expense": row[1] or 0,
+        "balance": row[2] or 0,
+        "txn_count": row[3] or 0,
+        "last_txn_at": row[4]
+    }
+
+
+def reconcile_balances(conn, user_id: Optional[str] = None, commit: bool = True) -> int:
+    """
+    Rebuild user_balances from the transactions table.
+    Pass user_id to rebuild a single user. Returns the number of rows written.
+    commit=False leaves the rebuild in the caller's transaction (migrations).
+    """
+    cursor = conn.cursor()
+    where = "WHERE user_id = ?" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    cursor.execute(f"DELETE FROM user_balances {where}", params)
+    cursor.execute(f"""
+        INSERT INTO user_balances (user_id, income, expense, balance, txn_count, last_txn_at)
+        SELECT
+            user_id,
+            income,
+            expense,
+            income - expense,
+            txn_count,
+            last_txn_at
+        FROM (
+            SELECT
+                user_id,
+                COALESCE(SUM(CASE WHEN type = 'income' THEN amount END), 0) AS income,
+                COALESCE(SUM(CASE WHEN type = 'expense' THEN amount END), 0) AS expense,
+                COUNT(*) AS txn_count,
+                MAX(created_at) AS last_txn_at
+            FROM transactions
+            {where}
+            GROUP BY user_id
+        )
+    """, params)
+    written = cursor.rowcount
+    if commit:
+        conn.commit()
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the user_balances ledger and spend rollups from transactions")
+    parser.add_argument("--user", help="Only reconcile this user_id")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        count = reconcile_balances(conn, args.user)
+        print(f"Reconciled {count} user balance(s).")
+        days = rebuild_rollups(conn, args.user)
+        print(f"Rebuilt spend rollups ({days} day row(s)).")
+    finally:
+        conn.close()
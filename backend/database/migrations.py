@@ -0,0 +1,492 @@
+"""
+Versioned schema migrations.
+
+Every schema change is a numbered Migration in MIGRATIONS, applied in order
+and recorded in `schema_version`. init_db (database/schema.py) calls
+apply_migrations on startup:
+
+- Pending migrations run together in one BEGIN IMMEDIATE transaction, so a
+  failed step leaves the schema as it was, and a second worker starting at the
+  same time waits for the lock and then finds nothing left to do.
+- Index builds are `online`: they run after that transaction commits, each in
+  its own short transaction, so on a large `transactions` table other writers
+  wait for one index at a time instead of the whole upgrade. Online migrations
+  must only depend on earlier versions, and nothing offline may depend on them.
+
+Steps are idempotent (IF NOT EXISTS, columns added only when missing), so
+databases created by the old init_db or the one-off migrate_*.py scripts
+adopt the runner without special-casing: their steps re-run as no-ops.
+
+    python -m database.migrations          # apply pending, print status
+    python -m database.migrations --status # print status only
+"""
+import argparse
+import sqlite3
+from typing import Callable, Iterator, List, NamedTuple, Optional, Sequence, Union
+
+from database.connection import DB_PATH, connect
+from database.ids import new_id
+from database.ledger import reconcile_balances
+from database.rollups import rebuild_rollups
+
+# A step is an SQL script or a callable taking the connection
+Step = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    steps: Sequence[Step]
+    online: bool = False
+
+
+def add_column(table: str, column: str, col_type: str) -> Step:
+    def step(conn):
+        if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+    step.__name__ = f"add_column({table}.{column})"
+    return step
+
+
+def _merge_duplicate_holdings(conn):
+    """Racing buys could insert a second row for a held symbol; fold them into the oldest"""
+    groups = conn.execute(
+        "SELECT user_id, symbol FROM portfolio GROUP BY user_id, symbol HAVING COUNT(*) > 1"
+    ).fetchall()
+    for user_id, symbol in groups:
+        rows = conn.execute(
+            "SELECT rowid, quantity, average_buy_price, current_price FROM portfolio "
+            "WHERE user_id = ? AND symbol = ? ORDER BY rowid", (user_id, symbol)
+        ).fetchall()
+        quantity = sum(row[1] for row in rows)
+        cost = sum(row[1] * row[2] for row in rows)
+        price = next((row[3] for row in rows if row[3]), None)
+        conn.execute("""
+            UPDATE portfolio SET quantity = ?, average_buy_price = ?, current_value = ?, pnl = ?
+            WHERE rowid = ?
+        """, (quantity, cost / quantity if quantity else rows[0][2],
+              quantity * price if price else None, quantity * price - cost if price else None, rows[0][0]))
+        conn.execute("DELETE FROM portfolio WHERE user_id = ? AND symbol = ? AND rowid != ?",
+                     (user_id, symbol, rows[0][0]))
+
+
+def _opening_fills(conn):
+    """One BUY fill per existing holding, so positions can be replayed from trade_fills"""
+    rows = conn.execute("""
+        SELECT user_id, symbol, quantity, average_buy_price, last_updated FROM portfolio
+        WHERE NOT EXISTS (SELECT 1 FROM trade_fills f WHERE f.user_id = portfolio.user_id AND f.symbol = portfolio.symbol)
+    """).fetchall()
+    conn.executemany("""
+        INSERT INTO trade_fills (id, user_id, symbol, side, quantity, price, amount, created_at)
+        VALUES (?, ?, ?, 'BUY', ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+    """, [(new_id("fill"), user_id, symbol, quantity, price, quantity * price, updated)
+          for user_id, symbol, quantity, price, updated in rows])
+
+
+def _backfill_balances(conn):
+    reconcile_balances(conn, commit=False)
+
+
+def _backfill_rollups(conn):
+    rebuild_rollups(conn, commit=False)
+
+
+# Tables whose writes bump user_data_versions: table -> extra WHEN condition for UPDATEs
+# (the price refresher rewrites priced_at on every holding; only value changes matter)
+VERSIONED_TABLES = {
+    "transactions": None,
+    "goals": None,
+    "debts": None,
+    "portfolio": "NEW.current_value IS NOT OLD.current_value OR NEW.quantity IS NOT OLD.quantity",
+    "user_profiles": None,
+}
+
+def _version_triggers() -> str:
+    bump = """
+        INSERT INTO user_data_versions (user_id, version) VALUES ({row}.user_id, 1)
+        ON CONFLICT(user_id) DO UPDATE SET version = version + 1;"""
+    ddl = []
+    for table, update_when in VERSIONED_TABLES.items():
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            when = f" WHEN {update_when}" if event == "UPDATE" and update_when else ""
+            ddl.append(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version "
+                f"AFTER {event} ON {table}{when} BEGIN{bump.format(row=row)}\nEND;"
+            )
+    return "\n".join(ddl)
+
+
+INITIAL_SCHEMA = """
+-- Users table
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    phone TEXT UNIQUE,
+    name TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- User profiles (persona)
+CREATE TABLE IF NOT EXISTS user_profiles (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+
+    -- Income
+    income_type TEXT,  -- salaried, gig, business, mixed
+    income_pattern TEXT,  -- daily, weekly, monthly, irregular
+    monthly_income_min REAL,
+    monthly_income_max REAL,
+
+    -- Fixed expenses
+    monthly_rent REAL DEFAULT 0,
+    monthly_emi_total REAL DEFAULT 0,
+    monthly_fixed_other REAL DEFAULT 0,
+    supports_family INTEGER DEFAULT 0,
+
+    -- Profile
+    age_group TEXT,  -- 18-25, 26-35, 36-50, 50+
+    literacy_level INTEGER DEFAULT 2,  -- 1, 2, 3
+    risk_tolerance TEXT DEFAULT 'moderate',  -- conservative, moderate, aggressive
+
+    -- Goals
+    primary_goal TEXT,
+    emergency_fund_target REAL,
+    emergency_fund_current REAL DEFAULT 0,
+
+    -- Preferences (learned)
+    preferred_tone TEXT DEFAULT 'friendly',
+    discipline_score REAL DEFAULT 0.5,
+
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Transactions
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+    type TEXT,  -- income, expense
+    amount REAL,
+    category TEXT,
+    description TEXT,
+    source TEXT,
+    transaction_date DATE,
+    logged_via TEXT DEFAULT 'chat',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Goals
+CREATE TABLE IF NOT EXISTS goals (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+    name TEXT,
+    target_amount REAL,
+    current_amount REAL DEFAULT 0,
+    deadline DATE,
+    priority INTEGER DEFAULT 1,
+    status TEXT DEFAULT 'active',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Debts
+CREATE TABLE IF NOT EXISTS debts (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+    name TEXT,
+    principal REAL,
+    current_balance REAL,
+    interest_rate REAL,
+    emi_amount REAL,
+    emi_day INTEGER,
+    status TEXT DEFAULT 'active',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Behavior logs (for learning)
+CREATE TABLE IF NOT EXISTS behavior_logs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+    event_type TEXT,  -- nudge_opened, nudge_ignored, budget_override, etc.
+    context TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Agent decision logs (for audit)
+CREATE TABLE IF NOT EXISTS agent_logs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+    agent_name TEXT,
+    input_message TEXT,
+    output_response TEXT,
+    decision_context TEXT,
+    safety_check TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Investments
+CREATE TABLE IF NOT EXISTS investments (
+    id TEXT PRIMARY KEY,
+    user_id TEXT REFERENCES users(id),
+    type TEXT, -- 'short_term', 'long_term', 'retirement'
+    asset_class TEXT, -- 'Equity', 'Debt', 'Gold', 'Liquid'
+    allocation_percentage REAL,
+    amount REAL DEFAULT 0,
+    status TEXT DEFAULT 'active',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_transactions_category
+    ON transactions(user_id, category);
+"""
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "initial_schema", [INITIAL_SCHEMA]),
+    # Was migrate_auth.py
+    Migration(2, "users_password", [add_column("users", "password", "TEXT")]),
+    # Was migrate_investments.py / verify_and_migrate.py
+    Migration(3, "investment_fund_details", [
+        add_column("investments", "fund_name", "TEXT"),  # Specific fund name
+        add_column("investments", "risk_level", "TEXT"),  # 'low', 'moderate', 'high'
+    ]),
+    # Was database/create_portfolio_table.py; valuations are refreshed in bulk by the price refresher
+    Migration(4, "portfolio", ["""
+        CREATE TABLE IF NOT EXISTS portfolio (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            average_buy_price REAL NOT NULL,
+            current_value REAL,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id)
+        );
+    """,
+        add_column("portfolio", "current_price", "REAL"),
+        add_column("portfolio", "pnl", "REAL"),
+        add_column("portfolio", "priced_at", "TIMESTAMP"),
+    ]),
+    # Running totals per user (kept in sync with transactions by database/ledger.py)
+    Migration(5, "balance_ledger", ["""
+        CREATE TABLE IF NOT EXISTS user_balances (
+            user_id TEXT PRIMARY KEY REFERENCES users(id),
+            income REAL DEFAULT 0,
+            expense REAL DEFAULT 0,
+            balance REAL DEFAULT 0,
+            txn_count INTEGER DEFAULT 0,
+            last_txn_at TIMESTAMP
+        );
+    """, _backfill_balances]),
+    # Spend rollups (kept in sync with transactions by database/rollups.py)
+    Migration(6, "spend_rollups", ["""
+        CREATE TABLE IF NOT EXISTS spend_monthly (
+            user_id TEXT NOT NULL,
+            month TEXT NOT NULL,  -- YYYY-MM
+            category TEXT NOT NULL,
+            type TEXT NOT NULL,  -- income, expense
+            amount REAL DEFAULT 0,
+            txn_count INTEGER DEFAULT 0,
+            PRIMARY KEY (user_id, month, category, type)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS spend_daily (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,  -- YYYY-MM-DD
+            income REAL DEFAULT 0,
+            expense REAL DEFAULT 0,
+            PRIMARY KEY (user_id, day)
+        ) WITHOUT ROWID;
+    """, _backfill_rollups]),
+    # Per-user data version, bumped by triggers (see VERSIONED_TABLES) on every write a
+    # derived view depends on; dashboard snapshots are valid while it is unchanged
+    Migration(7, "dashboard_snapshots", ["""
+        CREATE TABLE IF NOT EXISTS user_data_versions (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        );
+
+        -- Materialized /dashboard payloads (see services/dashboard.py)
+        CREATE TABLE IF NOT EXISTS dashboard_snapshots (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            as_of DATE NOT NULL,
+            payload TEXT NOT NULL,
+            built_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """, _version_triggers()]),
+    # Stored insight text per user and the ledger watermark it was built from (see services/insights.py)
+    Migration(8, "user_insights", ["""
+        CREATE TABLE IF NOT EXISTS user_insights (
+            user_id TEXT PRIMARY KEY,
+            insight TEXT NOT NULL,
+            generated_at TIMESTAMP NOT NULL,
+            watermark_txn_count INTEGER NOT NULL DEFAULT 0,
+            watermark_expense REAL NOT NULL DEFAULT 0
+        );
+    """]),
+    # (user_id, transaction_date, id) also orders ties for keyset pagination; it
+    # replaces the old (user_id, transaction_date) index, which is its prefix
+    Migration(9, "idx_transactions_user_date_id", ["""
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_date_id
+            ON transactions(user_id, transaction_date, id);
+        DROP INDEX IF EXISTS idx_transactions_user_date;
+    """], online=True),
+    # Covers SUM(amount) by user/type and the ranged category breakdown without row lookups
+    Migration(10, "idx_transactions_user_type", ["""
+        CREATE INDEX IF NOT EXISTS idx_transactions_user_type
+            ON transactions(user_id, type, transaction_date, category, amount);
+    """], online=True),
+    Migration(11, "idx_portfolio", ["""
+        CREATE INDEX IF NOT EXISTS idx_portfolio_user ON portfolio(user_id, symbol);
+        CREATE INDEX IF NOT EXISTS idx_portfolio_symbol ON portfolio(symbol);
+    """], online=True),
+    Migration(12, "idx_user_tables", ["""
+        CREATE INDEX IF NOT EXISTS idx_debts_user
+            ON debts(user_id, status);
+        CREATE INDEX IF NOT EXISTS idx_goals_user
+            ON goals(user_id, status, priority, deadline);
+        CREATE INDEX IF NOT EXISTS idx_user_profiles_user
+            ON user_profiles(user_id);
+        -- Covers the per-user plan targets read by services/analytics.py
+        CREATE INDEX IF NOT EXISTS idx_investments_user
+            ON investments(user_id, status, asset_class, allocation_percentage);
+    """], online=True),
+    # Append-only buy/sell fills that portfolio positions are derived from (see database/trades.py);
+    # one position row per (user, symbol) so a fill is applied with a single upsert
+    Migration(13, "trade_fills", ["""
+        CREATE TABLE IF NOT EXISTS trade_fills (
+            id TEXT PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            side TEXT NOT NULL,  -- BUY, SELL
+            quantity REAL NOT NULL,
+            price REAL NOT NULL,
+            amount REAL NOT NULL,
+            txn_id TEXT,  -- ledger transaction; NULL for opening fills of pre-existing holdings
+            idempotency_key TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_trade_fills_idempotency
+            ON trade_fills(user_id, idempotency_key) WHERE idempotency_key IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_trade_fills_user
+            ON trade_fills(user_id, id);
+    """,
+        _merge_duplicate_holdings,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_portfolio_user_symbol ON portfolio(user_id, symbol);",
+        _opening_fills,
+    ]),
+    # Prefix of idx_portfolio_user_symbol (online so it runs after 11 on a fresh database)
+    Migration(14, "drop_idx_portfolio_user", ["DROP INDEX IF EXISTS idx_portfolio_user;"], online=True),
+    # spend_daily stops counting Investment buys as spend (rollups.NON_SPEND_CATEGORIES);
+    # snapshots built from the old figures are dropped and rebuilt on the next read
+    Migration(15, "spend_excludes_investments", [_backfill_rollups, "DELETE FROM dashboard_snapshots;"]),
+]
+
+
+def _statements(script: str) -> Iterator[str]:
+    """Split an SQL script into statements (trigger bodies contain ';')"""
+    buffer = ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            yield buffer.strip()
+            buffer = ""
+    leftover = [line for line in buffer.splitlines() if line.strip() and not line.strip().startswith("--")]
+    if leftover:
+        raise ValueError(f"Incomplete SQL statement: {leftover[0].strip()}")
+
+
+def _run(conn, migration: Migration):
+    for step in migration.steps:
+        if callable(step):
+            step(conn)
+        else:
+            # Not executescript(): it commits first, which would end our transaction
+            for statement in _statements(step):
+                conn.execute(statement)
+    conn.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (migration.version, migration.name))
+
+
+def _applied(conn) -> set:
+    return {row[0] for row in conn.execute("SELECT version FROM schema_version")}
+
+
+def _check_order():
+    versions = [m.version for m in MIGRATIONS]
+    if versions != sorted(set(versions)):
+        raise RuntimeError(f"MIGRATIONS must have unique, increasing versions: {versions}")
+
+
+def apply_migrations(conn, target: Optional[int] = None) -> List[int]:
+    """
+    Apply pending migrations (up to `target`, default all). Offline migrations
+    share one transaction; each online one gets its own. Returns the versions applied.
+    """
+    _check_order()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    wanted = [m for m in MIGRATIONS if target is None or m.version <= target]
+    applied = []
+
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        # Read under the write lock: another worker may have just finished
+        done = _applied(conn)
+        for migration in wanted:
+            if not migration.online and migration.version not in done:
+                print(f"DEBUG: Applying migration {migration.version} {migration.name}")
+                _run(conn, migration)
+                applied.append(migration.version)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    for migration in wanted:
+        if not migration.online:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if migration.version in _applied(conn):
+                conn.rollback()
+                continue
+            print(f"DEBUG: Building {migration.name} (online migration {migration.version})")
+            _run(conn, migration)
+            conn.commit()
+            applied.append(migration.version)
+        except Exception:
+            conn.rollback()
+            raise
+    return sorted(applied)
+
+
+def read_status(conn) -> List[dict]:
+    """Every known migration and when it was applied (None if pending)"""
+    try:
+        rows = {row[0]: row[1] for row in conn.execute("SELECT version, applied_at FROM schema_version")}
+    except sqlite3.OperationalError:
+        rows = {}
+    return [{"version": m.version, "name": m.name, "online": m.online, "applied_at": rows.get(m.version)}
+            for m in MIGRATIONS]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending FundPal schema migrations")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--status", action="store_true", help="Only show which migrations are applied")
+    parser.add_argument("--target", type=int, help="Stop after this version")
+    args = parser.parse_args()
+
+    conn = connect(args.db)
+    try:
+        if not args.status:
+            applied = apply_migrations(conn, args.target)
+            print(f"Applied {len(applied)} migration(s): {applied}" if applied else "Schema is up to date")
+        for m in read_status(conn):
+            print(f"{m['version']:>4}  {m['name']:<32} {'online ' if m['online'] else '':7} {m['applied_at'] or 'pending'}")
+    finally:
+        conn.close()
@@ -1,104 +1,223 @@
-import sqlite3
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+import base64
+import calendar
+import json
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime
+from database.connection import DB_PATH, get_db_connection
+from database.ledger import get_balance, insert_transaction
+from database.rollups import read_window
+from database.aio import run_in_db
 
-DB_PATH = "fundpal.db"
+# Debts at or above this APR are treated like credit card debt by the planner
+CREDIT_CARD_RATE = 24
 
-def get_db_connection():
-    conn = sqlite3.connect(DB_PATH, timeout=10.0)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Sync versions take an open connection so they can be composed inside one
+# DB transaction. The async versions run them on the DB thread pool.
 
-async def get_user_profile(user_id: str) -> Dict[str, Any]:
-    conn = get_db_connection()
+def read_user_profile(conn, user_id: str) -> Dict[str, Any]:
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM user_profiles WHERE user_id = ?", (user_id,))
     row = cursor.fetchone()
-    conn.close()
     return dict(row) if row else {}
 
-async def save_user_profile(user_id: str, data: Dict[str, Any]):
-    conn = get_db_connection()
+def write_user_profile(conn, user_id: str, data: Dict[str, Any]):
     cursor = conn.cursor()
-    
+
     # Check if exists
     cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
     if not cursor.fetchone():
         cursor.execute("INSERT INTO users (id) VALUES (?)", (user_id,))
-    
+
     # Upsert profile
-    columns = ", ".join(data.keys())
-    placeholders = ", ".join(["?" for _ in data])
-    updates = ", ".join([f"{k}=?" for k in data.keys()])
-    values = list(data.values())
-    
-    # Simple implementation: Try insert, if fail update (or use INSERT OR REPLACE)
     # For SQLite, INSERT OR REPLACE is easiest
-    
+
     # First ensure user_id is in data
     data['user_id'] = user_id
     data['id'] = user_id # Use user_id as profile id for 1:1 mapping
-    
+
     columns = ", ".join(data.keys())
     placeholders = ", ".join(["?" for _ in data])
     values = list(data.values())
-    
+
     query = f"INSERT OR REPLACE INTO user_profiles ({columns}) VALUES ({placeholders})"
     cursor.execute(query, values)
-    conn.commit()
-    conn.close()
 
-async def get_user_state(user_id: str) -> Dict[str, Any]:
-    """Aggregate state for agents"""
-    conn = get_db_connection()
+def _upcoming_obligations(cursor, user_id: str, today: date) -> List[Dict[str, Any]]:
+    """Next EMI date for each active debt that has one"""
+    cursor.execute(
+        "SELECT name, emi_amount, emi_day, interest_rate FROM debts WHERE user_id = ? AND status = 'active'",
+        (user_id,)
+    )
+    upcoming = []
+    for row in cursor.fetchall():
+        if not row["emi_day"] or not row["emi_amount"]:
+            continue
+        due = _next_day_of_month(today, int(row["emi_day"]))
+        upcoming.append({
+            "name": row["name"],
+            "amount": row["emi_amount"],
+            "due_date": due.isoformat(),
+            "days_until": (due - today).days,
+        })
+    return sorted(upcoming, key=lambda o: o["days_until"])
+
+def _next_day_of_month(today: date, day: int) -> date:
+    """The next date (today included) falling on `day`, clamped to short months"""
+    year, month = today.year, today.month
+    for _ in range(2):
+        candidate = date(year, month, min(day, calendar.monthrange(year, month)[1]))
+        if candidate >= today:
+            return candidate
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return candidate
+
+def read_user_state(conn, user_id: str, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Aggregate state for agents. Every figure comes from a maintained rollup or a
+    keyed lookup (ledger, spend rollups, profile, debts), so the cost does not
+    grow with the user's transaction history.
+    """
     cursor = conn.cursor()
-    
-    # Get balance (mock for now, or calc from transactions)
-    # In real app, this would be complex. For MVP, we might store current_balance in profile or calc it.
-    # Let's assume we calculate from transactions + initial balance (if any)
-    
-    cursor.execute("SELECT SUM(amount) FROM transactions WHERE user_id = ? AND type = 'income'", (user_id,))
-    income = cursor.fetchone()[0] or 0
-    
-    cursor.execute("SELECT SUM(amount) FROM transactions WHERE user_id = ? AND type = 'expense'", (user_id,))
-    expense = cursor.fetchone()[0] or 0
-    
-    balance = income - expense
-    
-    conn.close()
-    
-    return {
+    today = today or date.today()
+
+    # Running totals are maintained by database/ledger.py on every insert
+    totals = get_balance(cursor, user_id)
+    income = totals["income"]
+    expense = totals["expense"]
+    balance = totals["balance"]
+
+    window = read_window(cursor, user_id, today)
+    profile = read_user_profile(conn, user_id)
+    upcoming = _upcoming_obligations(cursor, user_id, today)
+
+    cursor.execute("""
+        SELECT EXISTS (SELECT 1 FROM debts WHERE user_id = ? AND status = 'active'
+                       AND (LOWER(name) LIKE '%credit card%' OR interest_rate >= ?))
+    """, (user_id, CREDIT_CARD_RATE))
+    has_credit_card_debt = bool(cursor.fetchone()[0])
+
+    # Fall back to the profile's stated fixed costs / income until there is recent history
+    fixed_monthly = sum(profile.get(k) or 0 for k in ("monthly_rent", "monthly_emi_total", "monthly_fixed_other"))
+    daily_essential = window["avg_30_day_expense"] or fixed_monthly / 30
+    stated_income = [v for v in (profile.get("monthly_income_min"), profile.get("monthly_income_max")) if v]
+    # None when there is neither recent income nor a stated one; the planner then uses its default
+    monthly_income = window["income_30d"] or (sum(stated_income) / len(stated_income) if stated_income else None)
+    savings_rate = (monthly_income - window["expense_30d"]) / monthly_income * 100 if monthly_income else 0
+    emergency_fund = profile.get("emergency_fund_current") or 0
+    monthly_essential = daily_essential * 30
+    categories = window["categories"]
+    if profile.get("monthly_rent") and not categories.get("Rent", {}).get("budget"):
+        categories.setdefault("Rent", {"spent": 0.0})["budget"] = profile["monthly_rent"]
+
+    state = {
         "current_balance": balance,
         "total_income": income,
         "total_expense": expense,
-        "daily_essential": 500, # Mock default
-        "emergency_fund_months": 0, # Mock
-        "has_credit_card_debt": False, # Mock
-        "categories": {}, # Mock
-        "upcoming": [], # Mock
-        "days_elapsed": 15, # Mock
-        "days_in_month": 30 # Mock
+        "txn_count": totals["txn_count"],
+        "daily_essential": round(daily_essential, 2),
+        "emergency_fund_months": round(emergency_fund / monthly_essential, 2) if monthly_essential else 0,
+        "has_credit_card_debt": has_credit_card_debt,
+        "categories": categories,
+        "upcoming": upcoming,
+        "upcoming_bills_7d": sum(o["amount"] for o in upcoming if o["days_until"] <= 7),
+        "available_for_obligation": max(balance, 0),
+        "avg_7_day_expense": window["avg_7_day_expense"],
+        "avg_30_day_expense": window["avg_30_day_expense"],
+        "savings_rate": round(savings_rate, 1),
+        "days_elapsed": window["days_elapsed"],
+        "days_in_month": window["days_in_month"]
     }
+    if monthly_income is not None:
+        state["monthly_income"] = round(monthly_income, 2)
+    return state
 
-async def save_transaction(user_id: str, data: Any):
-    conn = get_db_connection()
+def write_transaction(conn, user_id: str, data: Any) -> str:
     cursor = conn.cursor()
-    
+
     # data is ParsedTransaction object
-    cursor.execute("""
-        INSERT INTO transactions (id, user_id, type, amount, category, description, transaction_date)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        f"txn_{int(datetime.now().timestamp())}", # Simple ID
+    return insert_transaction(
+        cursor,
         user_id,
         data.transaction_type,
         data.amount,
-        data.category,
-        data.raw_query,
-        data.date or datetime.now().isoformat()
-    ))
-    
-    conn.commit()
-    conn.close()
+        category=data.category,
+        description=data.raw_query,
+        transaction_date=data.date or datetime.now().isoformat()
+    )
+
+def read_category_breakdown(conn, user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                            txn_type: str = "expense") -> List[Dict[str, Any]]:
+    """
+    Per-category totals over [start, end) (ISO dates; either may be open), summed
+    in SQL with GROUP BY instead of over rows pulled into Python. Largest first.
+    """
+    cursor = conn.cursor()
+    clauses, params = ["user_id = ?", "type = ?"], [user_id, txn_type]
+    if start:
+        clauses.append("transaction_date >= ?")
+        params.append(start)
+    if end:
+        clauses.append("transaction_date < ?")
+        params.append(end)
+    cursor.execute(f"""
+        SELECT COALESCE(category, 'Other') AS category, SUM(amount) AS total, COUNT(*) AS count
+        FROM transactions
+        WHERE {" AND ".join(clauses)}
+        GROUP BY COALESCE(category, 'Other')
+        ORDER BY total DESC
+    """, params)
+    return [{"category": row[0], "total": round(row[1] or 0, 2), "count": row[2]} for row in cursor.fetchall()]
+
+def encode_cursor(transaction_date: str, txn_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([transaction_date, txn_id]).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        transaction_date, txn_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(transaction_date), str(txn_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+def read_transactions_page(conn, user_id: str, limit: int = 20,
+                           cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Newest-first page of a user's transactions and the cursor for the next page.
+    Keyset pagination on (transaction_date, id): each page is an index range
+    scan that starts where the last one stopped, so deep pages cost the same
+    as the first (OFFSET would rescan everything before the page).
+    """
+    where, params = "user_id = ?", [user_id]
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        # Row-value comparison so SQLite seeks idx_transactions_user_date_id directly
+        where += " AND (transaction_date, id) < (?, ?)"
+        params += [after_date, after_id]
+    rows = conn.execute(f"""
+        SELECT * FROM transactions
+        WHERE {where}
+        ORDER BY transaction_date DESC, id DESC
+        LIMIT ?
+    """, params + [limit + 1]).fetchall()
+    page = [dict(row) for row in rows[:limit]]
+    next_cursor = encode_cursor(page[-1]["transaction_date"], page[-1]["id"]) if page and len(rows) > limit else None
+    return page, next_cursor
+
+async def get_user_profile(user_id: str) -> Dict[str, Any]:
+    return await run_in_db(read_user_profile, user_id)
+
+async def save_user_profile(user_id: str, data: Dict[str, Any]):
+    await run_in_db(write_user_profile, user_id, data)
+
+async def get_user_state(user_id: str) -> Dict[str, Any]:
+    return await run_in_db(read_user_state, user_id)
+
+async def save_transaction(user_id: str, data: Any):
+    await run_in_db(write_transaction, user_id, data)
 
+async def get_category_breakdown(user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                                 txn_type: str = "expense") -> List[Dict[str, Any]]:
+    return await run_in_db(read_category_breakdown, user_id, start, end, txn_type)
 
+async def get_transactions_page(user_id: str, limit: int = 20,
+                                cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    return await run_in_db(read_transactions_page, user_id, limit, cursor)
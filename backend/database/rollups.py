@@ -0,0 +1,165 @@
+"""
+Incremental spend rollups for the planner.
+
+`spend_monthly` holds per-user, per-month, per-category totals and `spend_daily`
+per-user daily income/expense. Both are updated by database/ledger.py in the
+same DB transaction as every transaction insert, so the windowed figures in
+read_window() (this month's categories, trailing 7/30-day averages) are a
+handful of primary-key range reads instead of scans over `transactions`.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# Months of history a category's typical spend (its budget) is averaged over
+BUDGET_LOOKBACK_MONTHS = 3
+# Money moved into holdings rather than spent: kept out of spend_daily and the category budgets
+NON_SPEND_CATEGORIES = ("Investment",)
+_NON_SPEND_SQL = ", ".join(f"'{category}'" for category in NON_SPEND_CATEGORIES)
+
+
+def _day(transaction_date: Optional[str]) -> str:
+    return (transaction_date or date.today().isoformat())[:10]
+
+
+def apply_transactions(cursor, user_id: str, rows: Iterable[Tuple[Optional[str], Optional[float], Optional[str], Optional[str]]]):
+    """Fold (type, amount, category, transaction_date) tuples into the rollups, one upsert per bucket"""
+    monthly = defaultdict(lambda: [0.0, 0])
+    daily = defaultdict(lambda: [0.0, 0.0])
+    for txn_type, amount, category, transaction_date in rows:
+        if txn_type not in ("income", "expense"):
+            continue
+        amount = amount or 0
+        day = _day(transaction_date)
+        bucket = monthly[(day[:7], category or "Other", txn_type)]
+        bucket[0] += amount
+        bucket[1] += 1
+        if txn_type == "income":
+            daily[day][0] += amount
+        elif category not in NON_SPEND_CATEGORIES:
+            daily[day][1] += amount
+
+    if monthly:
+        cursor.executemany("""
+            INSERT INTO spend_monthly (user_id, month, category, type, amount, txn_count)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, month, category, type) DO UPDATE SET
+                amount = amount + excluded.amount,
+                txn_count = txn_count + excluded.txn_count
+        """, [(user_id, month, category, txn_type, total, count)
+              for (month, category, txn_type), (total, count) in monthly.items()])
+    if daily:
+        cursor.executemany("""
+            INSERT INTO spend_daily (user_id, day, income, expense)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(user_id, day) DO UPDATE SET
+                income = income + excluded.income,
+                expense = expense + excluded.expense
+        """, [(user_id, day, income, expense) for day, (income, expense) in daily.items()])
+
+
+def apply_transaction(cursor, user_id: str, txn_type: Optional[str], amount: Optional[float],
+                      category: Optional[str], transaction_date: Optional[str]):
+    apply_transactions(cursor, user_id, [(txn_type, amount, category, transaction_date)])
+
+
+def _month_offset(month_start: date, months: int) -> str:
+    year, month = divmod(month_start.year * 12 + month_start.month - 1 + months, 12)
+    return f"{year:04d}-{month + 1:02d}"
+
+
+def read_window(cursor, user_id: str, today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    Windowed spend figures as of `today`: this month's per-category spend with a
+    budget (average over the previous BUDGET_LOOKBACK_MONTHS, or over the months
+    the user actually has history for if fewer), trailing 7/30-day totals and
+    averages, and month progress. Investments are not spend. Reads at most ~30 daily rows plus
+    a few months of category rows, regardless of history size.
+    """
+    today = today or date.today()
+    this_month = today.strftime("%Y-%m")
+    first_month = _month_offset(today.replace(day=1), -BUDGET_LOOKBACK_MONTHS)
+
+    cursor.execute(f"""
+        SELECT month, category, amount FROM spend_monthly
+        WHERE user_id = ? AND month >= ? AND month <= ? AND type = 'expense'
+          AND category NOT IN ({_NON_SPEND_SQL})
+    """, (user_id, first_month, this_month))
+    spent = defaultdict(float)
+    history = defaultdict(float)
+    history_months = set()
+    for month, category, amount in cursor.fetchall():
+        if month == this_month:
+            spent[category] += amount
+        else:
+            history[category] += amount
+            history_months.add(month)
+    # A newer user's budget is their average over the months they have, not diluted by empty ones
+    lookback = len(history_months) or 1
+    categories = {
+        category: {
+            "spent": round(spent.get(category, 0.0), 2),
+            "budget": round(history.get(category, 0.0) / lookback, 2),
+        }
+        for category in sorted(set(spent) | set(history))
+    }
+
+    cursor.execute("""
+        SELECT day, income, expense FROM spend_daily
+        WHERE user_id = ? AND day > ? AND day <= ?
+    """, (user_id, (today - timedelta(days=30)).isoformat(), today.isoformat()))
+    week_start = (today - timedelta(days=7)).isoformat()
+    income_30 = expense_30 = expense_7 = 0.0
+    for day, income, expense in cursor.fetchall():
+        income_30 += income
+        expense_30 += expense
+        if day > week_start:
+            expense_7 += expense
+
+    return {
+        "categories": categories,
+        "expense_7d": round(expense_7, 2),
+        "expense_30d": round(expense_30, 2),
+        "income_30d": round(income_30, 2),
+        "avg_7_day_expense": round(expense_7 / 7, 2),
+        "avg_30_day_expense": round(expense_30 / 30, 2),
+        "days_elapsed": today.day,
+        "days_in_month": calendar.monthrange(today.year, today.month)[1],
+    }
+
+
+def rebuild_rollups(conn, user_id: Optional[str] = None, commit: bool = True) -> int:
+    """
+    Recompute spend_monthly/spend_daily from `transactions` (all users, or one).
+    Returns the number of daily rows written.
+    commit=False leaves the rebuild in the caller's transaction (migrations).
+    """
+    cursor = conn.cursor()
+    where = "AND user_id = ?" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    cursor.execute(f"DELETE FROM spend_monthly WHERE 1 = 1 {where}", params)
+    cursor.execute(f"DELETE FROM spend_daily WHERE 1 = 1 {where}", params)
+    cursor.execute(f"""
+        INSERT INTO spend_monthly (user_id, month, category, type, amount, txn_count)
+        SELECT user_id, substr(COALESCE(transaction_date, created_at), 1, 7), COALESCE(category, 'Other'), type,
+               COALESCE(SUM(amount), 0), COUNT(*)
+        FROM transactions
+        WHERE type IN ('income', 'expense') {where}
+        GROUP BY 1, 2, 3, 4
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO spend_daily (user_id, day, income, expense)
+        SELECT user_id, substr(COALESCE(transaction_date, created_at), 1, 10),
+               COALESCE(SUM(CASE WHEN type = 'income' THEN amount END), 0),
+               COALESCE(SUM(CASE WHEN type = 'expense' AND COALESCE(category, 'Other') NOT IN ({_NON_SPEND_SQL})
+                                 THEN amount END), 0)
+        FROM transactions
+        WHERE type IN ('income', 'expense') {where}
+        GROUP BY 1, 2
+    """, params)
+    written = cursor.rowcount
+    if commit:
+        conn.commit()
+    return written
@@ -0,0 +1,139 @@
+"""
+Append-only trade ledger.
+
+Every executed buy or sell is a row in `trade_fills`, and `portfolio`
+positions are derived from it incrementally: apply_fill() folds one fill into
+the holding with a single conditional upsert in the same transaction (no
+read-modify-write in Python), and rebuild_positions() replays the fills if a
+position ever drifts. A fill may carry the client's Idempotency-Key (unique
+per user), so a retried request finds its original fill instead of trading
+twice. Callers hold the write lock for the whole order (BEGIN IMMEDIATE, see
+database.connection.begin_immediate) so the check and the fill can't interleave
+with another order.
+"""
+import argparse
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from database.connection import get_db_connection
+from database.ids import new_id
+
+# Positions at or below this quantity are closed (float residue from amount-sized buys)
+CLOSED_QUANTITY = 1e-9
+
+
+def find_fill(cursor, user_id: str, idempotency_key: str) -> Optional[Dict[str, Any]]:
+    cursor.execute(
+        "SELECT * FROM trade_fills WHERE user_id = ? AND idempotency_key = ?", (user_id, idempotency_key)
+    )
+    row = cursor.fetchone()
+    return dict(row) if row else None
+
+
+def record_fill(cursor, user_id: str, symbol: str, side: str, quantity: float, price: float,
+                txn_id: Optional[str] = None, idempotency_key: Optional[str] = None) -> str:
+    """Append a fill. Does not touch the position; pair it with apply_fill. Does not commit."""
+    fill_id = new_id("fill")
+    cursor.execute("""
+        INSERT INTO trade_fills (id, user_id, symbol, side, quantity, price, amount, txn_id, idempotency_key)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (fill_id, user_id, symbol, side, quantity, price, quantity * price, txn_id, idempotency_key))
+    return fill_id
+
+
+def apply_fill(cursor, user_id: str, symbol: str, side: str, quantity: float, price: float) -> bool:
+    """
+    Fold one fill into the user's position and mark it at the fill price.
+    A SELL only applies if the position holds enough; returns False (and
+    changes nothing) otherwise. Does not commit.
+    """
+    now = datetime.now().isoformat()
+    if side == "BUY":
+        # SET expressions see the row as it was, so the average and quantity update together
+        cursor.execute("""
+            INSERT INTO portfolio (id, user_id, symbol, quantity, average_buy_price, current_value,
+                                   current_price, pnl, priced_at, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?)
+            ON CONFLICT(user_id, symbol) DO UPDATE SET
+                average_buy_price = (quantity * average_buy_price + excluded.quantity * excluded.average_buy_price)
+                                    / (quantity + excluded.quantity),
+                quantity = quantity + excluded.quantity,
+                current_price = excluded.current_price,
+                current_value = (quantity + excluded.quantity) * excluded.current_price,
+                pnl = (quantity + excluded.quantity) * excluded.current_price
+                      - (quantity * average_buy_price + excluded.quantity * excluded.average_buy_price),
+                priced_at = excluded.priced_at,
+                last_updated = excluded.last_updated
+        """, (new_id("pf"), user_id, symbol, quantity, price, quantity * price, price, now, now))
+        return True
+
+    cursor.execute("""
+        UPDATE portfolio
+        SET quantity = quantity - ?,
+            current_price = ?,
+            current_value = (quantity - ?) * ?,
+            pnl = (quantity - ?) * (? - average_buy_price),
+            priced_at = ?,
+            last_updated = ?
+        WHERE user_id = ? AND symbol = ? AND quantity >= ?
+    """, (quantity, price, quantity, price, quantity, price, now, now, user_id, symbol, quantity))
+    if cursor.rowcount == 0:
+        return False
+    cursor.execute("DELETE FROM portfolio WHERE user_id = ? AND symbol = ? AND quantity <= ?",
+                   (user_id, symbol, CLOSED_QUANTITY))
+    return True
+
+
+def rebuild_positions(conn, user_id: Optional[str] = None, commit: bool = True) -> int:
+    """
+    Recompute `portfolio` from `trade_fills` (all users, or one), replaying each
+    user's fills in order. Holdings are marked at their last fill price until the
+    next valuation refresh. Returns the number of positions written.
+    """
+    cursor = conn.cursor()
+    where = "WHERE user_id = ?" if user_id else ""
+    params = (user_id,) if user_id else ()
+
+    positions: Dict[tuple, Dict[str, Any]] = {}
+    for fill in cursor.execute(f"SELECT * FROM trade_fills {where} ORDER BY id", params).fetchall():
+        key = (fill["user_id"], fill["symbol"])
+        position = positions.setdefault(key, {"quantity": 0.0, "cost": 0.0, "price": fill["price"]})
+        if fill["side"] == "BUY":
+            position["quantity"] += fill["quantity"]
+            position["cost"] += fill["quantity"] * fill["price"]
+        else:
+            # Sells leave the average price unchanged
+            average = position["cost"] / position["quantity"] if position["quantity"] else 0
+            position["quantity"] -= fill["quantity"]
+            position["cost"] = position["quantity"] * average
+        position["price"] = fill["price"]
+
+    cursor.execute(f"DELETE FROM portfolio {where}", params)
+    now = datetime.now().isoformat()
+    rows = [
+        (new_id("pf"), uid, symbol, p["quantity"], p["cost"] / p["quantity"], p["quantity"] * p["price"],
+         p["price"], p["quantity"] * p["price"] - p["cost"], now, now)
+        for (uid, symbol), p in positions.items()
+        if p["quantity"] > CLOSED_QUANTITY
+    ]
+    cursor.executemany("""
+        INSERT INTO portfolio (id, user_id, symbol, quantity, average_buy_price, current_value,
+                               current_price, pnl, priced_at, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    if commit:
+        conn.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild portfolio positions from the trade_fills ledger")
+    parser.add_argument("--user", help="Only rebuild this user_id")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        count = rebuild_positions(conn, args.user)
+        print(f"Rebuilt {count} position(s)")
+    finally:
+        conn.close()
@@ -3,6 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from routes import chat, onboarding, dashboard, goals, transactions, investments, auth, payment, debts, bills, insights
 
 from database.schema import init_db
+from services.scheduler import PeriodicTask
+from services.portfolio import PRICE_REFRESH_INTERVAL
+from services.insights import INSIGHTS_INTERVAL
 from dotenv import load_dotenv
 import os
 
@@ -19,9 +22,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Marks every held symbol to market in the background so /portfolio never waits on quotes
+price_refresher = PeriodicTask("price-refresh", PRICE_REFRESH_INTERVAL, investments.portfolio_service.refresh_valuations)
+# Regenerates stored insights for users whose transactions moved past their watermark
+insights_refresher = PeriodicTask("insights-refresh", INSIGHTS_INTERVAL, insights.insights_service.refresh_stale)
+
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    if PRICE_REFRESH_INTERVAL > 0:
+        price_refresher.start()
+    if INSIGHTS_INTERVAL > 0:
+        insights_refresher.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await price_refresher.stop()
+    await insights_refresher.stop()
 
 # Include routers
 app.include_router(chat.router, prefix="/api")
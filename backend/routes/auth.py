@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from database.queries import get_db_connection
+from database.aio import run_in_db
 import uuid
 
 router = APIRouter()
@@ -14,58 +14,54 @@ class SignupRequest(BaseModel):
     password: str
     name: str
 
-@router.post("/signup")
-async def signup(request: SignupRequest):
-    conn = get_db_connection()
+def _create_user(conn, request: SignupRequest) -> dict:
     cursor = conn.cursor()
     
+    # Check if user exists
+    cursor.execute("SELECT id FROM users WHERE phone = ?", (request.phone,))
+    if cursor.fetchone():
+        raise HTTPException(status_code=400, detail="Phone number already registered")
+    
+    user_id = str(uuid.uuid4())
+    
+    # Create user
+    cursor.execute(
+        "INSERT INTO users (id, phone, name, password) VALUES (?, ?, ?, ?)",
+        (user_id, request.phone, request.name, request.password)
+    )
+    
+    # Create default profile
+    cursor.execute(
+        "INSERT INTO user_profiles (id, user_id) VALUES (?, ?)",
+        (str(uuid.uuid4()), user_id)
+    )
+    
+    return {"id": user_id, "name": request.name, "phone": request.phone}
+
+def _find_user(conn, request: LoginRequest):
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT id, name, phone FROM users WHERE phone = ? AND password = ?", 
+        (request.phone, request.password)
+    )
+    return cursor.fetchone()
+
+@router.post("/signup")
+async def signup(request: SignupRequest):
     try:
-        # Check if user exists
-        cursor.execute("SELECT id FROM users WHERE phone = ?", (request.phone,))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Phone number already registered")
-        
-        user_id = str(uuid.uuid4())
-        
-        # Create user
-        cursor.execute(
-            "INSERT INTO users (id, phone, name, password) VALUES (?, ?, ?, ?)",
-            (user_id, request.phone, request.name, request.password)
-        )
-        
-        # Create default profile
-        cursor.execute(
-            "INSERT INTO user_profiles (id, user_id) VALUES (?, ?)",
-            (str(uuid.uuid4()), user_id)
-        )
-        
-        conn.commit()
-        return {"id": user_id, "name": request.name, "phone": request.phone}
+        return await run_in_db(_create_user, request)
         
     except Exception as e:
         if isinstance(e, HTTPException):
             raise e
         print(f"Signup error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 @router.post("/login")
 async def login(request: LoginRequest):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    user = await run_in_db(_find_user, request)
     
-    try:
-        cursor.execute(
-            "SELECT id, name, phone FROM users WHERE phone = ? AND password = ?", 
-            (request.phone, request.password)
-        )
-        user = cursor.fetchone()
-        
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid phone or password")
-            
-        return {"id": user[0], "name": user[1], "phone": user[2]}
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid phone or password")
         
-    finally:
-        conn.close()
+    return {"id": user[0], "name": user[1], "phone": user[2]}
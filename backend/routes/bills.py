@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-import sqlite3
+from database.aio import run_in_db
+from database.ledger import insert_transaction
+from database.ids import new_id
 import uuid
 from datetime import datetime
 
@@ -12,18 +14,25 @@ class BillPayment(BaseModel):
     bill_type: str 
     category: str = None # Optional category override
 
-def get_db_connection():
-    conn = sqlite3.connect('fundpal.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+def _record_bill_payment(conn, user_id: str, payment: BillPayment, txn_id: str, category: str):
+    insert_transaction(
+        conn.cursor(),
+        user_id,
+        'expense',
+        payment.amount,
+        category=category,
+        description=f"Paid to {payment.biller_name}",
+        transaction_date=datetime.now().strftime('%Y-%m-%d'),
+        source='FundPal Wallet',
+        logged_via='app_bill_pay',
+        txn_id=txn_id
+    )
+    conn.commit()
 
 @router.post("/bills/pay")
 async def pay_bill(user_id: str, payment: BillPayment):
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        txn_id = f"txn_{uuid.uuid4().hex[:8]}"
+        txn_id = new_id("txn")
         
         # Determine category
         category = payment.category
@@ -32,46 +41,7 @@ async def pay_bill(user_id: str, payment: BillPayment):
             if payment.bill_type == 'merchant':
                 category = "Shopping"
         
-        try:
-            # Try inserting with all columns
-            cursor.execute("""
-                INSERT INTO transactions (id, user_id, type, amount, category, description, source, transaction_date, logged_via)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                txn_id,
-                user_id,
-                'expense',
-                payment.amount,
-                category,
-                f"Paid to {payment.biller_name}",
-                'FundPal Wallet',
-                datetime.now().strftime('%Y-%m-%d'),
-                'app_bill_pay'
-            ))
-            conn.commit()
-        except Exception as e:
-            print(f"Primary insert failed: {e}")
-            try:
-                # Fallback for older schema
-                cursor.execute("""
-                    INSERT INTO transactions (id, user_id, type, amount, category, description, transaction_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    txn_id,
-                    user_id,
-                    'expense',
-                    payment.amount,
-                    category,
-                    f"Paid to {payment.biller_name}",
-                    datetime.now().strftime('%Y-%m-%d')
-                ))
-                conn.commit()
-            except Exception as e2:
-                print(f"Fallback insert failed: {e2}. Proceeding as mock.")
-                # Mock success if DB fails
-                pass
-                
-        conn.close()
+        await run_in_db(_record_bill_payment, user_id, payment, txn_id, category)
         return {"status": "success", "txn_id": txn_id, "message": f"Paid ₹{payment.amount} to {payment.biller_name}"}
         
     except Exception as e:
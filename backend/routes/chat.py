@@ -1,4 +1,6 @@
+import json
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 from agents.orchestrator import AgentOrchestrator
@@ -31,3 +33,32 @@ async def chat(user_id: str, message: ChatMessage):
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/api/chat/stream")
+async def chat_stream(user_id: str, message: ChatMessage):
+    """
+    Streaming chat endpoint (NDJSON, one event per line).
+    Emits "parsed" and "card" as soon as they are known, then coach "token"s
+    and safety "alert"s, and finally a "done" event shaped like ChatResponse.
+    """
+    print(f"DEBUG: Stream endpoint hit! User: {user_id}, Msg: {message.message}")
+
+    async def events():
+        try:
+            async for event in orchestrator.stream_message(user_id, message.message):
+                yield json.dumps(event, default=str) + "\n"
+        except Exception as e:
+            # Headers are already sent, so errors travel in-band
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/api/chat/cache-stats")
+async def cache_stats():
+    """Hit/miss counters for the coach response cache"""
+    cache = orchestrator.coach.cache
+    return cache.stats() if cache is not None else {"enabled": False}
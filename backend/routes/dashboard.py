@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException
-from database.queries import get_user_state
+from fastapi import APIRouter, HTTPException, Request, Response
+from database.aio import run_in_db
+from services.dashboard import read_dashboard
 
 router = APIRouter()
 
 @router.get("/dashboard")
-async def get_dashboard(user_id: str):
-    """Get dashboard data"""
+async def get_dashboard(user_id: str, request: Request):
+    """
+    Get dashboard data.
+    Served from a materialized snapshot; send If-None-Match with the last ETag
+    to get a 304 when nothing the dashboard depends on has changed.
+    """
     try:
-        # In a real app, this would aggregate data from multiple tables
-        # For now, we reuse the get_user_state which provides a summary
-        state = await get_user_state(user_id)
-        return state
+        etag, payload = await run_in_db(read_dashboard, user_id, request.headers.get("if-none-match"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if payload is None:
+        return Response(status_code=304, headers=headers)
+    # Stored as JSON text; no re-serialization
+    return Response(content=payload, media_type="application/json", headers=headers)
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import List, Optional
-import sqlite3
-import uuid
+from database.aio import execute, fetch_all
+from database.ids import new_id
 from datetime import datetime
 
 router = APIRouter()
@@ -14,27 +14,15 @@ class DebtCreate(BaseModel):
     emi_amount: float
     emi_day: int
 
-def get_db_connection():
-    conn = sqlite3.connect('fundpal.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
 @router.get("/debts")
 async def get_debts(user_id: str):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM debts WHERE user_id = ?", (user_id,))
-    debts = [dict(row) for row in cursor.fetchall()]
-    conn.close()
-    return debts
+    return await fetch_all("SELECT * FROM debts WHERE user_id = ?", (user_id,))
 
 @router.post("/debts")
 async def create_debt(user_id: str, debt: DebtCreate):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    debt_id = f"debt_{uuid.uuid4().hex[:8]}"
+    debt_id = new_id("debt")
     
-    cursor.execute("""
+    await execute("""
         INSERT INTO debts (id, user_id, name, principal, current_balance, interest_rate, emi_amount, emi_day)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """, (
@@ -48,6 +36,4 @@ async def create_debt(user_id: str, debt: DebtCreate):
         debt.emi_day
     ))
     
-    conn.commit()
-    conn.close()
     return {"status": "success", "id": debt_id}
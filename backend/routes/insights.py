@@ -1,54 +1,44 @@
-from fastapi import APIRouter, HTTPException
-from database.queries import get_db_connection
-from agents.coach import CoachAgent
+from datetime import date
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from database.queries import get_category_breakdown, get_transactions_page
+from services.insights import InsightsService
 
 router = APIRouter()
-coach = CoachAgent()
+insights_service = InsightsService()
 
 @router.get("/insights")
-async def get_insights(user_id: str):
+async def get_insights(user_id: str, start: Optional[str] = None, end: Optional[str] = None,
+                       limit: int = Query(10, ge=1, le=100)):
+    """
+    Spending breakdown over [start, end) (ISO dates, default: this month so far),
+    the stored insight and the first page of recent transactions.
+    """
     try:
-        conn = get_db_connection()
-        conn.row_factory = dict_factory
-        cursor = conn.cursor()
-        
-        # Fetch recent transactions
-        cursor.execute("""
-            SELECT * FROM transactions 
-            WHERE user_id = ? 
-            ORDER BY transaction_date DESC 
-            LIMIT 50
-        """, (user_id,))
-        transactions = cursor.fetchall()
-        
-        conn.close()
-        
-        # Calculate Category Breakdown
-        category_spend = {}
-        total_spend = 0
-        for t in transactions:
-            if t['type'] == 'expense':
-                cat = t.get('category', 'Uncategorized')
-                amt = t['amount']
-                category_spend[cat] = category_spend.get(cat, 0) + amt
-                total_spend += amt
-        
-        # Generate AI Insight
-        insight_text = await coach.generate_insights(transactions)
-        
+        start = start or date.today().replace(day=1).isoformat()
+
+        # Summed in SQL over the whole range, not just the latest rows
+        breakdown = await get_category_breakdown(user_id, start, end)
+        total_spend = sum(c["total"] for c in breakdown)
+
+        recent, next_cursor = await get_transactions_page(user_id, limit)
+
+        # Precomputed by the insights job; never waits on the LLM here
+        insight = await insights_service.get_insight(user_id)
+
         return {
-            "insight": insight_text,
-            "total_spend": total_spend,
-            "category_breakdown": category_spend,
-            "recent_transactions": transactions[:10] # Send top 10 for list
+            "insight": insight["insight"],
+            "insight_generated_at": insight["generated_at"],
+            "insight_pending": insight["pending"],
+            "start": start,
+            "end": end,
+            "total_spend": round(total_spend, 2),
+            "category_breakdown": {c["category"]: c["total"] for c in breakdown},
+            "category_counts": {c["category"]: c["count"] for c in breakdown},
+            "recent_transactions": recent,
+            "next_cursor": next_cursor  # page on with /api/transactions?cursor=
         }
-        
+
     except Exception as e:
         print(f"Error generating insights: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-
-def dict_factory(cursor, row):
-    d = {}
-    for idx, col in enumerate(cursor.description):
-        d[col[0]] = row[idx]
-    return d
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict, Any
-from database.queries import get_db_connection
-from datetime import datetime
+from fastapi import APIRouter, Header, HTTPException
+from pydantic import BaseModel, Field
+from typing import List, Dict, Any, Optional
+from database.aio import fetch_all, run_in_db
+from database.connection import begin_immediate
+from database.ids import new_id
 from services.portfolio import PortfolioService
 
 portfolio_service = PortfolioService()
@@ -16,112 +17,97 @@ class InvestmentPlan(BaseModel):
 
 class ExecuteRequest(BaseModel):
     symbol: str
-    quantity: float
+    quantity: float = Field(..., gt=0)
     action: str # "BUY" or "SELL"
 
 @router.get("/investments")
 async def get_investments(user_id: str):
     """Get user investments"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM investments WHERE user_id = ?", (user_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        return await fetch_all("SELECT * FROM investments WHERE user_id = ?", (user_id,))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-import traceback
-import uuid
+def _plan_rows(user_id: str, plan: InvestmentPlan) -> List[tuple]:
+    rows = []
+    for category, details in plan.allocation.items():
+        # details = {"pct": 60, "fund": "Name", "expected_return": "12%"}
+        # category is the Asset Class (e.g. "Equity")
+
+        # Map category to type (simple heuristic)
+        inv_type = "growth"
+        if category in ["Liquid", "FD", "Debt"]:
+            inv_type = "safety"
+        elif category == "Gold":
+            inv_type = "hedging"
+
+        rows.append((
+            new_id("inv"),
+            user_id,
+            inv_type,
+            category, # Use category as asset_class
+            details.get("fund", "Generic Fund"),
+            "moderate",
+            details.get("pct", 0),
+            "active"
+        ))
+    return rows
+
+def _plan_legs(plan: InvestmentPlan) -> List[Dict[str, Any]]:
+    """One buy leg per allocation with a ticker, sized by its share of total_amount"""
+    return [
+        {"symbol": details["ticker"], "amount": plan.total_amount * (details.get("pct", 0) / 100)}
+        for details in plan.allocation.values()
+        if details.get("ticker") and plan.total_amount * (details.get("pct", 0) / 100) > 0
+    ]
+
+def _save_plan(conn, user_id: str, plan: InvestmentPlan, legs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Replace the user's allocation and book the basket in one DB transaction"""
+    begin_immediate(conn)
+    cursor = conn.cursor()
+    # Clear existing for MVP simplicity (or append)
+    cursor.execute("DELETE FROM investments WHERE user_id = ?", (user_id,))
+    cursor.executemany("""
+        INSERT INTO investments (id, user_id, type, asset_class, fund_name, risk_level, allocation_percentage, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, _plan_rows(user_id, plan))
+    return portfolio_service.write_basket(cursor, user_id, legs)
 
 @router.post("/investments")
 async def save_investment_plan(user_id: str, plan: InvestmentPlan):
-    """Save investment allocation as active investments"""
+    """Save investment allocation as active investments and buy the funds as one basket"""
     print(f"DEBUG: Saving investment plan for {user_id}: {plan}")
-    conn = None
+    # All legs priced with one batched quote fetch, outside the DB transaction
+    legs = await portfolio_service.aprice_basket(_plan_legs(plan))
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Clear existing for MVP simplicity (or append)
-        cursor.execute("DELETE FROM investments WHERE user_id = ?", (user_id,))
-        
-        for category, details in plan.allocation.items():
-            # details = {"pct": 60, "fund": "Name", "expected_return": "12%"}
-            # category is the Asset Class (e.g. "Equity")
-            
-            # Map category to type (simple heuristic)
-            inv_type = "growth"
-            if category in ["Liquid", "FD", "Debt"]:
-                inv_type = "safety"
-            elif category == "Gold":
-                inv_type = "hedging"
-            
-            # Use UUID for unique ID
-            inv_id = f"inv_{uuid.uuid4().hex[:8]}"
-            
-            cursor.execute("""
-                INSERT INTO investments (id, user_id, type, asset_class, fund_name, risk_level, allocation_percentage, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                inv_id,
-                user_id,
-                inv_type,
-                category, # Use category as asset_class
-                details.get("fund", "Generic Fund"),
-                "moderate", 
-                details.get("pct", 0),
-                "active"
-            ))
-            
-        conn.commit()
+        execution = await run_in_db(_save_plan, user_id, plan, legs)
     except Exception as e:
-        print("ERROR saving investments:")
-        traceback.print_exc()
+        print(f"ERROR saving investments: {e}")
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        if conn:
-            conn.close()
-            
-    # --- PORTFOLIO EXECUTION ---
-    # Execute buys AFTER closing the main connection to avoid SQLite locking issues
-    print(f"DEBUG: Executing portfolio buys for {user_id}")
-    for category, details in plan.allocation.items():
-        try:
-            ticker = details.get("ticker")
-            if ticker:
-                # Calculate amount for this fund
-                fund_amount = plan.total_amount * (details.get("pct", 0) / 100)
-                
-                # Parsing "₹296.49"
-                price_str = str(details.get("current_price", "0")).replace("₹", "").replace(",", "")
-                try:
-                    price = float(price_str)
-                except:
-                    price = 0
-                    
-                if price > 0:
-                    quantity = fund_amount / price
-                    # Execute Buy
-                    print(f"DEBUG: Auto-buying {quantity:.2f} units of {ticker} for {user_id}")
-                    portfolio_service.execute_buy(user_id, ticker, quantity)
-        except Exception as e:
-            print(f"DEBUG: Failed to auto-execute buy for {details.get('ticker')}: {e}")
-            traceback.print_exc()
 
-    return {"status": "success", "message": "Investment plan saved and executed"}
+    if execution["status"] == "error":
+        # The plan is saved; the buys are all-or-nothing and none went through
+        print(f"DEBUG: Basket for {user_id} not executed: {execution['message']}")
+        return {"status": "success", "message": f"Investment plan saved, orders not placed: {execution['message']}",
+                "execution": execution}
+    return {"status": "success", "message": "Investment plan saved and executed", "execution": execution}
 
 @router.post("/execute")
-async def execute_trade(user_id: str, request: ExecuteRequest):
-    """Execute a trade (Buy/Sell)"""
+async def execute_trade(user_id: str, request: ExecuteRequest,
+                        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
+    """
+    Execute a trade (Buy/Sell). Send an Idempotency-Key header to make retries
+    safe: a repeat returns the original fill (`replayed: true`) instead of trading again.
+    """
     if request.action.upper() == "BUY":
-        result = portfolio_service.execute_buy(user_id, request.symbol, request.quantity)
+        result = await portfolio_service.aexecute_buy(user_id, request.symbol, request.quantity, idempotency_key)
     elif request.action.upper() == "SELL":
-        result = portfolio_service.execute_sell(user_id, request.symbol, request.quantity)
+        result = await portfolio_service.aexecute_sell(user_id, request.symbol, request.quantity, idempotency_key)
     else:
         raise HTTPException(status_code=400, detail="Invalid action")
         
+    if result.get("conflict"):
+        raise HTTPException(status_code=409, detail=result["message"])
     if result["status"] == "error":
         raise HTTPException(status_code=400, detail=result["message"])
         
@@ -129,5 +115,5 @@ async def execute_trade(user_id: str, request: ExecuteRequest):
 
 @router.get("/portfolio")
 async def get_portfolio(user_id: str):
-    """Get user portfolio with live values"""
-    return portfolio_service.get_portfolio(user_id)
+    """Get user portfolio with the latest background valuations (see `as_of` / `stale`)"""
+    return await portfolio_service.aget_portfolio(user_id)
@@ -4,7 +4,9 @@ import uuid
 from datetime import datetime
 from fastapi.responses import HTMLResponse
 from database.schema import init_db
-import sqlite3
+from database.aio import run_in_db
+from database.ledger import insert_transaction
+from database.ids import new_id
 
 router = APIRouter()
 
@@ -17,11 +19,6 @@ class CreateOrderRequest(BaseModel):
     user_phone: str = "9999999999"
     user_name: str = "FundPal User"
 
-def get_db_connection():
-    conn = sqlite3.connect('fundpal.db')
-    conn.row_factory = sqlite3.Row
-    return conn
-
 @router.get("/api/payment/gateway", response_class=HTMLResponse)
 async def payment_gateway(order_id: str, amount: float):
     html_content = f"""
@@ -80,32 +77,28 @@ async def create_order(order_req: CreateOrderRequest):
         "payment_link": f"http://{BACKEND_HOST}/api/payment/gateway?order_id={order_id}&amount={order_req.amount}"
     }
 
+def _record_topup(conn, order_data: dict, txn_id: str):
+    insert_transaction(
+        conn.cursor(),
+        order_data['user_id'],
+        'income',
+        order_data['amount'],
+        category='Salary/Income',
+        description='Added via FundPal Gateway',
+        transaction_date=datetime.now().strftime('%Y-%m-%d'),
+        source='Bank Transfer',
+        logged_via='app_payment',
+        txn_id=txn_id
+    )
+
 @router.post("/api/payment/verify")
 async def verify_payment(order_id: str):
     order_data = PENDING_ORDERS.get(order_id)
     if order_data:
         # Insert into database
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            txn_id = f"txn_{uuid.uuid4().hex[:8]}"
-            cursor.execute("""
-                INSERT INTO transactions (id, user_id, type, amount, category, description, source, transaction_date, logged_via)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                txn_id,
-                order_data['user_id'],
-                'income',
-                order_data['amount'],
-                'Salary/Income',
-                'Added via FundPal Gateway',
-                'Bank Transfer',
-                datetime.now().strftime('%Y-%m-%d'),
-                'app_payment'
-            ))
-            conn.commit()
-            conn.close()
+            txn_id = new_id("txn")
+            await run_in_db(_record_topup, order_data, txn_id)
             print(f"DEBUG: Transaction {txn_id} recorded for Order {order_id}")
             return {"status": "success", "data": {"order_status": "PAID"}}
         except Exception as e:
@@ -1,21 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from database.queries import get_db_connection
+import json
+from fastapi import APIRouter, HTTPException, Query, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from database.queries import get_transactions_page
+from services.importer import TransactionImporter
 
 router = APIRouter()
 
 @router.get("/transactions")
-async def get_transactions(user_id: str, limit: int = 20):
-    """Get recent transactions"""
+async def get_transactions(user_id: str, response: Response, limit: int = Query(20, ge=1, le=100), cursor: Optional[str] = None):
+    """
+    Get recent transactions, newest first.
+    Pass the X-Next-Cursor header of a response as `cursor` to get the next page.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            "SELECT * FROM transactions WHERE user_id = ? ORDER BY transaction_date DESC LIMIT ?", 
-            (user_id, limit)
-        )
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(row) for row in rows]
+        page, next_cursor = await get_transactions_page(user_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
+
+@router.post("/transactions/import")
+async def import_transactions(user_id: str, file: UploadFile = File(...), format: Optional[str] = None):
+    """
+    Bulk import a bank statement (CSV or OFX).
+    Streams NDJSON progress events (one per committed chunk) and a final summary.
+    """
+    if format and format.lower() not in ("csv", "ofx"):
+        raise HTTPException(status_code=400, detail="format must be csv or ofx")
+    importer = TransactionImporter()
+
+    def events():
+        # Sync generator: Starlette iterates it in the threadpool, off the event loop, possibly on a
+        # different thread per chunk, so the importer holds a DB connection only within a chunk
+        try:
+            for event in importer.import_stream(user_id, file.file, fmt=format, filename=file.filename):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -0,0 +1,234 @@
+"""
+Vectorized portfolio analytics.
+
+All holdings (one user or every user) are loaded as flat NumPy arrays and
+valued in a single pass: market value, invested value, P&L, per-holding
+weights, asset-class exposure and drift from the allocation saved in
+`investments`. Per-user totals are group sums over a user index, so the
+nightly batch costs the same number of array ops as a single user.
+
+Usage (from backend/):
+    python -m services.analytics [--user <id>] [--live] [--json out.json]
+"""
+import argparse
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from database.connection import get_db_connection
+from agents.allocation import AllocationAgent
+from .market_data import MarketDataService
+
+OTHER = "Other"
+
+
+def _ticker_asset_classes() -> Dict[str, str]:
+    """Ticker -> asset class from the fund database; proxy tickers keep their first class"""
+    mapping = {}
+    for asset_class, funds in AllocationAgent.FUND_DATABASE.items():
+        for fund in funds:
+            mapping.setdefault(fund["ticker"], asset_class)
+    return mapping
+
+
+TICKER_ASSET_CLASS = _ticker_asset_classes()
+
+
+class PortfolioAnalytics:
+    def __init__(self, market_data: Optional[MarketDataService] = None):
+        self._market_data = market_data
+
+    @property
+    def market_data(self) -> MarketDataService:
+        # Only needed for live pricing, so don't build it (and its quote cache) up front
+        if self._market_data is None:
+            self._market_data = MarketDataService()
+        return self._market_data
+
+    def load_holdings(self, user_id: Optional[str] = None, live: bool = False) -> Dict[str, np.ndarray]:
+        """
+        Holdings as column arrays. Prices are the background valuations
+        (see PortfolioService.refresh_valuations) unless live=True, which
+        does one batched quote fetch for every distinct symbol.
+        """
+        conn = get_db_connection()
+        try:
+            query = "SELECT user_id, symbol, quantity, average_buy_price, current_price, current_value FROM portfolio"
+            params = ()
+            if user_id is not None:
+                query += " WHERE user_id = ?"
+                params = (user_id,)
+            rows = conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+        return self.to_arrays(rows, live=live)
+
+    def to_arrays(self, rows: List[Any], live: bool = False) -> Dict[str, np.ndarray]:
+        n = len(rows)
+        users = np.array([r["user_id"] for r in rows], dtype=object)
+        symbols = np.array([r["symbol"] for r in rows], dtype=object)
+        quantity = np.fromiter((r["quantity"] for r in rows), dtype=float, count=n)
+        avg_price = np.fromiter((r["average_buy_price"] for r in rows), dtype=float, count=n)
+        stored_price = np.fromiter(
+            (np.nan if r["current_price"] is None else r["current_price"] for r in rows), dtype=float, count=n
+        )
+        stored_value = np.fromiter(
+            (np.nan if r["current_value"] is None else r["current_value"] for r in rows), dtype=float, count=n
+        )
+
+        if live and n:
+            unique_symbols, inverse = np.unique(symbols.astype(str), return_inverse=True)
+            quotes = self.market_data.get_prices(list(unique_symbols))
+            price = np.array([quotes[s] for s in unique_symbols], dtype=float)[inverse]
+        else:
+            # Not refreshed yet: value recorded at trade time, else cost
+            with np.errstate(divide="ignore", invalid="ignore"):
+                trade_price = np.where(quantity > 0, stored_value / quantity, np.nan)
+            price = np.where(np.isnan(stored_price), trade_price, stored_price)
+            price = np.where(np.isnan(price), avg_price, price)
+
+        return {"user_id": users, "symbol": symbols, "quantity": quantity, "average_price": avg_price, "price": price}
+
+    def load_targets(self, user_id: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Saved plan allocation per user: {user_id: {asset_class: fraction}}"""
+        conn = get_db_connection()
+        try:
+            query = """
+                SELECT user_id, asset_class, SUM(allocation_percentage) AS pct
+                FROM investments
+                WHERE status = 'active'
+            """
+            params = ()
+            if user_id is not None:
+                query += " AND user_id = ?"
+                params = (user_id,)
+            query += " GROUP BY user_id, asset_class"
+            targets = {}
+            for row in conn.execute(query, params).fetchall():
+                targets.setdefault(row["user_id"], {})[row["asset_class"]] = (row["pct"] or 0) / 100
+            return targets
+        finally:
+            conn.close()
+
+    def compute(self, holdings: Dict[str, np.ndarray], targets: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Dict[str, Any]]:
+        """One vectorized pass over all holdings; returns {user_id: analytics}"""
+        targets = targets or {}
+        quantity = holdings["quantity"]
+        price = holdings["price"]
+        avg_price = holdings["average_price"]
+        symbols = holdings["symbol"]
+
+        user_ids, user_idx = np.unique(holdings["user_id"].astype(str), return_inverse=True)
+        held = set(user_ids)
+        # Users with a saved plan but no holdings yet still get (fully drifted) results
+        user_ids = list(user_ids) + [u for u in targets if u not in held]
+        n_users = len(user_ids)
+
+        value = quantity * price
+        invested = quantity * avg_price
+        pnl = value - invested
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pnl_pct = np.where(invested > 0, pnl / invested * 100, 0.0)
+
+        total_value = np.bincount(user_idx, weights=value, minlength=n_users)
+        total_invested = np.bincount(user_idx, weights=invested, minlength=n_users)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(total_value[user_idx] > 0, value / total_value[user_idx], 0.0)
+
+        # Asset classes: fund database order, then anything only seen in targets, then Other
+        classes = list(AllocationAgent.FUND_DATABASE.keys())
+        for allocation in targets.values():
+            classes += [c for c in allocation if c not in classes]
+        classes.append(OTHER)
+        class_index = {c: i for i, c in enumerate(classes)}
+        unique_symbols, symbol_idx = np.unique(symbols.astype(str), return_inverse=True)
+        symbol_class = np.array(
+            [class_index[TICKER_ASSET_CLASS.get(s, OTHER)] for s in unique_symbols], dtype=int
+        )
+        holding_class = symbol_class[symbol_idx] if len(symbols) else np.zeros(0, dtype=int)
+
+        exposure_value = np.zeros((n_users, len(classes)))
+        np.add.at(exposure_value, (user_idx, holding_class), value)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            exposure = np.where(total_value[:, None] > 0, exposure_value / total_value[:, None], 0.0)
+
+        target = np.zeros((n_users, len(classes)))
+        has_target = np.zeros(n_users, dtype=bool)
+        for u, user_id in enumerate(user_ids):
+            for asset_class, fraction in targets.get(user_id, {}).items():
+                target[u, class_index[asset_class]] = fraction
+                has_target[u] = True
+        drift = exposure - target
+        max_drift = np.abs(drift).max(axis=1) if len(classes) else np.zeros(n_users)
+
+        # Only rounding and dict building below; no arithmetic per holding
+        value_r, invested_r, pnl_r = np.round(value, 2), np.round(invested, 2), np.round(pnl, 2)
+        pnl_pct_r, weight_r, price_r = np.round(pnl_pct, 2), np.round(weight * 100, 2), np.round(price, 2)
+        order = np.argsort(user_idx, kind="stable")
+        bounds = np.searchsorted(user_idx[order], np.arange(n_users + 1))
+
+        results = {}
+        for u, user_id in enumerate(user_ids):
+            rows = order[bounds[u]:bounds[u + 1]]
+            results[user_id] = {
+                "holdings": [
+                    {
+                        "symbol": symbols[i],
+                        "asset_class": classes[holding_class[i]],
+                        "quantity": float(quantity[i]),
+                        "average_price": float(avg_price[i]),
+                        "current_price": float(price_r[i]),
+                        "current_value": float(value_r[i]),
+                        "invested_value": float(invested_r[i]),
+                        "pnl": float(pnl_r[i]),
+                        "pnl_pct": float(pnl_pct_r[i]),
+                        "weight_pct": float(weight_r[i]),
+                    }
+                    for i in rows
+                ],
+                "total_value": round(float(total_value[u]), 2),
+                "total_invested": round(float(total_invested[u]), 2),
+                "total_pnl": round(float(total_value[u] - total_invested[u]), 2),
+                "exposure": {c: round(float(exposure[u, k]) * 100, 2) for k, c in enumerate(classes) if exposure[u, k]},
+                "drift": (
+                    {c: round(float(drift[u, k]) * 100, 2) for k, c in enumerate(classes) if drift[u, k]}
+                    if has_target[u] else None
+                ),
+                "max_drift_pct": round(float(max_drift[u]) * 100, 2) if has_target[u] else None,
+            }
+        return results
+
+    def analyze_user(self, user_id: str, live: bool = False) -> Dict[str, Any]:
+        targets = self.load_targets(user_id)
+        targets.setdefault(user_id, {})
+        return self.compute(self.load_holdings(user_id, live=live), targets)[user_id]
+
+    def analyze_all_users(self, live: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Nightly batch: every user's holdings in one pass"""
+        return self.compute(self.load_holdings(live=live), self.load_targets())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio analytics (single user or nightly batch)")
+    parser.add_argument("--user", help="Only analyze this user")
+    parser.add_argument("--live", action="store_true", help="Price with a batched live quote fetch")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    analytics = PortfolioAnalytics()
+    if args.user:
+        results = {args.user: analytics.analyze_user(args.user, live=args.live)}
+    else:
+        results = analytics.analyze_all_users(live=args.live)
+
+    for user_id, result in results.items():
+        print(f"{user_id}: value ₹{result['total_value']}, P&L ₹{result['total_pnl']}, "
+              f"{len(result['holdings'])} holdings, max drift {result['max_drift_pct']}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Materialized per-user dashboard.
+
+The payload (state summary, health score, safe-to-spend, category breakdown,
+goal progress, portfolio value) is built once and stored in
+`dashboard_snapshots` together with the user's data version. Triggers bump
+`user_data_versions` whenever a transaction, goal, debt, holding or profile
+changes (database/migrations.py), so a snapshot is served as-is until one of its
+inputs changes or the day rolls over (the windowed figures are date-relative).
+
+The ETag is derived from the version and date, so a client revalidating with
+If-None-Match costs a single primary-key read and a 304.
+"""
+import json
+from datetime import date
+from typing import Any, Dict, Optional, Tuple
+
+from database.queries import read_user_state
+from financial_logic import calculate_health_score, calculate_safe_to_spend
+
+# Same assumptions the planner uses for its safe-to-spend figure
+GOAL_ALLOCATION_SHARE = 0.2
+DEFAULT_INCOME_STABILITY = 80
+
+
+def read_version(cursor, user_id: str) -> int:
+    cursor.execute("SELECT version FROM user_data_versions WHERE user_id = ?", (user_id,))
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def make_etag(version: int, today: date) -> str:
+    return f'W/"{version}-{today.isoformat()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison: proxies may strip or add the W/ prefix
+    return "*" in candidates or etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
+
+
+def build_dashboard(conn, user_id: str, today: Optional[date] = None) -> Dict[str, Any]:
+    """Compute the dashboard payload from the ledger, rollups, goals and holdings"""
+    today = today or date.today()
+    cursor = conn.cursor()
+    state = read_user_state(conn, user_id, today)
+
+    monthly_income = state.get("monthly_income", 0)
+    health_score = calculate_health_score(
+        savings_rate=state["savings_rate"],
+        income_stability_score=DEFAULT_INCOME_STABILITY,
+        emergency_fund_months=state["emergency_fund_months"]
+    )
+    safe_to_spend = calculate_safe_to_spend(
+        predicted_income=monthly_income,
+        essential_expenses=state["daily_essential"] * 30,
+        goal_allocation=monthly_income * GOAL_ALLOCATION_SHARE
+    )
+
+    cursor.execute("""
+        SELECT id, name, target_amount, current_amount, deadline
+        FROM goals WHERE user_id = ? AND status = 'active'
+        ORDER BY priority, deadline
+    """, (user_id,))
+    goals = []
+    for row in cursor.fetchall():
+        target = row["target_amount"] or 0
+        current = row["current_amount"] or 0
+        goals.append({
+            "id": row["id"],
+            "name": row["name"],
+            "target_amount": target,
+            "current_amount": current,
+            "deadline": row["deadline"],
+            "progress_pct": round(min(current / target * 100, 100), 1) if target else 0.0,
+        })
+
+    cursor.execute("""
+        SELECT COALESCE(SUM(current_value), 0), COALESCE(SUM(quantity * average_buy_price), 0), MIN(priced_at)
+        FROM portfolio WHERE user_id = ?
+    """, (user_id,))
+    portfolio_value, invested, priced_at = cursor.fetchone()
+
+    month_spend = sum(c["spent"] for c in state["categories"].values())
+    category_breakdown = [
+        {
+            "category": category,
+            "spent": data["spent"],
+            "budget": data["budget"],
+            "share_pct": round(data["spent"] / month_spend * 100, 1) if month_spend else 0.0,
+        }
+        for category, data in sorted(state["categories"].items(), key=lambda item: -item[1]["spent"])
+    ]
+
+    return {
+        **state,
+        "health_score": health_score,
+        "safe_to_spend_daily": safe_to_spend,
+        "category_breakdown": category_breakdown,
+        "goals": goals,
+        "portfolio": {
+            "value": round(portfolio_value, 2),
+            "invested": round(invested, 2),
+            "pnl": round(portfolio_value - invested, 2),
+            "priced_at": priced_at,
+        },
+        "as_of": today.isoformat(),
+    }
+
+
+def read_dashboard(conn, user_id: str, if_none_match: Optional[str] = None,
+                   today: Optional[date] = None) -> Tuple[str, Optional[str]]:
+    """
+    (etag, payload_json). payload_json is None when if_none_match already names
+    the current version. Rebuilds and stores the snapshot only if it is stale.
+    """
+    today = today or date.today()
+    cursor = conn.cursor()
+    # Read the version before building: a write racing the build bumps it, so
+    # the snapshot is stored under the older version and rebuilt next time
+    version = read_version(cursor, user_id)
+    etag = make_etag(version, today)
+    if etag_matches(if_none_match, etag):
+        return etag, None
+
+    cursor.execute("SELECT version, as_of, payload FROM dashboard_snapshots WHERE user_id = ?", (user_id,))
+    row = cursor.fetchone()
+    if row and row["version"] == version and row["as_of"] == today.isoformat():
+        return etag, row["payload"]
+
+    payload = json.dumps({**build_dashboard(conn, user_id, today), "version": version}, default=str)
+    cursor.execute("""
+        INSERT INTO dashboard_snapshots (user_id, version, as_of, payload, built_at)
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(user_id) DO UPDATE SET
+            version = excluded.version, as_of = excluded.as_of,
+            payload = excluded.payload, built_at = excluded.built_at
+        WHERE excluded.version >= dashboard_snapshots.version
+    """, (user_id, version, today.isoformat(), payload))
+    return etag, payload
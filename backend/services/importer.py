@@ -0,0 +1,316 @@
+"""
+Bulk transaction import from bank statements (CSV or OFX).
+
+The statement is read row by row from a binary file object, so memory stays
+bounded by the chunk size, not the file size. Rows are categorized with the
+same local rules the chat fast path uses (agents/rules.py), deduplicated
+against what the user already has, and written with one executemany plus
+one ledger update per chunk, each chunk in its own DB transaction on a
+pooled connection that is acquired and returned within the chunk (the
+generator may be resumed on a different thread after every yield).
+
+import_stream() yields a progress dict after every chunk and a final
+summary, which the upload endpoint streams back as NDJSON.
+"""
+import csv
+import functools
+import io
+import itertools
+import re
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from database.connection import get_db_connection
+from database.ids import new_id
+from database.ledger import insert_transactions
+from agents.rules import categorize
+
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+# Header aliases seen in Indian bank / card statement exports (lower-cased)
+COLUMN_ALIASES = {
+    "date": ["date", "txn date", "transaction date", "value date", "posted date", "posting date", "tran date"],
+    "description": ["description", "narration", "particulars", "details", "remarks", "memo", "payee",
+                    "transaction details", "transaction remarks"],
+    "amount": ["amount", "transaction amount", "amount (inr)", "amt"],
+    "debit": ["debit", "withdrawal", "withdrawal amt", "withdrawal amount", "debit amount", "dr"],
+    "credit": ["credit", "deposit", "deposit amt", "deposit amount", "credit amount", "cr"],
+    "type": ["type", "dr/cr", "cr/dr", "transaction type", "txn type"],
+    "category": ["category"],
+}
+
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d-%b-%Y", "%d %b %Y",
+                "%d-%b-%y", "%d %b %y", "%Y/%m/%d", "%d.%m.%Y", "%Y%m%d"]
+
+OFX_TAG_RE = re.compile(r"<([A-Z0-9./]+)>([^<\r\n]*)")
+
+
+class StatementError(ValueError):
+    """A row that cannot be imported (bad date/amount)"""
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_statement_date(value: str) -> str:
+    """ISO date for a statement date cell; cached because statements repeat the same few dates"""
+    value = value.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    # OFX style: 20240115120000[+5.5:IST]
+    if len(value) >= 8 and value[:8].isdigit():
+        return datetime.strptime(value[:8], "%Y%m%d").date().isoformat()
+    raise StatementError(f"Unrecognized date {value!r}")
+
+
+def parse_statement_amount(value: str) -> Optional[float]:
+    value = value.strip().replace(",", "").replace("₹", "").replace("INR", "").strip()
+    if not value or value == "-":
+        return None
+    negative = value.startswith("(") and value.endswith(")")
+    value = value.strip("()")
+    suffix = value[-2:].upper()
+    if suffix in ("DR", "CR"):
+        value = value[:-2].strip()
+    try:
+        amount = float(value)
+    except ValueError:
+        raise StatementError(f"Unrecognized amount {value!r}")
+    if negative or suffix == "DR":
+        amount = -abs(amount)
+    return amount
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, int]:
+    normalized = [h.strip().lower() for h in header]
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized.index(alias)
+                break
+    if "date" not in columns or not ("amount" in columns or "debit" in columns or "credit" in columns):
+        raise StatementError(f"CSV header needs a date and an amount (or debit/credit) column, got {header}")
+    return columns
+
+
+def iter_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(line_number, raw_row) pairs; raw_row has date, description, amount, type"""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = _resolve_columns(header)
+    for line_number, row in enumerate(reader, start=2):
+        if not any(c.strip() for c in row):
+            continue
+        try:
+            yield line_number, _csv_row(row, columns)
+        except StatementError as e:
+            yield line_number, {"error": str(e)}
+
+
+def _csv_row(row: List[str], columns: Dict[str, int]) -> Dict[str, Any]:
+    def cell(field):
+        index = columns.get(field)
+        return row[index] if index is not None and index < len(row) else ""
+
+    debit = parse_statement_amount(cell("debit")) if "debit" in columns else None
+    credit = parse_statement_amount(cell("credit")) if "credit" in columns else None
+    if debit:
+        amount, txn_type = abs(debit), "expense"
+    elif credit:
+        amount, txn_type = abs(credit), "income"
+    else:
+        amount = parse_statement_amount(cell("amount"))
+        if amount is None:
+            raise StatementError("missing amount")
+        marker = cell("type").strip().lower()
+        if marker in ("cr", "credit", "income", "deposit"):
+            txn_type = "income"
+        elif marker in ("dr", "debit", "expense", "withdrawal"):
+            txn_type = "expense"
+        else:
+            txn_type = "income" if amount > 0 else "expense"
+        amount = abs(amount)
+    return {
+        "date": cell("date"),
+        "description": cell("description").strip(),
+        "amount": amount,
+        "type": txn_type,
+        "category": cell("category").strip() or None,
+    }
+
+
+def iter_ofx(lines: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """OFX 1.x (SGML) and 2.x (XML) <STMTTRN> blocks, one tag at a time"""
+    current = None
+    for line_number, line in enumerate(lines, start=1):
+        for tag, value in OFX_TAG_RE.findall(line):
+            if tag == "STMTTRN":
+                current = {"line": line_number}
+            elif tag == "/STMTTRN" and current is not None:
+                try:
+                    amount = parse_statement_amount(current.get("TRNAMT", ""))
+                except StatementError as e:
+                    yield current["line"], {"error": str(e)}
+                    current = None
+                    continue
+                if amount is None:
+                    yield current["line"], {"error": "missing amount"}
+                else:
+                    # OFX signs amounts: negative is money out
+                    yield current["line"], {
+                        "date": current.get("DTPOSTED", ""),
+                        "description": " ".join(filter(None, [current.get("NAME"), current.get("MEMO")])),
+                        "amount": abs(amount),
+                        "type": "income" if amount > 0 else "expense",
+                        "category": None,
+                    }
+                current = None
+            elif current is not None and not tag.startswith("/"):
+                current[tag] = value.strip()
+
+
+def _dedupe_key(txn_date: str, txn_type: str, amount: float, description: str) -> tuple:
+    return (txn_date, txn_type, round(amount, 2), (description or "").strip().lower())
+
+
+class TransactionImporter:
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def _detect_format(self, first_line: str, filename: Optional[str]) -> str:
+        name = (filename or "").lower()
+        if name.endswith((".ofx", ".qfx")):
+            return "ofx"
+        if name.endswith(".csv"):
+            return "csv"
+        head = first_line.lstrip().upper()
+        return "ofx" if head.startswith(("OFXHEADER", "<OFX", "<?XML")) else "csv"
+
+    def _existing_counts(self, cursor, user_id: str, rows: List[Dict[str, Any]]) -> Counter:
+        """How many copies of each row key the user already has (within the chunk's date range)"""
+        dates = [r["transaction_date"] for r in rows]
+        cursor.execute("""
+            SELECT substr(transaction_date, 1, 10), type, ROUND(amount, 2), LOWER(TRIM(COALESCE(description, ''))), COUNT(*)
+            FROM transactions
+            WHERE user_id = ? AND transaction_date >= ? AND transaction_date < ?
+            GROUP BY 1, 2, 3, 4
+        """, (user_id, min(dates), max(dates) + "~"))
+        return Counter({tuple(row[:4]): row[4] for row in cursor.fetchall()})
+
+    def _write_chunk(self, conn, user_id: str, rows: List[Dict[str, Any]], seen: Counter, inserted: Counter) -> Tuple[int, int]:
+        """Insert the rows that are not already in the DB; returns (inserted, duplicates)"""
+        cursor = conn.cursor()
+        # Hold the write lock across the duplicate check and the insert
+        cursor.execute("BEGIN IMMEDIATE")
+        existing = self._existing_counts(cursor, user_id, rows)
+        fresh = []
+        for row in rows:
+            key = _dedupe_key(row["transaction_date"], row["type"], row["amount"], row["description"])
+            seen[key] += 1
+            # The n-th copy in the file is new only if the user had fewer than n before this import
+            if existing[key] - inserted[key] >= seen[key]:
+                continue
+            inserted[key] += 1
+            fresh.append(row)
+        try:
+            insert_transactions(cursor, user_id, fresh, logged_via="import")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return len(fresh), len(rows) - len(fresh)
+
+    def _import_chunk(self, user_id: str, rows: List[Dict[str, Any]], seen: Counter, inserted: Counter) -> Tuple[int, int]:
+        """_write_chunk on a connection held only for this chunk"""
+        conn = get_db_connection()
+        try:
+            return self._write_chunk(conn, user_id, rows, seen, inserted)
+        finally:
+            conn.close()
+
+    def import_stream(self, user_id: str, fileobj, fmt: Optional[str] = None,
+                      filename: Optional[str] = None, encoding: str = "utf-8-sig") -> Iterator[Dict[str, Any]]:
+        """
+        Import a statement from a binary file object.
+        Yields {"type": "progress", ...} after each chunk and a final {"type": "done", ...}.
+        """
+        start = time.perf_counter()
+        stats = {"rows_read": 0, "inserted": 0, "duplicates": 0, "skipped": 0, "chunks": 0}
+        errors = []
+
+        def progress(kind: str) -> Dict[str, Any]:
+            elapsed = time.perf_counter() - start
+            return {
+                "type": kind,
+                **stats,
+                "errors": errors,
+                "elapsed": round(elapsed, 3),
+                "rows_per_sec": round(stats["rows_read"] / elapsed, 1) if elapsed > 0 else 0.0,
+            }
+
+        text = io.TextIOWrapper(fileobj, encoding=encoding, errors="replace", newline="")
+        first_line = text.readline()
+        fmt = (fmt or self._detect_format(first_line, filename)).lower()
+        lines = itertools.chain([first_line], text)
+        parsed = iter_ofx(lines) if fmt == "ofx" else iter_csv(lines)
+
+        seen, inserted = Counter(), Counter()
+        try:
+            chunk = []
+            for line_number, raw in parsed:
+                stats["rows_read"] += 1
+                try:
+                    if "error" in raw:
+                        raise StatementError(raw["error"])
+                    description = raw["description"]
+                    chunk.append({
+                        "id": new_id("txn_imp"),
+                        "type": raw["type"],
+                        "amount": raw["amount"],
+                        "transaction_date": parse_statement_date(raw["date"]),
+                        "description": description or None,
+                        "category": raw["category"] or categorize(description, raw["type"]),
+                        "source": "statement",
+                    })
+                except StatementError as e:
+                    stats["skipped"] += 1
+                    if len(errors) < MAX_REPORTED_ERRORS:
+                        errors.append({"line": line_number, "error": str(e)})
+                    continue
+
+                if len(chunk) >= self.chunk_size:
+                    added, dupes = self._import_chunk(user_id, chunk, seen, inserted)
+                    stats["inserted"] += added
+                    stats["duplicates"] += dupes
+                    stats["chunks"] += 1
+                    chunk = []
+                    yield progress("progress")
+
+            if chunk:
+                added, dupes = self._import_chunk(user_id, chunk, seen, inserted)
+                stats["inserted"] += added
+                stats["duplicates"] += dupes
+                stats["chunks"] += 1
+        except StatementError as e:
+            # Header-level problems abort the import; committed chunks stay
+            errors.append({"line": None, "error": str(e)})
+            yield progress("error")
+            return
+        finally:
+            text.detach()  # Leave the caller's file open
+
+        yield progress("done")
+
+    def import_file(self, user_id: str, fileobj, **kwargs) -> Dict[str, Any]:
+        """Run an import to completion and return the final summary"""
+        result = {}
+        for result in self.import_stream(user_id, fileobj, **kwargs):
+            pass
+        return result
@@ -0,0 +1,139 @@
+"""
+Precomputed per-user insight text.
+
+Generating an insight is an LLM round trip, so /insights serves the stored
+text from `user_insights` and a background job (main.py) regenerates it only
+for users whose transactions changed meaningfully since it was built. Each
+row records the watermark it was built from: the user's ledger txn_count and
+total expense (database/ledger.py), read in O(1) from `user_balances`.
+
+A user is due for a new insight when they have no insight yet, at least
+INSIGHTS_MIN_NEW_TXNS transactions landed since the watermark, or their total
+spend moved by INSIGHTS_MIN_SPEND_CHANGE (a fraction) since then.
+"""
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Set
+
+from database.aio import fetch_all, run_in_db
+
+INSIGHTS_INTERVAL = float(os.getenv("FUNDPAL_INSIGHTS_INTERVAL", "300"))
+INSIGHTS_MIN_NEW_TXNS = int(os.getenv("FUNDPAL_INSIGHTS_MIN_NEW_TXNS", "5"))
+INSIGHTS_MIN_SPEND_CHANGE = float(os.getenv("FUNDPAL_INSIGHTS_MIN_SPEND_CHANGE", "0.1"))
+INSIGHTS_BATCH_SIZE = int(os.getenv("FUNDPAL_INSIGHTS_BATCH_SIZE", "50"))
+# Concurrent LLM calls per refresh pass
+INSIGHTS_CONCURRENCY = int(os.getenv("FUNDPAL_INSIGHTS_CONCURRENCY", "4"))
+
+# What coach.generate_insights is given (it summarizes the newest of these)
+INSIGHT_INPUT_TXNS = 50
+
+NO_TRANSACTIONS = "No transactions yet. Start spending to see insights!"
+PENDING = "We're looking at your latest spending. Check back in a moment!"
+
+
+def read_stale_users(conn, limit: int = INSIGHTS_BATCH_SIZE) -> List[str]:
+    """Users whose ledger moved past their insight watermark, most behind first"""
+    rows = conn.execute("""
+        SELECT b.user_id
+        FROM user_balances b
+        LEFT JOIN user_insights i ON i.user_id = b.user_id
+        WHERE b.txn_count > 0 AND (
+            i.user_id IS NULL
+            OR b.txn_count - i.watermark_txn_count >= ?
+            OR ABS(b.expense - i.watermark_expense) >= ? * MAX(i.watermark_expense, 1)
+        )
+        ORDER BY b.txn_count - COALESCE(i.watermark_txn_count, 0) DESC
+        LIMIT ?
+    """, (INSIGHTS_MIN_NEW_TXNS, INSIGHTS_MIN_SPEND_CHANGE, limit)).fetchall()
+    return [row[0] for row in rows]
+
+
+def read_insight(conn, user_id: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute("""
+        SELECT insight, generated_at, watermark_txn_count, watermark_expense
+        FROM user_insights WHERE user_id = ?
+    """, (user_id,)).fetchone()
+    return dict(row) if row else None
+
+
+def read_watermark(conn, user_id: str) -> Dict[str, Any]:
+    row = conn.execute("SELECT txn_count, expense FROM user_balances WHERE user_id = ?", (user_id,)).fetchone()
+    return {"txn_count": row[0] if row else 0, "expense": (row[1] if row else 0) or 0}
+
+
+def write_insight(conn, user_id: str, insight: str, watermark: Dict[str, Any]):
+    conn.execute("""
+        INSERT INTO user_insights (user_id, insight, generated_at, watermark_txn_count, watermark_expense)
+        VALUES (?, ?, CURRENT_TIMESTAMP, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            insight = excluded.insight,
+            generated_at = excluded.generated_at,
+            watermark_txn_count = excluded.watermark_txn_count,
+            watermark_expense = excluded.watermark_expense
+        WHERE excluded.watermark_txn_count >= user_insights.watermark_txn_count
+    """, (user_id, insight, watermark["txn_count"], watermark["expense"]))
+
+
+class InsightsService:
+    def __init__(self, coach=None):
+        if coach is None:
+            from agents.coach import CoachAgent
+            coach = CoachAgent()
+        self.coach = coach
+        self._in_flight: Set[str] = set()
+        self._background: Set[asyncio.Task] = set()
+
+    async def refresh_user(self, user_id: str) -> Optional[str]:
+        """Regenerate one user's insight; concurrent refreshes of the same user are skipped"""
+        if user_id in self._in_flight:
+            return None
+        self._in_flight.add(user_id)
+        try:
+            # Watermark first: anything that lands while the LLM runs keeps the user stale
+            watermark = await run_in_db(read_watermark, user_id)
+            if watermark["txn_count"] == 0:
+                insight = NO_TRANSACTIONS
+            else:
+                transactions = await fetch_all("""
+                    SELECT * FROM transactions
+                    WHERE user_id = ?
+                    ORDER BY transaction_date DESC
+                    LIMIT ?
+                """, (user_id, INSIGHT_INPUT_TXNS))
+                insight = await self.coach.generate_insights(transactions)
+            await run_in_db(write_insight, user_id, insight, watermark)
+            return insight
+        finally:
+            self._in_flight.discard(user_id)
+
+    async def refresh_stale(self, limit: int = INSIGHTS_BATCH_SIZE) -> Dict[str, Any]:
+        """One background pass: regenerate insights for up to `limit` stale users"""
+        users = await run_in_db(read_stale_users, limit)
+        semaphore = asyncio.Semaphore(INSIGHTS_CONCURRENCY)
+
+        async def refresh(user_id: str):
+            async with semaphore:
+                return await self.refresh_user(user_id)
+
+        results = await asyncio.gather(*(refresh(u) for u in users), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        for error in failed[:3]:
+            print(f"DEBUG: Insight refresh failed: {error}")
+        return {"stale": len(users), "refreshed": len(users) - len(failed), "failed": len(failed)}
+
+    async def get_insight(self, user_id: str) -> Dict[str, Any]:
+        """
+        Stored insight for the endpoint. Never waits on the LLM: a user with no
+        insight yet gets a placeholder and a refresh is started in the background.
+        """
+        stored = await run_in_db(read_insight, user_id)
+        if stored is None:
+            watermark = await run_in_db(read_watermark, user_id)
+            if watermark["txn_count"] == 0:
+                return {"insight": NO_TRANSACTIONS, "generated_at": None, "pending": False}
+            task = asyncio.get_running_loop().create_task(self.refresh_user(user_id))
+            # Hold a reference until it finishes so the task isn't garbage collected
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            return {"insight": PENDING, "generated_at": None, "pending": True}
+        return {"insight": stored["insight"], "generated_at": stored["generated_at"], "pending": False}
@@ -1,25 +1,43 @@
 import yfinance as yf
 from typing import Dict, Any, List, Optional
+from .quotes import QuoteCache, get_quote_cache
 
 class MarketDataService:
     """
     Service to fetch live market data using yfinance.
+    Prices go through the shared QuoteCache; get_prices() batches many symbols.
     """
     
+    def __init__(self, quotes: Optional[QuoteCache] = None):
+        # Shared, batched quote cache (see services/quotes.py)
+        self.quotes = quotes if quotes is not None else get_quote_cache()
+    
     def get_current_price(self, symbol: str) -> float:
         """
         Get the current price of an asset.
         """
-        try:
-            ticker = yf.Ticker(symbol)
-            # fast_info is faster than history()
-            price = ticker.fast_info.last_price
-            return round(price, 2)
-        except Exception as e:
-            print(f"Error fetching price for {symbol}: {e}")
-            # Fallback for demo/hackathon if API fails
-            import random
-            return round(random.uniform(100, 2000), 2)
+        return self.get_prices([symbol])[symbol]
+
+    def get_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        Get current prices for many assets with a single batched fetch.
+        """
+        return self._fill_missing(symbols, self.quotes.get_many(symbols))
+
+    async def aget_prices(self, symbols: List[str]) -> Dict[str, float]:
+        """
+        get_prices() for async code: concurrent, time-bounded fetches off the event loop.
+        """
+        return self._fill_missing(symbols, await self.quotes.aget_many(symbols))
+
+    def _fill_missing(self, symbols: List[str], prices: Dict[str, float]) -> Dict[str, float]:
+        for symbol in symbols:
+            if symbol not in prices:
+                print(f"Error fetching price for {symbol}: no quote")
+                # Fallback for demo/hackathon if API fails (never cached)
+                import random
+                prices[symbol] = round(random.uniform(100, 2000), 2)
+        return prices
 
     def get_asset_info(self, symbol: str) -> Dict[str, Any]:
         """
@@ -1,185 +1,366 @@
-import sqlite3
+import os
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+from database.aio import run_in_db
+from database.connection import begin_immediate, get_db_connection
+from database.ids import new_id
+from database.ledger import get_balance, insert_transaction, insert_transactions
+from database.trades import CLOSED_QUANTITY, apply_fill, find_fill, record_fill
 from .market_data import MarketDataService
+from .analytics import PortfolioAnalytics
 
-DB_PATH = "fundpal.db"
+# Background mark-to-market cadence (see refresh_valuations / main.py)
+PRICE_REFRESH_INTERVAL = float(os.getenv("FUNDPAL_PRICE_REFRESH_INTERVAL", "60"))
+# Valuations older than this are flagged as stale in get_portfolio
+PRICE_STALE_AFTER = float(os.getenv("FUNDPAL_PRICE_STALE_AFTER", str(3 * PRICE_REFRESH_INTERVAL)))
 
 class PortfolioService:
     def __init__(self):
         self.market_data = MarketDataService()
+        self.analytics = PortfolioAnalytics(self.market_data)
 
     def get_db_connection(self):
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
+        return get_db_connection()
 
     def get_portfolio(self, user_id: str) -> Dict[str, Any]:
+        """
+        Holdings with the valuations last written by refresh_valuations().
+        Never calls the market-data provider; `as_of` is the oldest price used.
+        """
         conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM portfolio WHERE user_id = ?", (user_id,))
-        rows = cursor.fetchall()
+        try:
+            return self._read_portfolio(conn, user_id)
+        finally:
+            conn.close()
+
+    async def aget_portfolio(self, user_id: str) -> Dict[str, Any]:
+        """get_portfolio() for async code; the reads and analytics run on the DB thread pool"""
+        return await run_in_db(self._read_portfolio, user_id)
+
+    def _read_portfolio(self, conn, user_id: str) -> Dict[str, Any]:
+        rows = conn.execute("SELECT * FROM portfolio WHERE user_id = ?", (user_id,)).fetchall()
         
-        holdings = []
-        total_value = 0.0
-        total_invested = 0.0
+        # Valuation, P&L, weights, exposure and drift in one vectorized pass
+        targets = self.analytics.load_targets(user_id)
+        targets.setdefault(user_id, {})
+        result = self.analytics.compute(self.analytics.to_arrays(rows), targets)[user_id]
+        for holding, row in zip(result["holdings"], rows):
+            holding["priced_at"] = row["priced_at"]
         
-        for row in rows:
-            symbol = row["symbol"]
-            quantity = row["quantity"]
-            avg_price = row["average_buy_price"]
-            
-            current_price = self.market_data.get_current_price(symbol)
-            current_value = quantity * current_price
-            invested_value = quantity * avg_price
-            
-            holdings.append({
-                "symbol": symbol,
-                "quantity": quantity,
-                "average_price": avg_price,
-                "current_price": current_price,
-                "current_value": round(current_value, 2),
-                "invested_value": round(invested_value, 2),
-                "pnl": round(current_value - invested_value, 2),
-                "pnl_pct": round(((current_value - invested_value) / invested_value * 100), 2) if invested_value > 0 else 0
-            })
-            
-            total_value += current_value
-            total_invested += invested_value
-            
-        conn.close()
+        priced_at = [row["priced_at"] for row in rows if row["priced_at"]]
+        as_of = min(priced_at) if priced_at else None
+        stale = bool(rows) and (
+            len(priced_at) < len(rows)
+            or (datetime.now() - datetime.fromisoformat(as_of)).total_seconds() > PRICE_STALE_AFTER
+        )
         
-        return {
-            "holdings": holdings,
-            "total_value": round(total_value, 2),
-            "total_invested": round(total_invested, 2),
-            "total_pnl": round(total_value - total_invested, 2)
-        }
+        result["as_of"] = as_of
+        result["stale"] = stale
+        return result
 
-    def execute_buy(self, user_id: str, symbol: str, quantity: float) -> Dict[str, Any]:
+    def refresh_valuations(self) -> Dict[str, Any]:
         """
-        Execute a buy order:
-        1. Check balance
-        2. Deduct funds
-        3. Add to portfolio
-        4. Log transaction
+        Mark every holding to market: one batched quote fetch for the union of
+        held symbols, then one bulk UPDATE. Run periodically by the price refresher.
         """
-        price = self.market_data.get_current_price(symbol)
-        if price <= 0:
-            return {"status": "error", "message": "Failed to fetch price"}
-            
-        total_cost = price * quantity
-        
         conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
         try:
-            # 1. Check Balance (Mock logic: Calculate from transactions)
-            cursor.execute("SELECT SUM(amount) FROM transactions WHERE user_id = ? AND type = 'income'", (user_id,))
-            income = cursor.fetchone()[0] or 0
-            cursor.execute("SELECT SUM(amount) FROM transactions WHERE user_id = ? AND type = 'expense'", (user_id,))
-            expense = cursor.fetchone()[0] or 0
-            balance = income - expense
-            
-            if balance < total_cost:
-                return {"status": "error", "message": f"Insufficient balance. Need ₹{total_cost}, have ₹{balance}"}
-            
-            # 2. Deduct Funds (Log Expense)
-            txn_id = f"txn_buy_{int(datetime.now().timestamp())}"
-            cursor.execute("""
-                INSERT INTO transactions (id, user_id, type, amount, category, description, transaction_date)
-                VALUES (?, ?, 'expense', ?, 'Investment', ?, ?)
-            """, (txn_id, user_id, total_cost, f"Bought {quantity} {symbol} @ {price}", datetime.now().isoformat()))
-            
-            # 3. Add to Portfolio
-            # Check existing holding
-            cursor.execute("SELECT * FROM portfolio WHERE user_id = ? AND symbol = ?", (user_id, symbol))
-            existing = cursor.fetchone()
-            
-            if existing:
-                new_quantity = existing["quantity"] + quantity
-                # Weighted Average Price
-                total_old_cost = existing["quantity"] * existing["average_buy_price"]
-                new_avg_price = (total_old_cost + total_cost) / new_quantity
-                
-                cursor.execute("""
-                    UPDATE portfolio 
-                    SET quantity = ?, average_buy_price = ?, current_value = ?, last_updated = ?
-                    WHERE user_id = ? AND symbol = ?
-                """, (new_quantity, new_avg_price, new_quantity * price, datetime.now().isoformat(), user_id, symbol))
-            else:
-                pf_id = f"pf_{int(datetime.now().timestamp())}_{symbol}"
-                cursor.execute("""
-                    INSERT INTO portfolio (id, user_id, symbol, quantity, average_buy_price, current_value)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (pf_id, user_id, symbol, quantity, price, total_cost))
+            symbols = [row[0] for row in conn.execute("SELECT DISTINCT symbol FROM portfolio").fetchall()]
+            if not symbols:
+                return {"symbols": 0, "priced": 0, "rows": 0}
             
+            # Only real quotes; the random demo fallback must never be persisted
+            prices = self.market_data.quotes.get_many(symbols)
+            now = datetime.now().isoformat()
+            cursor = conn.executemany("""
+                UPDATE portfolio
+                SET current_price = ?,
+                    current_value = quantity * ?,
+                    pnl = quantity * (? - average_buy_price),
+                    priced_at = ?
+                WHERE symbol = ?
+            """, [(price, price, price, now, symbol) for symbol, price in prices.items()])
             conn.commit()
-            return {
-                "status": "success", 
-                "message": f"Bought {quantity} {symbol} for ₹{total_cost}",
-                "price": price,
-                "total_cost": total_cost
-            }
-            
-        except Exception as e:
-            conn.rollback()
-            return {"status": "error", "message": str(e)}
+            return {"symbols": len(symbols), "priced": len(prices), "rows": cursor.rowcount}
         finally:
             conn.close()
 
-    def execute_sell(self, user_id: str, symbol: str, quantity: float) -> Dict[str, Any]:
+    def execute_buy(self, user_id: str, symbol: str, quantity: float,
+                    idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Execute a buy order:
+        1. Check balance
+        2. Deduct funds
+        3. Record the fill and add it to the position
+        A retry with the same idempotency_key returns the original fill.
+        """
+        if idempotency_key:
+            replay = self._execute(self._replay, user_id, idempotency_key, "BUY", symbol, quantity)
+            if replay:
+                return replay
+        price = self._quote(symbol)
+        if price is None:
+            return {"status": "error", "message": "Failed to fetch price"}
+        return self._execute(self._book_buy, user_id, symbol, quantity, price, idempotency_key)
+
+    async def aexecute_buy(self, user_id: str, symbol: str, quantity: float,
+                           idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """execute_buy() for async code"""
+        if idempotency_key:
+            replay = await self._aexecute(self._replay, user_id, idempotency_key, "BUY", symbol, quantity)
+            if replay:
+                return replay
+        price = await self._aquote(symbol)
+        if price is None:
+            return {"status": "error", "message": "Failed to fetch price"}
+        return await self._aexecute(self._book_buy, user_id, symbol, quantity, price, idempotency_key)
+
+    def execute_sell(self, user_id: str, symbol: str, quantity: float,
+                     idempotency_key: Optional[str] = None) -> Dict[str, Any]:
         """
         Execute a sell order:
-        1. Check holdings
-        2. Remove from portfolio
-        3. Add funds
-        4. Log transaction
+        1. Take the quantity off the position (if it holds enough)
+        2. Add funds
+        3. Record the fill
+        A retry with the same idempotency_key returns the original fill.
         """
-        price = self.market_data.get_current_price(symbol)
-        total_value = price * quantity
-        
+        if idempotency_key:
+            replay = self._execute(self._replay, user_id, idempotency_key, "SELL", symbol, quantity)
+            if replay:
+                return replay
+        price = self._quote(symbol)
+        if price is None:
+            return {"status": "error", "message": "Failed to fetch price"}
+        return self._execute(self._book_sell, user_id, symbol, quantity, price, idempotency_key)
+
+    async def aexecute_sell(self, user_id: str, symbol: str, quantity: float,
+                            idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        """execute_sell() for async code"""
+        if idempotency_key:
+            replay = await self._aexecute(self._replay, user_id, idempotency_key, "SELL", symbol, quantity)
+            if replay:
+                return replay
+        price = await self._aquote(symbol)
+        if price is None:
+            return {"status": "error", "message": "Failed to fetch price"}
+        return await self._aexecute(self._book_sell, user_id, symbol, quantity, price, idempotency_key)
+
+    def _quote(self, symbol: str) -> Optional[float]:
+        """A real quote for the symbol, or None (never get_prices' stand-in price)"""
+        return self.market_data.quotes.get_many([symbol]).get(symbol)
+
+    async def _aquote(self, symbol: str) -> Optional[float]:
+        """_quote() for async code; None if the provider fails or times out"""
+        return (await self.market_data.quotes.aget_many([symbol])).get(symbol)
+
+    def _execute(self, book, user_id: str, *args) -> Dict[str, Any]:
+        """Run book(cursor, user_id, *args) in one BEGIN IMMEDIATE transaction on a pooled connection"""
         conn = self.get_db_connection()
-        cursor = conn.cursor()
-        
         try:
-            # 1. Check Holdings
-            cursor.execute("SELECT * FROM portfolio WHERE user_id = ? AND symbol = ?", (user_id, symbol))
-            existing = cursor.fetchone()
-            
-            if not existing or existing["quantity"] < quantity:
-                return {"status": "error", "message": "Insufficient holdings"}
-            
-            # 2. Update Portfolio
-            new_quantity = existing["quantity"] - quantity
-            
-            if new_quantity > 0:
-                cursor.execute("""
-                    UPDATE portfolio 
-                    SET quantity = ?, current_value = ?, last_updated = ?
-                    WHERE user_id = ? AND symbol = ?
-                """, (new_quantity, new_quantity * price, datetime.now().isoformat(), user_id, symbol))
-            else:
-                cursor.execute("DELETE FROM portfolio WHERE user_id = ? AND symbol = ?", (user_id, symbol))
-            
-            # 3. Add Funds (Log Income)
-            txn_id = f"txn_sell_{int(datetime.now().timestamp())}"
-            cursor.execute("""
-                INSERT INTO transactions (id, user_id, type, amount, category, description, transaction_date)
-                VALUES (?, ?, 'income', ?, 'Investment Return', ?, ?)
-            """, (txn_id, user_id, total_value, f"Sold {quantity} {symbol} @ {price}", datetime.now().isoformat()))
-            
+            begin_immediate(conn)
+            result = book(conn.cursor(), user_id, *args)
             conn.commit()
-            return {
-                "status": "success", 
-                "message": f"Sold {quantity} {symbol} for ₹{total_value}",
-                "price": price,
-                "total_value": total_value
-            }
-            
+            return result
         except Exception as e:
             conn.rollback()
             return {"status": "error", "message": str(e)}
         finally:
             conn.close()
+
+    async def _aexecute(self, book, user_id: str, *args) -> Dict[str, Any]:
+        """_execute() on the DB thread pool"""
+        def run(conn):
+            begin_immediate(conn)
+            return book(conn.cursor(), user_id, *args)
+        try:
+            return await run_in_db(run)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def _replay(self, cursor, user_id: str, idempotency_key: str, side: str, symbol: str,
+                quantity: float) -> Optional[Dict[str, Any]]:
+        """The stored result of an order already placed with this key, or None"""
+        fill = find_fill(cursor, user_id, idempotency_key)
+        if fill is None:
+            return None
+        if (fill["side"], fill["symbol"]) != (side, symbol) or abs(fill["quantity"] - quantity) > CLOSED_QUANTITY:
+            return {"status": "error", "conflict": True,
+                    "message": "Idempotency-Key was already used for a different order"}
+        return {**self._fill_result(fill), "replayed": True}
+
+    def _fill_result(self, fill: Dict[str, Any]) -> Dict[str, Any]:
+        quantity, symbol, price, amount = fill["quantity"], fill["symbol"], fill["price"], fill["amount"]
+        if fill["side"] == "BUY":
+            return {"status": "success", "message": f"Bought {quantity} {symbol} for ₹{amount}",
+                    "price": price, "total_cost": amount, "fill_id": fill["id"]}
+        return {"status": "success", "message": f"Sold {quantity} {symbol} for ₹{amount}",
+                "price": price, "total_value": amount, "fill_id": fill["id"]}
+
+    def _book_buy(self, cursor, user_id: str, symbol: str, quantity: float, price: float,
+                  idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        if quantity <= 0:
+            return {"status": "error", "message": "Quantity must be positive"}
+        if price is None or not price > 0:  # also rejects NaN
+            return {"status": "error", "message": "Failed to fetch price"}
+        # Checked again under the write lock: a concurrent retry may have just filled it
+        if idempotency_key:
+            replay = self._replay(cursor, user_id, idempotency_key, "BUY", symbol, quantity)
+            if replay:
+                return replay
+            
+        total_cost = price * quantity
+        
+        # 1. Check Balance (running total from the ledger)
+        balance = get_balance(cursor, user_id)["balance"]
+        
+        if balance < total_cost:
+            return {"status": "error", "message": f"Insufficient balance. Need ₹{total_cost}, have ₹{balance}"}
+        
+        # 2. Deduct Funds (Log Expense)
+        txn_id = insert_transaction(
+            cursor, user_id, 'expense', total_cost,
+            category='Investment',
+            description=f"Bought {quantity} {symbol} @ {price}",
+            txn_id=new_id("txn_buy")
+        )
+        
+        # 3. Record the fill and fold it into the position
+        fill_id = record_fill(cursor, user_id, symbol, "BUY", quantity, price, txn_id, idempotency_key)
+        apply_fill(cursor, user_id, symbol, "BUY", quantity, price)
+        
+        return {
+            "status": "success", 
+            "message": f"Bought {quantity} {symbol} for ₹{total_cost}",
+            "price": price,
+            "total_cost": total_cost,
+            "fill_id": fill_id
+        }
+
+    def _book_sell(self, cursor, user_id: str, symbol: str, quantity: float, price: float,
+                   idempotency_key: Optional[str] = None) -> Dict[str, Any]:
+        if quantity <= 0:
+            return {"status": "error", "message": "Quantity must be positive"}
+        if price is None or not price > 0:  # also rejects NaN
+            return {"status": "error", "message": "Failed to fetch price"}
+        if idempotency_key:
+            replay = self._replay(cursor, user_id, idempotency_key, "SELL", symbol, quantity)
+            if replay:
+                return replay
+        total_value = price * quantity
+        
+        # 1. Update Portfolio (only if the position holds enough)
+        if not apply_fill(cursor, user_id, symbol, "SELL", quantity, price):
+            return {"status": "error", "message": "Insufficient holdings"}
+        
+        # 2. Add Funds (Log Income)
+        txn_id = insert_transaction(
+            cursor, user_id, 'income', total_value,
+            category='Investment Return',
+            description=f"Sold {quantity} {symbol} @ {price}",
+            txn_id=new_id("txn_sell")
+        )
+        
+        # 3. Record the fill
+        fill_id = record_fill(cursor, user_id, symbol, "SELL", quantity, price, txn_id, idempotency_key)
+        
+        return {
+            "status": "success", 
+            "message": f"Sold {quantity} {symbol} for ₹{total_value}",
+            "price": price,
+            "total_value": total_value,
+            "fill_id": fill_id
+        }
+
+    def price_basket(self, legs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Validate and price the buy legs of a basket with one batched quote fetch.
+        Each leg has a symbol and either a quantity or an amount (₹) to invest;
+        legs for the same symbol are merged. Invalid legs come back with status "error".
+        Only real quotes are used (not get_prices' stand-in prices), so a leg
+        that can't be quoted is an error and write_basket buys nothing.
+        """
+        merged = self._merge_legs(legs)
+        symbols = [s for s in merged if s]
+        return self._price_legs(merged, self.market_data.quotes.get_many(symbols) if symbols else {})
+
+    async def aprice_basket(self, legs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """price_basket() for async code"""
+        merged = self._merge_legs(legs)
+        symbols = [s for s in merged if s]
+        return self._price_legs(merged, await self.market_data.quotes.aget_many(symbols) if symbols else {})
+
+    def _merge_legs(self, legs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        merged: Dict[str, Dict[str, Any]] = {}
+        for leg in legs:
+            symbol = (leg.get("symbol") or "").strip()
+            quantity, amount = leg.get("quantity") or 0, leg.get("amount") or 0
+            entry = merged.setdefault(symbol, {"symbol": symbol, "quantity": 0.0, "amount": 0.0, "invalid": False})
+            # Checked per leg: a negative leg must not hide inside a positive merged total
+            entry["invalid"] = entry["invalid"] or quantity < 0 or amount < 0 or not (quantity or amount)
+            entry["quantity"] += quantity
+            entry["amount"] += amount
+        return merged
+
+    def _price_legs(self, merged: Dict[str, Dict[str, Any]], prices: Dict[str, float]) -> List[Dict[str, Any]]:
+        priced = []
+        for symbol, entry in merged.items():
+            price = prices.get(symbol, 0)
+            invalid = entry.pop("invalid")
+            if not symbol:
+                priced.append({**entry, "status": "error", "message": "Missing symbol"})
+            elif invalid:
+                priced.append({**entry, "status": "error", "message": "Quantity or amount must be positive"})
+            elif price <= 0:
+                priced.append({**entry, "status": "error", "message": "Failed to fetch price"})
+            else:
+                quantity = entry["quantity"] + entry["amount"] / price
+                priced.append({"symbol": symbol, "quantity": quantity, "price": price,
+                               "total_cost": price * quantity, "status": "pending"})
+        return priced
+
+    def write_basket(self, cursor, user_id: str, legs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Book priced legs (from price_basket) inside the caller's DB transaction:
+        one balance check for the whole basket, one batched ledger write, then a
+        fill per leg folded into its position. All legs are written or none are.
+        Does not commit.
+        """
+        if any(leg["status"] == "error" for leg in legs):
+            return {"status": "error", "message": "Basket has invalid legs; nothing was bought",
+                    "legs": [leg if leg["status"] == "error" else {**leg, "status": "error", "message": "Not executed"}
+                             for leg in legs]}
+        if not legs:
+            return {"status": "success", "message": "Nothing to buy", "total_cost": 0, "legs": []}
+
+        total_cost = sum(leg["total_cost"] for leg in legs)
+        balance = get_balance(cursor, user_id)["balance"]
+        if balance < total_cost:
+            return {"status": "error", "message": f"Insufficient balance. Need ₹{total_cost}, have ₹{balance}",
+                    "legs": [{**leg, "status": "error", "message": "Not executed"} for leg in legs]}
+
+        txns = [{
+            "id": new_id("txn_buy"),
+            "type": "expense",
+            "amount": leg["total_cost"],
+            "category": "Investment",
+            "description": f"Bought {leg['quantity']} {leg['symbol']} @ {leg['price']}",
+        } for leg in legs]
+        insert_transactions(cursor, user_id, txns, logged_via="basket")
+        for leg, txn in zip(legs, txns):
+            symbol, quantity, price = leg["symbol"], leg["quantity"], leg["price"]
+            leg["fill_id"] = record_fill(cursor, user_id, symbol, "BUY", quantity, price, txn["id"])
+            apply_fill(cursor, user_id, symbol, "BUY", quantity, price)
+            leg.update(status="success", message=f"Bought {quantity} {symbol} for ₹{leg['total_cost']}")
+        return {"status": "success", "message": f"Bought {len(legs)} assets for ₹{total_cost}",
+                "total_cost": total_cost, "legs": legs}
+
+    def execute_basket(self, user_id: str, legs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Execute several buys as one order: a single batched price fetch, a single
+        balance check and a single DB transaction, with a result for every leg.
+        """
+        return self._execute(self.write_basket, user_id, self.price_basket(legs))
+
+    async def aexecute_basket(self, user_id: str, legs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """execute_basket() for async code"""
+        return await self._aexecute(self.write_basket, user_id, await self.aprice_basket(legs))
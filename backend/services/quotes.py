@@ -0,0 +1,255 @@
+"""
+Batched, cached market quotes.
+
+QuoteCache sits in front of a QuoteProvider: fresh prices come from memory,
+everything else is fetched in one provider call, and a symbol that is
+already being fetched by another caller is waited on instead of refetched.
+The provider is pluggable so tests and benchmarks can use FixtureProvider
+instead of hitting Yahoo Finance.
+
+Async callers use aget_many(): cache hits are answered on the loop, misses
+are split into chunks fetched concurrently on a small dedicated thread pool
+(at most FUNDPAL_QUOTE_CONCURRENCY provider calls at once), and each chunk
+gives up after FUNDPAL_QUOTE_TIMEOUT seconds so a slow provider can't hold a
+request hostage.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+import yfinance as yf
+
+QUOTE_CONCURRENCY = int(os.getenv("FUNDPAL_QUOTE_CONCURRENCY", "4"))
+QUOTE_TIMEOUT = float(os.getenv("FUNDPAL_QUOTE_TIMEOUT", "5"))
+# Symbols per provider call on the async path
+QUOTE_CHUNK_SIZE = int(os.getenv("FUNDPAL_QUOTE_CHUNK_SIZE", "20"))
+
+# Bounds concurrent provider calls from async code; blocking fetches never run on the loop
+_executor = ThreadPoolExecutor(max_workers=QUOTE_CONCURRENCY, thread_name_prefix="fundpal-quotes")
+
+
+class QuoteProvider:
+    """Fetches last prices for many symbols in one call"""
+
+    def fetch(self, symbols: List[str]) -> Dict[str, float]:
+        """Return {symbol: price}; symbols it cannot price are left out"""
+        raise NotImplementedError
+
+
+class YFinanceProvider(QuoteProvider):
+    """One yf.download request for the whole batch"""
+
+    def fetch(self, symbols: List[str]) -> Dict[str, float]:
+        data = yf.download(
+            symbols,
+            period="5d",
+            interval="1d",
+            progress=False,
+            threads=True,
+            auto_adjust=False,
+            group_by="column"
+        )
+        if data is None or data.empty:
+            return {}
+
+        closes = data["Close"]
+        if hasattr(closes, "columns"):
+            columns = {str(c): closes[c] for c in closes.columns}
+        else:
+            # Older yfinance returns a Series for a single symbol
+            columns = {symbols[0]: closes}
+
+        prices = {}
+        for symbol in symbols:
+            series = columns.get(symbol)
+            if series is None:
+                continue
+            series = series.dropna()
+            if len(series):
+                prices[symbol] = round(float(series.iloc[-1]), 2)
+        return prices
+
+
+class FixtureProvider(QuoteProvider):
+    """
+    Local prices for tests and benchmarks.
+    Unknown symbols get a stable made-up price unless fill_missing is False;
+    `latency` simulates the network round trip per batch.
+    """
+
+    def __init__(self, prices: Optional[Dict[str, float]] = None, latency: float = 0.0, fill_missing: bool = True):
+        self.prices = dict(prices or {})
+        self.latency = latency
+        self.fill_missing = fill_missing
+        self.calls = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FixtureProvider":
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    def fetch(self, symbols: List[str]) -> Dict[str, float]:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prices = {}
+        for symbol in symbols:
+            if symbol in self.prices:
+                prices[symbol] = self.prices[symbol]
+            elif self.fill_missing:
+                prices[symbol] = round(100 + zlib.crc32(symbol.encode()) % 190000 / 100, 2)
+        return prices
+
+
+class QuoteCache:
+    def __init__(self, provider: QuoteProvider, ttl: float = 60, wait_timeout: float = 15):
+        self.provider = provider
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._quotes = {}    # symbol -> (price, fetched_at)
+        self._inflight = {}  # symbol -> Future resolving to price or None
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "batches": 0, "errors": 0, "timeouts": 0}
+
+    def _fresh(self, symbol: str, now: float) -> Optional[float]:
+        cached = self._quotes.get(symbol)
+        if cached is not None and now - cached[1] < self.ttl:
+            return cached[0]
+        return None
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, float]:
+        """Prices for every symbol that could be priced, using at most one provider call"""
+        result = {}
+        waiting = {}
+        to_fetch = []
+        now = time.monotonic()
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                price = self._fresh(symbol, now)
+                if price is not None:
+                    result[symbol] = price
+                    self._stats["hits"] += 1
+                elif symbol in self._inflight:
+                    waiting[symbol] = self._inflight[symbol]
+                    self._stats["coalesced"] += 1
+                else:
+                    self._inflight[symbol] = Future()
+                    to_fetch.append(symbol)
+                    self._stats["misses"] += 1
+            if to_fetch:
+                self._stats["batches"] += 1
+
+        if to_fetch:
+            try:
+                fetched = self.provider.fetch(to_fetch)
+            except Exception as e:
+                print(f"Error fetching quotes for {to_fetch}: {e}")
+                fetched = {}
+                with self._lock:
+                    self._stats["errors"] += 1
+            fetched_at = time.monotonic()
+            with self._lock:
+                for symbol in to_fetch:
+                    price = fetched.get(symbol)
+                    if price is not None:
+                        self._quotes[symbol] = (price, fetched_at)
+                        result[symbol] = price
+                    self._inflight.pop(symbol).set_result(price)
+
+        for symbol, future in waiting.items():
+            try:
+                price = future.result(timeout=self.wait_timeout)
+            except Exception:
+                price = None
+            if price is not None:
+                result[symbol] = price
+        return result
+
+    def get(self, symbol: str) -> Optional[float]:
+        return self.get_many([symbol]).get(symbol)
+
+    async def aget_many(self, symbols: Iterable[str], timeout: Optional[float] = None) -> Dict[str, float]:
+        """
+        get_many() for async code. Misses are fetched in chunks of QUOTE_CHUNK_SIZE,
+        concurrently, each bounded by `timeout` (default QUOTE_TIMEOUT); a chunk that
+        times out is left unpriced. Its fetch still finishes in the background and
+        fills the cache for the next caller.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for symbol in symbols:
+                price = self._fresh(symbol, now)
+                if price is not None:
+                    result[symbol] = price
+            self._stats["hits"] += len(result)
+        missing = [symbol for symbol in symbols if symbol not in result]
+        if not missing:
+            return result
+
+        loop = asyncio.get_running_loop()
+        timeout = QUOTE_TIMEOUT if timeout is None else timeout
+
+        async def fetch(chunk: List[str]) -> Dict[str, float]:
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(_executor, self.get_many, chunk), timeout)
+            except asyncio.TimeoutError:
+                print(f"Error fetching quotes for {chunk}: timed out after {timeout}s")
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                return {}
+
+        chunks = [missing[i:i + QUOTE_CHUNK_SIZE] for i in range(0, len(missing), QUOTE_CHUNK_SIZE)]
+        for prices in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            result.update(prices)
+        return result
+
+    def invalidate(self, symbols: Optional[Iterable[str]] = None):
+        with self._lock:
+            if symbols is None:
+                self._quotes.clear()
+            else:
+                for symbol in symbols:
+                    self._quotes.pop(symbol, None)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._quotes)
+        stats["provider"] = type(self.provider).__name__
+        return stats
+
+
+def create_provider() -> QuoteProvider:
+    """
+    FUNDPAL_QUOTE_PROVIDER = yfinance (default) | fixture
+    FUNDPAL_QUOTE_FIXTURE  = optional JSON file of {symbol: price} for the fixture provider
+    """
+    kind = os.getenv("FUNDPAL_QUOTE_PROVIDER", "yfinance").lower()
+    if kind == "fixture":
+        path = os.getenv("FUNDPAL_QUOTE_FIXTURE")
+        latency = float(os.getenv("FUNDPAL_QUOTE_FIXTURE_LATENCY", "0"))
+        if path:
+            return FixtureProvider.from_file(path, latency=latency)
+        return FixtureProvider(latency=latency)
+    return YFinanceProvider()
+
+
+_quote_cache = None
+_quote_cache_lock = threading.Lock()
+
+
+def get_quote_cache() -> QuoteCache:
+    """Process-wide cache shared by every MarketDataService"""
+    global _quote_cache
+    if _quote_cache is None:
+        with _quote_cache_lock:
+            if _quote_cache is None:
+                _quote_cache = QuoteCache(create_provider(), ttl=float(os.getenv("FUNDPAL_QUOTE_TTL", "60")))
+    return _quote_cache
@@ -0,0 +1,77 @@
+"""
+Minimal in-process scheduler for background jobs.
+
+A PeriodicTask runs a function every `interval` seconds: sync functions on a
+worker thread so the event loop never blocks on them, coroutine functions
+directly on the loop. Start tasks from the FastAPI
+startup hook and stop them on shutdown.
+"""
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval: float, fn: Callable[[], Any], run_immediately: bool = True):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self.run_immediately = run_immediately
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_result: Any = None
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self):
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(self.fn):
+                self.last_result = await self.fn()
+            else:
+                self.last_result = await asyncio.to_thread(self.fn)
+            self.last_error = None
+        except Exception as e:
+            # Keep the loop alive; the next tick retries
+            self.failures += 1
+            self.last_error = str(e)
+            print(f"DEBUG: Background task {self.name} failed: {e}")
+        finally:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.last_duration = time.perf_counter() - start
+
+    async def _loop(self):
+        if not self.run_immediately:
+            await asyncio.sleep(self.interval)
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop(), name=self.name)
+            print(f"DEBUG: Started background task {self.name} (every {self.interval}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,71 @@
+"""
+Connection pool tests (database/connection.py).
+
+    python -m pytest -q test_connection.py
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from database.connection import ConnectionPool
+
+
+def _pool(size=2):
+    return ConnectionPool(os.path.join(tempfile.mkdtemp(), "pool.db"), size=size, timeout=1)
+
+
+def test_nested_acquire_on_one_thread_shares_the_connection():
+    pool = _pool()
+    outer = pool.acquire()
+    inner = pool.acquire()
+    assert inner is outer
+    inner.close()
+    assert pool.acquire() is outer
+    outer.close()
+    outer.close()
+
+
+def test_release_on_another_thread_frees_the_owner():
+    pool = _pool()
+    a, b, c = (ThreadPoolExecutor(max_workers=1) for _ in range(3))
+    c1 = a.submit(pool.acquire).result()
+    b.submit(c1.close).result()
+    # c takes the raw connection c1 gave back; a must not get that same one
+    c2 = c.submit(pool.acquire).result()
+    c3 = a.submit(pool.acquire).result()
+    assert c3 is not c1
+    assert c2._conn is not c3._conn
+    for executor in (a, b, c):
+        executor.shutdown()
+
+
+def test_failed_nested_block_keeps_the_outer_writes():
+    pool = _pool()
+    with pool.connection() as outer:
+        outer.execute("CREATE TABLE t (v TEXT)")
+        outer.execute("INSERT INTO t VALUES ('outer')")
+        with pytest.raises(RuntimeError):
+            with pool.connection() as inner:
+                inner.execute("INSERT INTO t VALUES ('inner')")
+                raise RuntimeError("inner failed")
+        with pool.acquire() as inner:
+            inner.execute("INSERT INTO t VALUES ('second inner')")
+        # The inner blocks must not have committed or ended the outer transaction
+        assert outer.in_transaction
+    with pool.connection() as conn:
+        assert [row[0] for row in conn.execute("SELECT v FROM t ORDER BY rowid")] == ["outer", "second inner"]
+
+
+def test_failed_outer_block_undoes_the_nested_writes():
+    pool = _pool()
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE t (v TEXT)")
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            with pool.connection() as inner:
+                inner.execute("INSERT INTO t VALUES ('inner')")
+            raise RuntimeError("outer failed")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
@@ -0,0 +1,53 @@
+"""
+LLM provider tests (agents/llm.py): the fake model and record/replay.
+
+    python -m pytest -q test_llm.py
+"""
+import asyncio
+import json
+import tempfile
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from agents.llm import FakeChatModel, ReplayChatModel, ReplayMissError, get_llm
+from agents.observer import ObserverAgent
+
+PROMPT = [SystemMessage(content="You are a friendly financial coach."), HumanMessage(content="Can I afford a movie?")]
+
+
+def test_fake_is_deterministic_and_streams_the_same_text():
+    llm = FakeChatModel()
+    text = llm.invoke(PROMPT).content
+    assert text and llm.invoke(PROMPT).content == text
+
+    async def stream():
+        return "".join([chunk.content async for chunk in llm.astream(PROMPT)])
+    assert asyncio.run(stream()) == text
+
+
+def test_fake_answers_the_observer_prompt_with_json():
+    observer = ObserverAgent()
+    reply = (observer.prompt | FakeChatModel()).invoke({"message": "spent 250 on lunch"}).content
+    parsed = json.loads(reply)
+    assert parsed["intent"] == "log_expense" and parsed["amount"] == 250
+
+
+def test_replay_returns_recorded_completion_and_raises_on_miss():
+    directory = tempfile.mkdtemp()
+    recorder = ReplayChatModel(inner=FakeChatModel(), record=True, directory=directory)
+    recorded = recorder.invoke(PROMPT).content
+
+    # The replayed text comes from disk, not from a model
+    replayer = ReplayChatModel(directory=directory)
+    assert replayer.invoke(PROMPT).content == recorded
+    with pytest.raises(ReplayMissError):
+        replayer.invoke([HumanMessage(content="never recorded")])
+    assert ReplayChatModel(directory=directory, on_miss=FakeChatModel()).invoke(
+        [HumanMessage(content="never recorded")]).content
+
+
+def test_get_llm_rejects_unknown_provider():
+    assert isinstance(get_llm(provider="fake"), FakeChatModel)
+    with pytest.raises(ValueError):
+        get_llm(provider="nope")
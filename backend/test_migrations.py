@@ -0,0 +1,104 @@
+"""
+Schema migration runner tests (database/migrations.py).
+
+    python -m pytest -q test_migrations.py
+"""
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from database.connection import connect
+from database.migrations import MIGRATIONS, apply_migrations, read_status
+
+LATEST = MIGRATIONS[-1].version
+
+
+@pytest.fixture
+def db_path():
+    return os.path.join(tempfile.mkdtemp(), "migrations.db")
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _indexes(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_fresh_database_gets_every_migration(db_path):
+    conn = connect(db_path)
+    assert apply_migrations(conn) == [m.version for m in MIGRATIONS]
+    assert "password" in _columns(conn, "users")
+    assert {"fund_name", "risk_level"} <= _columns(conn, "investments")
+    assert {"current_price", "pnl", "priced_at"} <= _columns(conn, "portfolio")
+    assert {"idx_transactions_user_date_id", "idx_transactions_user_type", "idx_goals_user"} <= _indexes(conn)
+    assert all(m["applied_at"] for m in read_status(conn))
+    # Second start: nothing pending, nothing re-run
+    assert apply_migrations(conn) == []
+    conn.close()
+
+
+def test_target_stops_early_and_resumes(db_path):
+    conn = connect(db_path)
+    assert apply_migrations(conn, target=3) == [1, 2, 3]
+    assert "portfolio" not in {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert apply_migrations(conn) == [m.version for m in MIGRATIONS if m.version > 3]
+    conn.close()
+
+
+def test_legacy_database_is_adopted(db_path):
+    """A database built by the old init_db + create_portfolio_table.py, with data and no schema_version"""
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript("""
+        CREATE TABLE users (id TEXT PRIMARY KEY, phone TEXT UNIQUE, name TEXT, created_at TIMESTAMP);
+        CREATE TABLE transactions (id TEXT PRIMARY KEY, user_id TEXT, type TEXT, amount REAL, category TEXT,
+            description TEXT, source TEXT, transaction_date DATE, logged_via TEXT DEFAULT 'chat',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+        CREATE INDEX idx_transactions_user_date ON transactions(user_id, transaction_date);
+        CREATE TABLE investments (id TEXT PRIMARY KEY, user_id TEXT, type TEXT, asset_class TEXT,
+            allocation_percentage REAL, amount REAL DEFAULT 0, status TEXT DEFAULT 'active', created_at TIMESTAMP);
+        CREATE TABLE portfolio (id TEXT PRIMARY KEY, user_id TEXT NOT NULL, symbol TEXT NOT NULL,
+            quantity REAL NOT NULL, average_buy_price REAL NOT NULL, current_value REAL,
+            last_updated DATETIME DEFAULT CURRENT_TIMESTAMP);
+        -- Two racing buys used to be able to leave two rows for one holding
+        INSERT INTO portfolio (id, user_id, symbol, quantity, average_buy_price)
+        VALUES ('p1', 'u1', 'NIFTYBEES.NS', 10, 100), ('p2', 'u1', 'NIFTYBEES.NS', 10, 200);
+        INSERT INTO transactions (id, user_id, type, amount, category, transaction_date)
+        VALUES ('t1', 'u1', 'income', 1000, 'Salary', '2026-01-05'),
+               ('t2', 'u1', 'expense', 250, 'Food', '2026-01-06');
+    """)
+    legacy.close()
+
+    conn = connect(db_path)
+    assert apply_migrations(conn)[-1] == LATEST
+    assert "password" in _columns(conn, "users")
+    assert "fund_name" in _columns(conn, "investments")
+    assert "priced_at" in _columns(conn, "portfolio")
+    assert "idx_transactions_user_date" not in _indexes(conn)
+    # Duplicate holdings merged, with an opening fill to replay positions from
+    assert [tuple(r) for r in conn.execute("SELECT quantity, average_buy_price FROM portfolio")] == [(20, 150)]
+    assert tuple(conn.execute("SELECT side, quantity, price FROM trade_fills").fetchone()) == ("BUY", 20, 150)
+    # Backfills ran inside the upgrade
+    assert tuple(conn.execute("SELECT balance, txn_count FROM user_balances WHERE user_id = 'u1'").fetchone()) == (750, 2)
+    assert conn.execute("SELECT expense FROM spend_daily WHERE user_id = 'u1' AND day = '2026-01-06'").fetchone()[0] == 250
+    conn.close()
+
+
+def test_failed_migration_rolls_back(db_path, monkeypatch):
+    import database.migrations as migrations
+
+    def boom(conn):
+        raise RuntimeError("boom")
+
+    broken = migrations.MIGRATIONS[:3] + [migrations.Migration(4, "broken", ["CREATE TABLE half_done (id TEXT);", boom])]
+    monkeypatch.setattr(migrations, "MIGRATIONS", broken)
+    conn = connect(db_path)
+    with pytest.raises(RuntimeError):
+        apply_migrations(conn)
+    # One transaction: versions 1-3 rolled back along with the failing step
+    assert conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == 0
+    assert not conn.execute("SELECT 1 FROM sqlite_master WHERE name IN ('users', 'half_done')").fetchall()
+    conn.close()
@@ -0,0 +1,75 @@
+"""
+Trade booking tests (services/portfolio.py): orders are only filled at real quotes.
+
+    python -m pytest -q test_portfolio.py
+"""
+import asyncio
+
+import pytest
+
+import services.quotes as quotes
+from database.connection import get_db_connection
+from database.ledger import get_balance, insert_transaction
+from database.schema import init_db
+from services.market_data import MarketDataService
+from services.portfolio import PortfolioService
+from services.quotes import FixtureProvider, QuoteCache
+
+USER = "trade_user"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def funded_user():
+    init_db()
+    conn = get_db_connection()
+    insert_transaction(conn.cursor(), USER, "income", 100000, category="Salary")
+    conn.commit()
+    conn.close()
+
+
+def _service(provider) -> PortfolioService:
+    service = PortfolioService()
+    service.market_data = MarketDataService(QuoteCache(provider))
+    return service
+
+
+def _fills_and_balance():
+    conn = get_db_connection()
+    try:
+        fills = conn.execute("SELECT COUNT(*) FROM trade_fills WHERE user_id = ?", (USER,)).fetchone()[0]
+        return fills, get_balance(conn.cursor(), USER)["balance"]
+    finally:
+        conn.close()
+
+
+def test_quote_timeout_books_nothing(monkeypatch):
+    monkeypatch.setattr(quotes, "QUOTE_TIMEOUT", 0.05)
+    service = _service(FixtureProvider({"SLOW.NS": 100.0}, latency=0.5))
+    before = _fills_and_balance()
+    result = asyncio.run(service.aexecute_buy(USER, "SLOW.NS", 1))
+    assert result == {"status": "error", "message": "Failed to fetch price"}
+    assert _fills_and_balance() == before
+
+
+def test_unquoted_symbol_books_nothing():
+    service = _service(FixtureProvider({}, fill_missing=False))
+    before = _fills_and_balance()
+    assert service.execute_buy(USER, "GONE.NS", 1)["message"] == "Failed to fetch price"
+    assert service.execute_sell(USER, "GONE.NS", 1)["message"] == "Failed to fetch price"
+    assert _fills_and_balance() == before
+
+
+def test_quoted_buy_fills_at_the_quote():
+    service = _service(FixtureProvider({"REAL.NS": 250.0}, fill_missing=False))
+    result = service.execute_buy(USER, "REAL.NS", 2)
+    assert result["status"] == "success" and result["price"] == 250.0
+
+
+@pytest.mark.parametrize("price", [None, 0, -5.0, float("nan")])
+def test_bad_price_books_nothing(price):
+    service = PortfolioService()
+    before = _fills_and_balance()
+    for book in (service._book_buy, service._book_sell):
+        result = service._execute(book, USER, "REAL.NS", 1, price)
+        assert result == {"status": "error", "message": "Failed to fetch price"}
+    assert _fills_and_balance() == before
@@ -0,0 +1,231 @@
+"""
+Query-plan regression tests.
+
+Runs the app's real read/write paths (database/queries.py, the portfolio,
+dashboard, insights, analytics and import services, and the HTTP routes)
+against a seeded temporary database with a trace callback on every
+connection, then runs EXPLAIN QUERY PLAN on each statement they issued and
+fails if SQLite would scan a whole table for it.
+
+    python -m pytest -q test_query_plans.py
+"""
+import io
+import os
+import re
+import sqlite3
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from database import connection
+from database.schema import init_db
+from database.ids import new_id
+from database.ledger import insert_transactions
+from database.queries import (
+    read_user_profile, write_user_profile, read_user_state, write_transaction,
+    read_category_breakdown, read_transactions_page,
+)
+from services.dashboard import read_dashboard
+from services.insights import read_insight, read_watermark, write_insight
+from services.importer import TransactionImporter
+
+USER = "plan_user"
+OTHER_USERS = 20
+TXNS_PER_USER = 300
+
+# "SCAN t" with no index is a full table scan; "SCAN t USING [COVERING] INDEX" walks an index
+FULL_SCAN_RE = re.compile(r"^SCAN (?!CONSTANT ROW)(\w+)\b(?! USING (?:COVERING )?INDEX)")
+
+# Statements that touch every user by design (background batch jobs), with why
+ALLOWED_SCANS = {
+    "FROM user_balances b": "insights job: picks stale users across the whole ledger",
+}
+
+SKIP_PREFIXES = ("--", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE", "DROP", "ANALYZE", "SAVEPOINT", "RELEASE")
+
+
+@pytest.fixture(scope="module")
+def statements():
+    """Every SQL statement run on any app connection while a test's workload runs"""
+    captured = []
+    original_connect = connection.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = original_connect(*args, **kwargs)
+        conn.set_trace_callback(captured.append)
+        return conn
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(connection, "connect", traced_connect)
+        init_db()
+        _seed()
+        for raw in connection.get_pool()._all:
+            raw.set_trace_callback(captured.append)
+        yield captured
+
+
+def _seed():
+    conn = connection.get_db_connection()
+    try:
+        start = date.today() - timedelta(days=400)
+        for n, user_id in enumerate([USER] + [f"plan_other_{i}" for i in range(OTHER_USERS)]):
+            write_user_profile(conn, user_id, {"monthly_income_min": 30000, "monthly_rent": 8000})
+            insert_transactions(conn.cursor(), user_id, [{
+                "id": new_id("txn"),
+                "type": "income" if i % 10 == 0 else "expense",
+                "amount": 100000 if i == 0 else 100 + i,
+                "category": ["Food", "Rent", "Transport", "Shopping"][i % 4],
+                "description": f"seed {i}",
+                "transaction_date": (start + timedelta(days=i % 400)).isoformat(),
+            } for i in range(TXNS_PER_USER)])
+            conn.execute(
+                "INSERT INTO goals (id, user_id, name, target_amount, current_amount, deadline) VALUES (?, ?, 'Bike', 50000, 1000, '2030-01-01')",
+                (new_id("goal"), user_id))
+            conn.execute(
+                "INSERT INTO debts (id, user_id, name, principal, current_balance, interest_rate, emi_amount, emi_day) "
+                "VALUES (?, ?, 'Card', 5000, 5000, 36, 500, 5)", (new_id("debt"), user_id))
+            conn.execute(
+                "INSERT INTO investments (id, user_id, type, asset_class, fund_name, risk_level, allocation_percentage) "
+                "VALUES (?, ?, 'growth', 'Equity', 'Nifty 50 Index Fund', 'moderate', 60)", (new_id("inv"), user_id))
+            conn.execute(
+                "INSERT INTO portfolio (id, user_id, symbol, quantity, average_buy_price, current_value) VALUES (?, ?, ?, 10, 100, 1000)",
+                (new_id("pf"), user_id, f"SYM{n}.NS"))
+        # A stored insight so /insights never starts a (real) LLM refresh
+        write_insight(conn, USER, "seeded", {"txn_count": TXNS_PER_USER, "expense": 0})
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _full_scans(sql: str):
+    plan_conn = sqlite3.connect(os.environ["FUNDPAL_DB_PATH"])
+    try:
+        plan = [row[3] for row in plan_conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+    finally:
+        plan_conn.close()
+    return [line for line in plan if FULL_SCAN_RE.match(line)], plan
+
+
+def _assert_no_full_scans(captured, start):
+    seen, failures = set(), []
+    for sql in captured[start:]:
+        sql = sql.strip()
+        if not sql or sql.upper().startswith(SKIP_PREFIXES) or sql in seen:
+            continue
+        seen.add(sql)
+        if any(marker in sql for marker in ALLOWED_SCANS):
+            continue
+        scans, plan = _full_scans(sql)
+        if scans:
+            failures.append(f"{' '.join(sql.split())}\n    plan: {plan}")
+    assert seen, "workload issued no statements"
+    assert not failures, "full table scans:\n" + "\n".join(failures)
+
+
+def _run(captured, workload):
+    start = len(captured)
+    conn = connection.get_db_connection()
+    try:
+        workload(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    _assert_no_full_scans(captured, start)
+
+
+def test_user_state_and_profile(statements):
+    def workload(conn):
+        read_user_profile(conn, USER)
+        write_user_profile(conn, USER, {"monthly_income_min": 32000})
+        read_user_state(conn, USER)
+    _run(statements, workload)
+
+
+def test_write_transaction(statements):
+    parsed = SimpleNamespace(transaction_type="expense", amount=250.0, category="Food",
+                             raw_query="spent 250 on lunch", date=None)
+    _run(statements, lambda conn: write_transaction(conn, USER, parsed))
+
+
+def test_category_breakdown(statements):
+    def workload(conn):
+        read_category_breakdown(conn, USER)
+        read_category_breakdown(conn, USER, (date.today() - timedelta(days=30)).isoformat(), date.today().isoformat())
+        read_category_breakdown(conn, USER, txn_type="income")
+    _run(statements, workload)
+
+
+def test_transactions_pagination(statements):
+    def workload(conn):
+        _, cursor = read_transactions_page(conn, USER, 20)
+        read_transactions_page(conn, USER, 20, cursor)
+    _run(statements, workload)
+
+
+def test_dashboard(statements):
+    _run(statements, lambda conn: read_dashboard(conn, USER))
+
+
+def test_insights_store(statements):
+    def workload(conn):
+        read_insight(conn, USER)
+        write_insight(conn, USER, "again", read_watermark(conn, USER))
+    _run(statements, workload)
+
+
+def test_portfolio_service(statements):
+    from services.portfolio import PortfolioService
+    service = PortfolioService()
+
+    def workload(conn):
+        service.get_portfolio(USER)
+        service.execute_buy(USER, "SYM0.NS", 1)
+        service.execute_buy(USER, "NEWSYM.NS", 1)
+        service.execute_sell(USER, "SYM0.NS", 1)
+        service.execute_sell(USER, "NEWSYM.NS", 1)
+        service.execute_basket(USER, [{"symbol": "SYM0.NS", "quantity": 1}, {"symbol": "BASKET.NS", "amount": 500}])
+        service.refresh_valuations()
+        service.analytics.load_targets(USER)
+        service.analytics.load_holdings(USER)
+    _run(statements, workload)
+
+
+def test_statement_import(statements):
+    csv = "Date,Narration,Amount,Type\n" + "".join(
+        f"{(date.today() - timedelta(days=d)).isoformat()},ZOMATO {d},{100 + d},DR\n" for d in range(30))
+
+    def workload(conn):
+        TransactionImporter(chunk_size=10).import_file(USER, io.BytesIO(csv.encode()), fmt="csv")
+    _run(statements, workload)
+
+
+def test_routes(statements):
+    from fastapi.testclient import TestClient
+    import main
+
+    start = len(statements)
+    with TestClient(main.app) as client:
+        params = {"user_id": USER}
+        for path in ["/api/goals", "/api/debts", "/api/investments", "/api/transactions", "/api/dashboard",
+                     "/api/insights", "/api/profile", "/api/portfolio"]:
+            assert client.get(path, params=params).status_code == 200, path
+        assert client.post("/api/goals", params=params, json={
+            "name": "Trip", "target_amount": 20000, "deadline": "2027-06-01"}).status_code == 200
+        assert client.post("/api/debts", params=params, json={
+            "name": "Loan", "principal": 10000, "current_balance": 8000, "interest_rate": 12,
+            "emi_amount": 1000, "emi_day": 10}).status_code == 200
+        assert client.post("/api/bills/pay", params=params, json={
+            "biller_name": "Power Co", "amount": 450, "bill_type": "electricity"}).status_code == 200
+        assert client.post("/api/execute", params=params, json={
+            "symbol": "SYM0.NS", "action": "BUY", "quantity": 1}).status_code == 200
+        assert client.post("/api/execute", params=params, headers={"Idempotency-Key": "plan-sell-1"}, json={
+            "symbol": "SYM0.NS", "action": "SELL", "quantity": 1}).status_code == 200
+        assert client.post("/api/investments", params=params, json={
+            "risk_profile": "moderate", "total_amount": 1000, "allocation": {
+                "Equity": {"pct": 60, "fund": "Nifty 50", "ticker": "SYM0.NS"},
+                "Gold": {"pct": 40, "fund": "Gold ETF", "ticker": "GOLD.NS"}}}).status_code == 200
+        account = {"phone": "9000000001", "password": "secret"}
+        assert client.post("/api/auth/signup", json={**account, "name": "Plan"}).status_code == 200
+        assert client.post("/api/auth/login", json=account).status_code == 200
+    _assert_no_full_scans(statements, start)
@@ -0,0 +1,68 @@
+"""
+Planner state from the rollups (database/queries.py read_user_state, database/rollups.py).
+
+    python -m pytest -q test_user_state.py
+"""
+import os
+import tempfile
+from datetime import date
+
+import pytest
+
+from database.connection import connect
+from database.ledger import insert_transaction
+from database.migrations import apply_migrations
+from database.queries import read_category_breakdown, read_transactions_page, read_user_state
+
+TODAY = date(2026, 10, 18)
+
+
+@pytest.fixture
+def conn():
+    conn = connect(os.path.join(tempfile.mkdtemp(), "state.db"))
+    apply_migrations(conn)
+    yield conn
+    conn.close()
+
+
+def _add(conn, txn_type, amount, category, day):
+    insert_transaction(conn.cursor(), "u1", txn_type, amount, category=category, transaction_date=day)
+    conn.commit()
+
+
+def test_budget_averages_only_the_months_the_user_has(conn):
+    _add(conn, "expense", 3000, "Food", "2026-09-10")
+    _add(conn, "expense", 500, "Food", "2026-10-10")
+    assert read_user_state(conn, "u1", TODAY)["categories"]["Food"] == {"spent": 500, "budget": 3000}
+
+
+def test_investments_are_not_spend(conn):
+    _add(conn, "expense", 600, "Food", "2026-10-10")
+    _add(conn, "expense", 10000, "Investment", "2026-10-11")
+    state = read_user_state(conn, "u1", TODAY)
+    assert state["avg_30_day_expense"] == 20
+    assert "Investment" not in state["categories"]
+
+
+def test_monthly_income_is_unset_without_income(conn):
+    _add(conn, "expense", 600, "Food", "2026-10-10")
+    assert "monthly_income" not in read_user_state(conn, "u1", TODAY)
+    _add(conn, "income", 40000, "Salary", "2026-10-01")
+    assert read_user_state(conn, "u1", TODAY)["monthly_income"] == 40000
+
+
+def test_uncategorized_rows_share_one_label(conn):
+    _add(conn, "expense", 200, None, "2026-10-12")
+    assert "Other" in read_user_state(conn, "u1", TODAY)["categories"]
+    assert [row["category"] for row in read_category_breakdown(conn, "u1", "2026-10-01")] == ["Other"]
+
+
+def test_null_and_other_rows_are_one_category(conn):
+    _add(conn, "expense", 200, None, "2026-10-12")
+    _add(conn, "expense", 300, "Other", "2026-10-13")
+    assert read_category_breakdown(conn, "u1", "2026-10-01") == [{"category": "Other", "total": 500, "count": 2}]
+
+
+def test_empty_page_has_no_cursor(conn):
+    _add(conn, "expense", 200, "Food", "2026-10-12")
+    assert read_transactions_page(conn, "u1", 0) == ([], None)